@@ -1,10 +1,22 @@
 
+import os
+import pickle
+import sys
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from inspect import signature
 from itertools import product
 from timeit import default_timer as timer
+from types import GeneratorType
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 from aimacode.logic import associate
 from aimacode.search import InstrumentedProblem
-from aimacode.utils import expr
+from aimacode.utils import Expr, expr
 
 
 class PrintableProblem(InstrumentedProblem):
@@ -16,26 +28,171 @@ class PrintableProblem(InstrumentedProblem):
             len(self.problem.actions_list), self.succs, self.goal_tests, self.states)
 
 
-def run_search(problem, search_function, parameter=None):
-    ip = PrintableProblem(problem)
+def get_heuristic(problem, names):
+    """ Look up heuristics on problem by name: None for no name, a list of methods
+    for a comma separated list of names (eg. for alternation_search), or a method
+    """
+    if not names:
+        return None
+    if "," in names:
+        return [ getattr(problem, name.strip()) for name in names.split(",") ]
+    return getattr(problem, names)
+
+
+def solve(problem, search_function, parameter=None, telemetry=None, **options):
+    """ Run search_function on an instrumented copy of problem
+
+    Keyword options which are not None (eg. time_budget, checkpoint) are
+    passed on to search functions that take them, and ignored by the rest.
+
+    With a telemetry.Telemetry, calls to the problem and the heuristic are
+    timed and reported to its sinks, and it is closed when the search ends.
+
+    Anytime searches, which return a generator of (node, cost, elapsed)
+    improved solutions, are run to completion (or until time_budget seconds,
+    if search_function takes a time_budget) and the last solution is returned.
+    Each improvement is recorded in ip.solutions as (cost, elapsed, expansions).
+
+    Returns
+    -------
+    (PrintableProblem, Node or None, elapsed time in seconds)
+    """
+    ip = PrintableProblem(problem, telemetry)
+    ip.solutions = []
+    if telemetry is not None and callable(parameter):
+        parameter = telemetry.timer(getattr(parameter, '__name__', 'h')).wrap(parameter)
+    elif telemetry is not None and isinstance(parameter, list):
+        parameter = [ telemetry.timer(getattr(h, '__name__', 'h')).wrap(h) for h in parameter ]
+    args   = (ip,) if parameter is None else (ip, parameter)
+    accepted = signature(search_function).parameters
+    kwargs = { name: value for name, value in options.items() if value is not None and name in accepted }
     start = timer()
-    if parameter is not None:
-        node = search_function(ip, parameter)
-    else:
-        node = search_function(ip)
+    node  = search_function(*args, **kwargs)
+    if isinstance(node, GeneratorType):
+        solutions, node = node, None
+        for node, cost, elapsed in solutions:
+            ip.solutions.append((cost, elapsed, ip.succs))
     end = timer()
+    if telemetry is not None:
+        telemetry.close()
+    return ip, node, end - start
+
+
+def max_rss_mb():
+    """ Peak resident set size of the current process in MB """
+    if resource is None: return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** (2 if sys.platform == "darwin" else 1)  # bytes on OSX, KB on Linux
+
+
+def run_search(problem, search_function, parameter=None, **options):
+    ip, node, elapsed = solve(problem, search_function, parameter, **options)
     print("\n# Actions   Expansions   Goal Tests   New Nodes")
     print("{}\n".format(ip))
-    show_solution(node, end - start)
+    if ip.max_frontier:
+        print("Peak frontier: {}  Stale pops: {}\n".format(ip.max_frontier, ip.stale_pops))
+    if ip.peak_nodes:
+        print("Peak nodes in memory: {}\n".format(ip.peak_nodes))
+    if ip.backward_succs:
+        print("Backward expansions: {} of {}\n".format(ip.backward_succs, ip.succs))
+    if ip.applicable_actions:
+        print("Pruned actions: {} of {} applicable ({:.0%})\n".format(
+            ip.pruned_actions, ip.applicable_actions, ip.pruned_actions / ip.applicable_actions))
+    if ip.solutions:
+        show_solution_curve(ip.solutions)
+    show_heuristic_cache_info(problem)
+    show_solution(node, elapsed)
+    print()
+
+
+def show_solution_curve(solutions):
+    print("Solution    Cost    Seconds   Expansions")
+    for i, (cost, elapsed, expansions) in enumerate(solutions, 1):
+        print("{:^8d}  {:^6}  {:>9.3f}  {:^11d}".format(i, cost, elapsed, expansions))
     print()
 
 
+def show_heuristic_cache_info(problem):
+    caches = getattr(problem, 'heuristic_caches', {})
+    for name, cache in sorted(caches.items()):
+        print("Heuristic cache {}: {}".format(name, cache))
+    if caches: print()
+
+
 def show_solution(node, elapsed_time):
     print("Plan length: {}  Time elapsed in seconds: {}".format(len(node.solution()), elapsed_time))
     for action in node.solution():
         print("{}{}".format(action.name, action.args))
 
 
+class LiteralTable:
+    """ Symbol table of ground literals, shared by every object built for a problem
+
+    Ground literals are built directly as Expr objects, rather than formatting
+    a string and parsing it back with expr() (which goes through
+    expr_handle_infix_ops() and eval()). Each distinct literal is interned as a
+    single instance and given a dense integer ID in creation order. Seeding the
+    table with problem.state_map makes the ID of each fluent its index in the
+    state tuple, and every action precondition/effect the same object as the
+    fluent in state_map.
+
+    Example
+    -------
+    >>> table = LiteralTable()
+    >>> table.literal('At', 'C1', 'SFO') is table.literal('At', 'C1', 'SFO')
+    True
+    >>> table.id(expr('At(C1, SFO)'))
+    0
+    """
+    def __init__(self, literals=()):
+        self.symbols  = {}  # name -> nullary Expr
+        self.literals = []  # id -> Expr
+        self.ids      = {}  # Expr -> id
+        self.keys     = {}  # (op, *arg names) -> id
+        for literal in literals:
+            self.add(literal)
+
+    def __len__(self):
+        return len(self.literals)
+
+    def __iter__(self):
+        return iter(self.literals)
+
+    def __contains__(self, literal):
+        return literal in self.ids
+
+    def __getitem__(self, id):
+        return self.literals[id]
+
+    def symbol(self, name) -> Expr:
+        if name not in self.symbols:
+            self.symbols[name] = Expr(name)
+        return self.symbols[name]
+
+    def expr(self, op, *args) -> Expr:
+        """ Build Expr(op, *args) from interned symbols, without assigning an ID (eg. action names) """
+        return Expr(op, *(self.symbol(arg) for arg in args))
+
+    def literal(self, op, *args) -> Expr:
+        """ Return the interned literal op(*args), adding it to the table if it is new """
+        key = (op,) + args
+        if key in self.keys:
+            return self.literals[self.keys[key]]
+        return self.add(self.expr(op, *args))
+
+    def add(self, literal) -> Expr:
+        """ Intern an existing Expr literal, returning the table's instance of it """
+        if literal in self.ids:
+            return self.literals[self.ids[literal]]
+        self.ids[literal] = len(self.literals)
+        self.keys[(literal.op,) + tuple(str(arg) for arg in literal.args)] = len(self.literals)
+        self.literals.append(literal)
+        return literal
+
+    def id(self, literal) -> int:
+        return self.ids[literal]
+
+
 def create_expressions(str_list):
     """ Converts a list of strings into a list of Expr objects """
     return [expr(s) for s in str_list]
@@ -65,7 +222,7 @@ def make_relations(name, *args, key=lambda x: True):
 
     See additional examples in example_have_cake.py and air_cargo_problems.py 
     """
-    return create_expressions("{}({})".format(name, ", ".join(c)) for c in product(*args) if key(c))
+    return [ Expr(name, *map(Expr, c)) for c in product(*args) if key(c) ]
 
 
 class FluentState:
@@ -127,7 +284,8 @@ def encode_state(fs, fluent_map):
     -------
     tuple of True/False elements corresponding to the fluents in fluent_map
     """
-    return tuple([f in fs.pos for f in fluent_map])
+    pos = set(fs.pos)
+    return tuple([f in pos for f in fluent_map])
 
 
 def decode_state(state, fluent_map):
@@ -159,3 +317,107 @@ def decode_state(state, fluent_map):
         else:
             fs.neg.append(fluent_map[idx])
     return fs
+
+
+HeuristicCacheInfo = namedtuple("HeuristicCacheInfo", ("hits", "misses", "evictions", "currsize", "maxsize"))
+
+class HeuristicCache:
+    """ Bounded LRU cache of heuristic values keyed on the compact state tuple
+
+    functools.lru_cache() on a method taking a Node keys on (self, node), which
+    keeps the problem alive, defaults to 128 entries and misses whenever a
+    different Node carries the same state. Keying on node.state lets every
+    path to a state share one evaluation.
+    """
+    _missing = object()
+
+    def __init__(self, maxsize=2**16):
+        self.maxsize   = maxsize
+        self.data      = OrderedDict()
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+
+    def __contains__(self, state):
+        return state in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return "hits={} misses={} evictions={} size={}/{}".format(*self.info())
+
+    def info(self) -> HeuristicCacheInfo:
+        return HeuristicCacheInfo(self.hits, self.misses, self.evictions, len(self.data), self.maxsize)
+
+    def get(self, state, default=None):
+        value = self.data.get(state, self._missing)
+        if value is self._missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(state)
+        return value
+
+    def put(self, state, value):
+        self.data[state] = value
+        self.data.move_to_end(state)
+        if self.maxsize is not None:
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, items):
+        for state, value in items:
+            self.put(state, value)
+
+
+def heuristic_cache(fn):
+    """ Decorator for BasePlanningProblem heuristics with the signature fn(self, node)
+    which caches results in problem.get_heuristic_cache(fn.__name__) keyed on node.state
+    """
+    name = fn.__name__
+    @wraps(fn)
+    def cached_heuristic(self, node):
+        cache = self.get_heuristic_cache(name)
+        value = cache.get(node.state, HeuristicCache._missing)
+        if value is HeuristicCache._missing:
+            value = fn(self, node)
+            cache.put(node.state, value)
+        return value
+    cached_heuristic.heuristic_cache = True  # lets HeuristicPool share the cache with its workers
+    return cached_heuristic
+
+
+def save_heuristic_caches(caches, signature, path):
+    """ Snapshot a dict of {name: HeuristicCache} to disk under the problem signature
+
+    The file holds a snapshot per problem, so the snapshots of other problems
+    in it are kept. It is replaced atomically, so an interrupted save leaves
+    the previous file intact.
+    """
+    problems = _read_heuristic_caches(path)
+    problems[signature] = { name: list(cache.data.items()) for name, cache in caches.items() }
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        pickle.dump({ "problems": problems }, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_heuristic_caches(path, signature) -> dict:
+    """ Load a snapshot written by save_heuristic_caches()
+
+    Returns a dict of {name: [(state, value), ...]}, or an empty dict if the
+    file is missing or has no snapshot for the problem
+    """
+    return _read_heuristic_caches(path).get(signature, {})
+
+
+def _read_heuristic_caches(path) -> dict:
+    """ {signature: snapshot} in a file written by save_heuristic_caches(), or {} if it is missing or unreadable """
+    try:
+        with open(path, 'rb') as file:
+            data = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+    return data.get("problems", {}) if isinstance(data, dict) else {}
@@ -5,10 +5,21 @@ then create problem instances and solve them with calls to the various search
 functions."""
 
 from .utils import (
-    is_in, memoize, print_table, Stack, FIFOQueue, PriorityQueue, name
+    is_in, memoize, print_table, Stack, LIFOQueue, FIFOQueue, PriorityQueue,
+    IndexedPriorityQueue, BucketQueue, name
 )
 
+import heapq
+import itertools
+import multiprocessing
+import os
+import pickle
 import sys
+import time
+import traceback
+import warnings
+from array import array
+from types import SimpleNamespace
 
 infinity = float('inf')
 
@@ -124,7 +135,171 @@ class Node:
     # want in other contexts.]
 
     def __eq__(self, other):
-        return isinstance(other, Node) and self.state == other.state
+        # a NodeView is a node too, so that Node == NodeView agrees with NodeView == Node
+        return isinstance(other, (Node, NodeView)) and self.state == other.state
+
+    def __hash__(self):
+        return hash(self.state)
+
+
+
+class NodePool:
+
+    """Compact storage for the nodes of a search tree, as parallel arrays.
+
+    Node i is stored as the index of its state in an interned state table, the
+    index of its parent (-1 for the root), the ID of the action which produced
+    it, its depth, and its path cost g, f and h values: about 40 bytes per
+    node rather than a Node instance with its own __dict__. Each distinct state is
+    stored once, packed with problem.pack_state if the problem defines it.
+    NodeView gives a Node-compatible view of any node in the pool, so paths
+    are only rebuilt when they are asked for. Other values set on a view (eg.
+    the landmarks accepted by h_landmarks) are kept in memo, so they outlive
+    the view."""
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.pack    = getattr(problem, 'pack_state',   None)
+        self.unpack  = getattr(problem, 'unpack_state', None)
+        self.states, self.state_ids   = [], {}
+        self.actions, self.action_ids = [None], {None: 0}
+        self.state  = array('i')
+        self.parent = array('i')
+        self.action = array('i')
+        self.depth  = array('i')
+        self.g      = array('d')
+        self.f      = array('d')
+        self.h      = array('d')
+        self.memo   = {}          # attribute name -> {node index: value}
+        self.recent = (-1, None)  # (index, state) of the last node added, which is usually evaluated next
+
+    def __len__(self):
+        return len(self.state)
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.state, self.parent, self.action, self.depth, self.g, self.f, self.h))
+
+    def intern_state(self, state):
+        key = self.pack(state) if self.pack else state
+        if key not in self.state_ids:
+            self.state_ids[key] = len(self.states)
+            self.states.append(key)
+        return self.state_ids[key]
+
+    def intern_action(self, action):
+        if action not in self.action_ids:
+            self.action_ids[action] = len(self.actions)
+            self.actions.append(action)
+        return self.action_ids[action]
+
+    def add(self, state, parent=-1, action=None, path_cost=0):
+        "Store a node and return its index."
+        self.state.append(self.intern_state(state))
+        self.parent.append(parent)
+        self.action.append(self.intern_action(action))
+        self.depth.append(self.depth[parent] + 1 if parent >= 0 else 0)
+        self.g.append(path_cost)
+        self.f.append(float('nan'))  # not yet computed
+        self.h.append(float('nan'))
+        self.recent = (len(self.state) - 1, state)
+        return self.recent[0]
+
+    def pop(self):
+        "Discard the most recently added node."
+        for a in (self.state, self.parent, self.action, self.depth, self.g, self.f, self.h):
+            a.pop()
+        for values in self.memo.values():
+            values.pop(len(self.state), None)  # the index is reused by the next node added
+        self.recent = (-1, None)
+
+    def get_state(self, i):
+        if i == self.recent[0]: return self.recent[1]
+        key = self.states[self.state[i]]
+        return self.unpack(key) if self.unpack else key
+
+    def child(self, i, action, state=None):
+        "Add the node reached by taking action in node i, and return its index."
+        state = self.get_state(i) if state is None else state
+        next_state = self.problem.result(state, action)
+        return self.add(next_state, i, action,
+                        self.problem.path_cost(self.g[i], state, action, next_state))
+
+    def path(self, i):
+        "Return the indices of the nodes from the root to node i."
+        path_back = []
+        while i >= 0:
+            path_back.append(i)
+            i = self.parent[i]
+        return list(reversed(path_back))
+
+    def solution(self, i):
+        return [self.actions[self.action[j]] for j in self.path(i)[1:]]
+
+    def view(self, i):
+        return NodeView(self, i)
+
+
+class NodeView:
+
+    """A Node-compatible view of node `index` in a NodePool. Views are created
+    on demand and hold no node data themselves, so the pool stays compact:
+    attributes set on a view (eg. by memoize(h, 'h')) are stored in the pool."""
+
+    __slots__ = ('pool', 'index')
+
+    def __init__(self, pool, index):
+        object.__setattr__(self, 'pool', pool)
+        object.__setattr__(self, 'index', index)
+
+    state     = property(lambda self: self.pool.get_state(self.index))
+    action    = property(lambda self: self.pool.actions[self.pool.action[self.index]])
+    path_cost = property(lambda self: self.pool.g[self.index])
+    depth     = property(lambda self: self.pool.depth[self.index])
+
+    @property
+    def parent(self):
+        parent = self.pool.parent[self.index]
+        return NodeView(self.pool, parent) if parent >= 0 else None
+
+    def __getattr__(self, name):
+        if name == 'f' or name == 'h':
+            value = getattr(self.pool, name)[self.index]
+            if value == value: return value
+        else:
+            values = self.pool.memo.get(name)
+            if values is not None and self.index in values: return values[self.index]
+        raise AttributeError(name)  # NaN or missing: not computed, so memoize(fn, name) computes it
+
+    def __setattr__(self, name, value):
+        if name == 'f' or name == 'h':
+            getattr(self.pool, name)[self.index] = value
+        else:
+            self.pool.memo.setdefault(name, {})[self.index] = value
+
+    def __repr__(self):
+        return "<Node %s>" % (self.state,)
+
+    def __lt__(self, node):
+        return self.state < node.state
+
+    def expand(self, problem):
+        return (self.child_node(problem, action)
+                for action in problem.actions(self.state))
+
+    def child_node(self, problem, action):
+        return NodeView(self.pool, self.pool.child(self.index, action))
+
+    def solution(self):
+        return self.pool.solution(self.index)
+
+    def path(self):
+        return [NodeView(self.pool, i) for i in self.pool.path(self.index)]
+
+    def __eq__(self, other):
+        if isinstance(other, NodeView) and other.pool is self.pool:
+            return self.pool.state[self.index] == self.pool.state[other.index]
+        return isinstance(other, (Node, NodeView)) and self.state == other.state
 
     def __hash__(self):
         return hash(self.state)
@@ -146,21 +321,37 @@ def tree_search(problem, frontier):
     return None
 
 
-def graph_search(problem, frontier):
+def graph_search(problem, frontier, checkpoint=None):
     """Search through the successors of a problem to find a goal.
     The argument frontier should be an empty queue.
-    If two paths reach a state, only use the first one. [Figure 3.7]"""
-    frontier.append(Node(problem.initial))
-    explored = set()
-    while frontier:
-        node = frontier.pop()
-        if problem.goal_test(node.state):
-            return node
-        explored.add(node.state)
-        frontier.extend(child for child in node.expand(problem)
-                        if child.state not in explored and
-                        child not in frontier)
-    return None
+    If two paths reach a state, only use the first one. [Figure 3.7]
+
+    MODIFIED FROM AIMA VERSION
+        - Optionally snapshots and resumes from a Checkpoint
+        - Peak frontier size is recorded on an InstrumentedProblem
+    """
+    restored = checkpoint and checkpoint.restore(problem)
+    if restored:
+        frontier.extend(restored[0])
+        explored = restored[1]
+    else:
+        frontier.append(Node(problem.initial))
+        explored = set()
+    track_search(problem, frontier, explored)
+    try:
+        while frontier:
+            if checkpoint and checkpoint.due():
+                checkpoint.save(problem, frontier, explored)
+            node = frontier.pop()
+            if problem.goal_test(node.state):
+                return node
+            explored.add(node.state)
+            frontier.extend(child for child in node.expand(problem)
+                            if child.state not in explored and
+                            child not in frontier)
+        return None
+    finally:
+        record_frontier_stats(problem, frontier)
 
 
 def breadth_first_tree_search(problem):
@@ -173,20 +364,37 @@ def depth_first_tree_search(problem):
     return tree_search(problem, Stack())
 
 
-def depth_first_graph_search(problem):
-    "Search the deepest nodes in the search tree first."
-    return graph_search(problem, Stack())
+def depth_first_graph_search(problem, checkpoint=None):
+    """Search the deepest nodes in the search tree first.
 
+    MODIFIED FROM AIMA VERSION
+        - The frontier is a LIFOQueue, so the `child not in frontier` test
+          in graph_search is a hash lookup instead of a scan of the stack
+    """
+    return graph_search(problem, LIFOQueue(), checkpoint)
 
-def breadth_first_search(problem):
-    "[Figure 3.11]"
-    node = Node(problem.initial)
-    if problem.goal_test(node.state):
-        return node
+
+def breadth_first_search(problem, checkpoint=None):
+    """[Figure 3.11]
+
+    MODIFIED FROM AIMA VERSION
+        - Optionally snapshots and resumes from a Checkpoint
+    """
     frontier = FIFOQueue()
-    frontier.append(node)
-    explored = set()
+    restored = checkpoint and checkpoint.restore(problem)
+    if restored:
+        frontier.extend(restored[0])
+        explored = restored[1]
+    else:
+        node = Node(problem.initial)
+        if problem.goal_test(node.state):
+            return node
+        frontier.append(node)
+        explored = set()
+    track_search(problem, frontier, explored)
     while frontier:
+        if checkpoint and checkpoint.due():
+            checkpoint.save(problem, frontier, explored)
         node = frontier.pop()
         explored.add(node.state)
         for child in node.expand(problem):
@@ -197,40 +405,322 @@ def breadth_first_search(problem):
     return None
 
 
-def best_first_graph_search(problem, f):
+def _bits(mask):
+    """Indices of the set bits of an int"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def bidirectional_breadth_first_search(problem):
+    """Bidirectional breadth-first search for planning problems where every action costs 1.
+
+    Searches forward from the initial state, and backward from the goal by
+    regression over partial states: pairs (pos, neg) of bitmasks over
+    problem.state_map, in the layout of problem.pack_state(), of the fluents
+    which must be true and false. Regressing a partial state through an action
+    which achieves some of it and deletes none of it gives the partial state
+    from which the action reaches it. Regressed states containing a static
+    mutex (eg. a plane at two airports) match no reachable state, so they are
+    dropped.
+
+    Each step expands a whole layer of the smaller frontier, and tests the new
+    nodes against every node reached in the other direction: a forward state
+    meets a partial state which it satisfies. The first layer with a meeting
+    holds a shortest plan, so plans are optimal. Needs a BasePlanningProblem
+    (for get_action_masks() and get_static_mutexes()).
+
+    Backward expansions are added to the succs of an InstrumentedProblem, so
+    they can be compared with breadth_first_search, and also recorded in its
+    backward_succs."""
+    masks = problem.get_action_masks()
+    size  = len(problem.state_map)
+    index = problem.fluent_index
+    adders, deleters = [[] for _ in range(size)], [[] for _ in range(size)]
+    for k, (_, _, _, add, rem) in enumerate(masks):
+        for i in _bits(add): adders[i].append(k)
+        for i in _bits(rem): deleters[i].append(k)
+
+    # conflicts[value][i][other]: fluents which can't have value other while fluent i has value
+    conflicts = { value: { other: [0] * size for other in (True, False) } for value in (True, False) }
+    for pair in problem.get_static_mutexes():
+        (i, a), (j, b) = sorted(pair)
+        conflicts[a][b][i] |= 1 << j
+        conflicts[b][a][j] |= 1 << i
+
+    def spurious(pos, neg):
+        return (any( pos & conflicts[True][True][i] or neg & conflicts[True][False][i] for i in _bits(pos) ) or
+                any( neg & conflicts[False][False][i] for i in _bits(neg) ))
+
+    root = Node(problem.initial)
+    goal = (sum( 1 << index[g] for g in problem.goal ), 0)
+    forward  = { root.state: root }
+    backward = { goal: (0, None, None) }  # partial state -> (depth, partial state it regresses, action)
+    forward_index  = [[] for _ in range(size)]  # fluent -> (packed state, node) of forward states where it is true
+    backward_index = [[] for _ in range(size + 1)]  # lowest true fluent (size for none) -> partial states
+
+    def add_forward(node):
+        packed = problem.pack_state(node.state)
+        for i in _bits(packed): forward_index[i].append((packed, node))
+        best = None
+        for i in list(_bits(packed)) + [size]:
+            for pos, neg in backward_index[i]:
+                if packed & pos == pos and not packed & neg:
+                    depth = backward[(pos, neg)][0]
+                    if best is None or depth < best[0]: best = (depth, node, (pos, neg))
+        return best
+
+    def add_backward(partial):
+        pos, neg = partial
+        backward_index[(pos & -pos).bit_length() - 1 if pos else size].append(partial)
+        if pos:
+            candidates = min(( forward_index[i] for i in _bits(pos) ), key=len)
+        else:
+            candidates = [ (problem.pack_state(node.state), node) for node in forward.values() ]
+        best = None
+        for packed, node in candidates:
+            if packed & pos == pos and not packed & neg:
+                if best is None or node.depth < best[0]: best = (node.depth, node, partial)
+        return best
+
+    def regress(partial):
+        pos, neg = partial
+        relevant = set()
+        for i in _bits(pos): relevant.update(adders[i])
+        for i in _bits(neg): relevant.update(deleters[i])
+        for k in sorted(relevant):
+            action, pre_pos, pre_neg, add, rem = masks[k]
+            if rem & pos or add & neg: continue
+            regressed = ((pos & ~add) | pre_pos, (neg & ~rem) | pre_neg)
+            if regressed[0] & regressed[1] or spurious(*regressed): continue
+            yield regressed, action
+
+    def plan(node, partial):
+        base = unwrap_problem(problem)  # the backward half was counted as it was regressed
+        while backward[partial][1] is not None:
+            _, partial, action = backward[partial]
+            node = node.child_node(base, action)
+        return node
+
+    backward_index[(goal[0] & -goal[0]).bit_length() - 1 if goal[0] else size].append(goal)
+    meeting = add_forward(root)
+    forward_layer, backward_layer = [root], [goal]
+    backward_succs = 0
+    try:
+        while meeting is None and forward_layer and backward_layer:
+            meetings = []
+            if len(forward_layer) <= len(backward_layer):
+                layer, forward_layer = forward_layer, []
+                for node in layer:
+                    for child in node.expand(problem):
+                        if child.state not in forward:
+                            forward[child.state] = child
+                            forward_layer.append(child)
+                            meetings.append(add_forward(child))
+            else:
+                layer, backward_layer = backward_layer, []
+                for partial in layer:
+                    backward_succs += 1
+                    depth = backward[partial][0] + 1
+                    for regressed, action in regress(partial):
+                        if regressed not in backward:
+                            backward[regressed] = (depth, partial, action)
+                            backward_layer.append(regressed)
+                            meetings.append(add_backward(regressed))
+            meetings = [ m for m in meetings if m is not None ]
+            if meetings:
+                meeting = min(meetings, key=lambda m: m[1].depth + backward[m[2]][0])
+        return None if meeting is None else plan(meeting[1], meeting[2])
+    finally:
+        record_peak_nodes(problem, len(forward) + len(backward))
+        record_backward_expansions(problem, backward_succs)
+
+
+_heuristic_worker = None  # (h, unpack) in HeuristicPool worker processes
+
+
+def _init_heuristic_worker(h, unpack):
+    global _heuristic_worker
+    _heuristic_worker = (h, unpack)
+
+
+def _evaluate_heuristic(batch):
+    h, unpack = _heuristic_worker
+    return [ h(Node(unpack(state))) for state in batch ]
+
+
+class HeuristicPool:
+
+    """Evaluates a heuristic for batches of nodes in a pool of worker processes.
+
+    Workers are forked with a warm copy of the problem and its heuristic
+    caches, and are sent states packed with problem.pack_state if it is
+    defined. evaluate(nodes) stores each value on its node in `slot`, where a
+    heuristic memoized on that slot (as in astar_search) will find it, so the
+    search then runs exactly as it would serially. If h keeps a heuristic
+    cache on the problem (h.heuristic_cache is set), values computed by the
+    workers are put in it, so repeated states are not sent again. h must
+    depend only on node.state."""
+
+    def __init__(self, problem, h, processes=None, slot='h', min_batch=2):
+        self.problem   = problem
+        self.name      = getattr(h, '__name__', None)
+        self.cached    = getattr(h, 'heuristic_cache', False) and hasattr(problem, 'get_heuristic_cache')
+        self.slot      = slot
+        self.min_batch = min_batch
+        self.processes = processes or os.cpu_count() or 1
+        self.pack      = getattr(problem, 'pack_state', lambda state: state)
+        unpack         = getattr(problem, 'unpack_state', lambda state: state)
+        methods        = multiprocessing.get_all_start_methods()
+        context        = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.pool      = context.Pool(self.processes, initializer=_init_heuristic_worker, initargs=(h, unpack))
+
+    def cache(self):
+        return self.problem.get_heuristic_cache(self.name) if self.cached else None
+
+    def evaluate(self, nodes):
+        cache   = self.cache()
+        pending = {}  # state -> nodes, in the order first seen
+        for node in nodes:
+            if hasattr(node, self.slot): continue
+            if cache is not None and node.state in cache:
+                setattr(node, self.slot, cache.get(node.state))
+                continue
+            pending.setdefault(node.state, []).append(node)
+        if len(pending) < self.min_batch:
+            return  # not worth a round trip: computed serially when needed
+
+        states = list(pending)
+        size   = -(-len(states) // self.processes)
+        chunks = [ states[i:i + size] for i in range(0, len(states), size) ]
+        batches = self.pool.map(_evaluate_heuristic, [ [ self.pack(state) for state in chunk ] for chunk in chunks ])
+        for chunk, values in zip(chunks, batches):
+            for state, value in zip(chunk, values):
+                for node in pending[state]: setattr(node, self.slot, value)
+                if cache is not None: cache.put(state, value)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def best_first_graph_search(problem, f, bucket=False, checkpoint=None, processes=None, evaluator=None):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+
+    MODIFIED FROM AIMA VERSION
+        - The frontier supports decrease-key (IndexedPriorityQueue, or BucketQueue
+          if bucket=True and f returns small integers) instead of pushing a
+          duplicate entry whenever a better path to a queued state is found
+        - explored maps each expanded state to its node, and a state is reopened
+          if a later path reaches it with a lower path cost and f value
+        - Peak frontier size and stale pops are recorded on an InstrumentedProblem
+        - Optionally snapshots and resumes from a Checkpoint
+        - With processes=N, the f values of the children of each expansion are
+          computed as a batch by a HeuristicPool of N workers, which requires f
+          to depend only on node.state (as in greedy best first search). The
+          search is otherwise unchanged, so it expands the same nodes in the
+          same order. evaluator is a HeuristicPool supplied by the caller.
+    """
+    if processes and evaluator is None:
+        evaluator = HeuristicPool(problem, f, processes, slot='f')
+        try:
+            return best_first_graph_search(problem, f, bucket, checkpoint, evaluator=evaluator)
+        finally:
+            evaluator.close()
     f = memoize(f, 'f')
-    node = Node(problem.initial)
-    if problem.goal_test(node.state):
-        return node
-    frontier = PriorityQueue(min, f)
-    frontier.append(node)
-    explored = set()
-    while frontier:
-        node = frontier.pop()
+    frontier = (BucketQueue if bucket else IndexedPriorityQueue)(min, f)
+    restored = checkpoint and checkpoint.restore(problem)
+    if restored:
+        frontier.extend(restored[0])
+        explored = restored[1]
+    else:
+        node = Node(problem.initial)
         if problem.goal_test(node.state):
             return node
-        explored.add(node.state)
-        for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
-                frontier.append(child)
-            elif child in frontier:
-                incumbent = frontier[child]
-                if f(child) < f(incumbent):
-                    # del frontier[incumbent]
+        frontier.append(node)
+        explored = {}
+    track_search(problem, frontier, explored)
+    try:
+        while frontier:
+            if checkpoint and checkpoint.due():
+                checkpoint.save(problem, frontier, explored)
+            node = frontier.pop()
+            if problem.goal_test(node.state):
+                return node
+            explored[node.state] = node
+            children = node.expand(problem)
+            if evaluator is not None:
+                children = list(children)
+                evaluator.evaluate([ child for child in children if child.state not in explored ])
+            for child in children:
+                closed = explored.get(child.state)
+                if closed is None:
+                    frontier.append(child)  # insert, or decrease-key if already queued
+                elif child.path_cost < closed.path_cost and f(child) < f(closed):
+                    del explored[child.state]
                     frontier.append(child)
-    return None
-
-
-def uniform_cost_search(problem):
+        return None
+    finally:
+        record_frontier_stats(problem, frontier)
+
+
+def compact_best_first_graph_search(problem, f):
+    """best_first_graph_search with the search tree stored in a NodePool.
+
+    The frontier is a heap of (f, node index) with lazy deletion, and the open
+    and closed lists map state IDs to node indices, so no Node objects are
+    kept between expansions. f is called with NodeViews, and the goal is
+    returned as a NodeView. A node which does not improve on the queued or
+    expanded node for its state is discarded from the pool immediately."""
+    pool = NodePool(problem)
+    f    = memoize(f, 'f')
+    root = pool.add(problem.initial)
+    if problem.goal_test(problem.initial):
+        return pool.view(root)
+    frontier = [(f(pool.view(root)), root)]
+    queued   = {pool.state[root]: root}  # state ID -> best queued node
+    closed   = {}                        # state ID -> expanded node
+    peak = stale_pops = 0
+    track_search(problem, queued, closed)
+    try:
+        while frontier:
+            _, i = heapq.heappop(frontier)
+            if queued.get(pool.state[i]) != i:
+                stale_pops += 1
+                continue
+            del queued[pool.state[i]]
+            state = pool.get_state(i)
+            if problem.goal_test(state):
+                return pool.view(i)
+            closed[pool.state[i]] = i
+            for action in problem.actions(state):
+                child = pool.child(i, action, state)
+                s     = pool.state[child]
+                other = queued.get(s, closed.get(s))
+                if other is not None and not (f(pool.view(child)) < pool.f[other]
+                                              and (s in queued or pool.g[child] < pool.g[other])):
+                    pool.pop()
+                    continue
+                closed.pop(s, None)
+                queued[s] = child
+                heapq.heappush(frontier, (f(pool.view(child)), child))
+            peak = max(peak, len(queued))
+        return None
+    finally:
+        record_frontier_stats(problem, SimpleNamespace(peak=peak, stale_pops=stale_pops))
+        record_peak_nodes(problem, len(pool))
+
+
+def uniform_cost_search(problem, checkpoint=None):
     "[Figure 3.14]"
-    return best_first_graph_search(problem, lambda node: node.path_cost)
+    return best_first_graph_search(problem, lambda node: node.path_cost, checkpoint=checkpoint)
 
 
 def depth_limited_search(problem, limit=50):
@@ -268,12 +758,208 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
-def astar_search(problem, h=None):
+def lazy_greedy_best_first_graph_search(problem, h=None, preferred=None, boost=1000):
+    """Greedy best-first search with deferred heuristic evaluation.
+
+    Children are queued with the heuristic value of their parent, and h is
+    only computed when a node is popped for expansion, so the many children
+    that are never expanded are never evaluated. This is what makes expensive
+    heuristics such as planning graph levelsum usable on larger problems.
+
+    preferred is an optional function preferred(node) returning the subset of
+    actions in node.state that look helpful (True uses problem.preferred_actions).
+    Children reached by preferred actions are also pushed to a second queue;
+    expansions alternate between the two queues, and the preferred queue gets
+    the next `boost` turns each time a new best h value is found.
+    """
+    h = memoize(h or problem.h, 'h')
+    if preferred is True:
+        preferred = problem.preferred_actions
+
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
+        return node
+    parent_h = lambda n: n.parent.h if n.parent else 0
+    queues   = [IndexedPriorityQueue(min, parent_h)]
+    if preferred:
+        queues.append(IndexedPriorityQueue(min, parent_h))
+    queues[0].append(node)
+    explored = set()
+    best_h   = infinity
+    boosted  = 0
+    turn     = 0
+    try:
+        while any(queues):
+            if boosted and queues[-1]:
+                queue    = queues[-1]
+                boosted -= 1
+            else:
+                turn  = (turn + 1) % len(queues)
+                queue = queues[turn] if queues[turn] else queues[1 - turn]
+            node = queue.pop()
+            if node.state in explored:
+                queue.stale_pops += 1  # already expanded from the other queue
+                continue
+            if problem.goal_test(node.state):
+                return node
+            explored.add(node.state)
+
+            value = h(node)
+            if value == infinity:
+                continue
+            if value < best_h:
+                best_h = value
+                if preferred: boosted += boost
+
+            helpful = set(preferred(node)) if preferred else ()
+            for child in node.expand(problem):
+                if child.state in explored: continue
+                queues[0].append(child)
+                if child.action in helpful:
+                    queues[-1].append(child)
+        return None
+    finally:
+        for queue in queues:
+            record_frontier_stats(problem, queue)
+
+
+def alternation_search(problem, heuristics=None, boost=0, lazy=True):
+    """Greedy best-first search with one open list per heuristic [Roger & Helmert 2010].
+
+    Expansions take turns between the open lists, each ordered by its own
+    heuristic, so a cheap heuristic and an informative one can each make
+    progress where the other is stuck on a plateau. As in
+    lazy_greedy_best_first_graph_search, children are queued in every list with
+    their parent's values, and a node's heuristics are only computed when it is
+    popped (heuristics with a cache on the problem also keep them by state).
+    lazy=False computes them when children are generated and queues each child
+    with its own values, which takes fewer expansions but evaluates every child.
+
+    If boost > 0, a heuristic which reaches a new best value gets its open list
+    the next `boost` expansions (adding to any turns it had left), so the
+    search follows whichever heuristic is currently making progress.
+    """
+    heuristics = list(heuristics or [problem.h])
+    hs = memoize(lambda n: [ h(n) for h in heuristics ], 'hs')
+
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
+        return node
+    queues = [
+        IndexedPriorityQueue(min, (lambda n, i=i: n.parent.hs[i] if n.parent else 0) if lazy else
+                                  (lambda n, i=i: hs(n)[i]))
+        for i in range(len(heuristics))
+    ]
+    for queue in queues: queue.append(node)
+    explored = set()
+    best_h   = [infinity] * len(heuristics)
+    boosted  = [0] * len(heuristics)
+    turn     = 0
+    try:
+        while any(queues):
+            boosts = [ i for i in range(len(queues)) if boosted[i] and queues[i] ]
+            if boosts:
+                turn = max(boosts, key=lambda i: boosted[i])
+                boosted[turn] -= 1
+            else:
+                turn = next( (turn + k) % len(queues) for k in range(1, len(queues) + 1) if queues[(turn + k) % len(queues)] )
+            node = queues[turn].pop()
+            if node.state in explored:
+                queues[turn].stale_pops += 1  # already expanded from another queue
+                continue
+            if problem.goal_test(node.state):
+                return node
+            explored.add(node.state)
+
+            values = hs(node)
+            if infinity in values:
+                continue  # a dead end for any heuristic is a dead end
+            for i, value in enumerate(values):
+                if value < best_h[i]:
+                    best_h[i] = value
+                    boosted[i] += boost
+
+            for child in node.expand(problem):
+                if child.state in explored: continue
+                if not lazy and infinity in hs(child): continue
+                for queue in queues: queue.append(child)
+        return None
+    finally:
+        for queue in queues:
+            record_frontier_stats(problem, queue)
+
+
+def astar_search(problem, h=None, bucket=False, compact=False, checkpoint=None, processes=None):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
+    else in your Problem subclass. compact=True stores the search tree in
+    a NodePool (see compact_best_first_graph_search). processes=N evaluates
+    h for the children of each expansion in a HeuristicPool of N workers."""
+    evaluator = HeuristicPool(problem, h or problem.h, processes, slot='h') if processes and not compact else None
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n))
+    if compact:
+        return compact_best_first_graph_search(problem, lambda n: n.path_cost + h(n))
+    try:
+        return best_first_graph_search(problem, lambda n: n.path_cost + h(n), bucket=bucket, checkpoint=checkpoint,
+                                       evaluator=evaluator)
+    finally:
+        if evaluator is not None: evaluator.close()
+
+
+def anytime_weighted_astar_search(problem, h=None, weights=(5, 3, 2, 1.5, 1), restart=False, time_budget=None):
+    """Anytime weighted A*: a generator of (node, cost, elapsed seconds) for
+    each improved solution, best last.
+
+    Search starts with f(n) = g(n) + w*h(n) for the first of weights, and
+    moves on to the next weight after each solution. The open and closed
+    lists are kept between solutions (the open list is just re-ordered for
+    the new weight), unless restart=True, which starts again from the
+    initial state as in Restarting Weighted A* [Richter et al 2010]. Any node
+    with g(n) + h(n) no better than the incumbent cost is pruned, so once the
+    open list is empty the last solution is optimal for an admissible h.
+    Stops early, without proving optimality, after time_budget seconds."""
+    h       = memoize(h or problem.h, 'h')
+    weights = list(weights)
+    weight  = weights.pop(0)
+    start   = time.perf_counter()
+    bound   = infinity
+
+    def f(n):
+        return n.path_cost + weight * h(n)
+
+    def restart_frontier():
+        frontier = IndexedPriorityQueue(min, f)
+        frontier.append(Node(problem.initial))
+        return frontier
+
+    frontier = restart_frontier()
+    closed   = {}  # state -> lowest path cost expanded
+    try:
+        while frontier:
+            if time_budget is not None and time.perf_counter() - start > time_budget:
+                return
+            node = frontier.pop()
+            if node.path_cost + h(node) >= bound:
+                continue
+            if problem.goal_test(node.state):
+                bound = node.path_cost
+                yield node, bound, time.perf_counter() - start
+                if weights: weight = weights.pop(0)
+                record_frontier_stats(problem, frontier)
+                if restart:
+                    frontier, closed = restart_frontier(), {}
+                else:
+                    queued   = [item for _, item in frontier.A]
+                    frontier = IndexedPriorityQueue(min, f)
+                    frontier.extend(queued)
+                continue
+            closed[node.state] = node.path_cost
+            for child in node.expand(problem):
+                if child.path_cost >= closed.get(child.state, infinity): continue
+                if child.path_cost + h(child) >= bound: continue
+                frontier.append(child)  # replaces a queued node for the same state only if child is cheaper
+    finally:
+        record_frontier_stats(problem, frontier)
 
 # ______________________________________________________________________________
 # Other search algorithms
@@ -286,7 +972,7 @@ def recursive_best_first_search(problem, h=None):
     def RBFS(problem, node, flimit):
         if problem.goal_test(node.state):
             return node, 0   # (The second value is immaterial)
-        successors = node.expand(problem)
+        successors = list(node.expand(problem))
         if len(successors) == 0:
             return None, infinity
         for s in successors:
@@ -310,6 +996,352 @@ def recursive_best_first_search(problem, h=None):
     result, bestf = RBFS(problem, node, infinity)
     return result
 
+
+def iterative_deepening_astar_search(problem, h=None, table_size=2**20):
+    """Iterative deepening A* (IDA*) with a bounded transposition table.
+
+    Each iteration is a depth-first search bounded by f = g + h <= threshold,
+    and the next threshold is the smallest f that exceeded the last one, so
+    memory is linear in the solution depth plus the table. The table maps each
+    state to [h, g, iteration]: it caches h across iterations, raises h to the
+    backed-up value of a subtree that failed, and prunes a state reached again
+    within one iteration by a path that is no cheaper. Once table_size states
+    are stored, new states are searched without a table entry."""
+    return _iterative_deepening(problem, memoize(h or problem.h, 'h'), lambda node: node.path_cost, table_size)
+
+
+def iterative_deepening_depth_first_search(problem, table_size=2**20):
+    """Iterative deepening depth-first search with a bounded transposition table.
+
+    Like iterative_deepening_search, each iteration is a depth-first search
+    one level deeper than the last, so the first solution found is a
+    shallowest one. Instead of repeating every earlier iteration from scratch,
+    it keeps the table of iterative_deepening_astar_search between iterations,
+    with node depth in place of path cost and h = 0: a state whose subtree
+    had no goal within k more steps is skipped until the depth limit leaves
+    more than k steps below it, and a state reached again within one iteration
+    at no shallower depth is pruned."""
+    return _iterative_deepening(problem, lambda node: 0, lambda node: node.depth, table_size)
+
+
+def _iterative_deepening(problem, h, g, table_size):
+    """The search of iterative_deepening_astar_search, bounding f = g(node) + h(node)"""
+    table = {}
+    peak  = [0]
+
+    def search(node, threshold, iteration, path):
+        entry = table.get(node.state)
+        if entry is None:
+            entry = [h(node), g(node), iteration]
+            if len(table) < table_size:
+                table[node.state] = entry
+        elif entry[2] == iteration and entry[1] <= g(node):
+            return None, infinity, True
+        else:
+            entry[1], entry[2] = g(node), iteration
+
+        f = g(node) + entry[0]
+        if f > threshold:
+            return None, f, False
+        if problem.goal_test(node.state):
+            return node, f, False
+        peak[0] = max(peak[0], len(table) + len(path))
+
+        minimum, pruned = infinity, False
+        for child in node.expand(problem):
+            if child.state in path:
+                pruned = True
+                continue
+            path.add(child.state)
+            found, child_f, child_pruned = search(child, threshold, iteration, path)
+            path.discard(child.state)
+            if found is not None:
+                return found, child_f, False
+            minimum = min(minimum, child_f)
+            pruned  = pruned or child_pruned
+        if not pruned:
+            # every path below node costs at least minimum, which is a better h on the next iteration
+            entry[0] = max(entry[0], minimum - g(node))
+        return None, minimum, pruned
+
+    root = Node(problem.initial)
+    threshold = h(root)
+    try:
+        for iteration in range(1, sys.maxsize):
+            found, threshold, _ = search(root, threshold, iteration, {root.state})
+            if found is not None or threshold == infinity:
+                return found
+    finally:
+        record_peak_nodes(problem, peak[0])
+
+
+def simplified_memory_bounded_astar_search(problem, h=None, max_nodes=10000):
+    """SMA*: A* which keeps at most max_nodes nodes in memory.
+
+    When memory is full the worst leaf (highest f, shallowest on ties) is
+    forgotten, and its f value is backed up into its parent. A parent whose
+    children have all been forgotten becomes a leaf again with the best
+    forgotten f value, and regenerated children keep their backed-up values.
+    Returns the optimal solution if its path fits in memory, and None if no
+    solution is reachable within the memory bound. Memory is checked after
+    each expansion, so the peak may exceed max_nodes by one set of children.
+    [Russell 1992]"""
+    h = memoize(h or problem.h, 'h')
+    best, worst = [], []  # heaps of leaves with lazy deletion, checked against node.version
+    counter = itertools.count()
+
+    def push(node):
+        node.version = next(counter)
+        heapq.heappush(best,  (node.f, -node.depth, node.version, node))
+        heapq.heappush(worst, (-node.f, node.depth, node.version, node))
+
+    def pop(heap):
+        while heap:
+            entry = heapq.heappop(heap)
+            node  = entry[-1]
+            if node.version == entry[2]:
+                node.version = None
+                return node
+        return None
+
+    root = Node(problem.initial)
+    root.f, root.children, root.forgotten = h(root), set(), {}
+    push(root)
+    used = peak = 1
+    try:
+        while True:
+            node = pop(best)
+            if node is None or node.f == infinity:
+                return None
+            if problem.goal_test(node.state):
+                return node
+
+            ancestors = { n.state for n in node.path() }
+            for child in node.expand(problem):
+                if child.state in ancestors: continue
+                if child.depth >= max_nodes - 1 and not problem.goal_test(child.state):
+                    child.f = infinity  # the path to any solution below child can't fit in memory
+                else:
+                    child.f = max(node.f, child.path_cost + h(child))
+                child.f = max(child.f, node.forgotten.get(child.state, child.f))
+                child.children, child.forgotten = set(), {}
+                node.children.add(child)
+                push(child)
+            node.forgotten = {}
+            used += len(node.children)
+            if not node.children:
+                node.f = infinity  # dead end, will be forgotten first
+                push(node)
+            peak = max(peak, used)
+
+            while used > max_nodes:
+                leaf = pop(worst)
+                if leaf is None: break
+                if leaf.parent is None:
+                    push(leaf)
+                    break
+                parent = leaf.parent
+                parent.children.discard(leaf)
+                parent.forgotten[leaf.state] = leaf.f
+                used -= 1
+                if not parent.children:
+                    parent.f = min(parent.forgotten.values())
+                    push(parent)
+    finally:
+        record_peak_nodes(problem, peak)
+
+# ______________________________________________________________________________
+# Checkpointing
+
+
+class Checkpoint:
+
+    """Snapshot a running search to disk every `interval` seconds, so that it
+    can be resumed after the process is killed.
+
+    A snapshot holds the frontier (and for best_first_graph_search, the
+    explored nodes) together with their ancestors, as parallel arrays of
+    packed state, parent index, action index, path cost and f value, plus the
+    explored states and the InstrumentedProblem counters. States are packed
+    into fixed width bytes with problem.pack_state, and actions are stored as
+    indices into problem.actions_list, when the problem defines them.
+
+    Snapshots are written by a forked child process from a copy-on-write
+    image of the search, so the search only pauses for the fork (or writes
+    inline where fork is unavailable). The file is replaced atomically, so a
+    kill during a write leaves the previous snapshot intact. A writer which
+    fails prints its traceback, and the failure is counted in failures and
+    reported with a RuntimeWarning once the writer has been reaped.
+
+    With resume=True, a search restores itself from path if it exists, then
+    carries on writing snapshots to it. label is stored in the snapshot and
+    checked on restore, along with problem.signature() if the problem has one.
+    """
+
+    version = 1
+
+    def __init__(self, path, interval=300, resume=False, label=''):
+        self.path     = path
+        self.interval = interval
+        self.resume   = resume
+        self.label    = label
+        self.last     = time.monotonic()
+        self.writer   = None  # pid of the forked writer
+        self.saves    = 0
+        self.failures = 0     # snapshots whose writer failed
+
+    def due(self):
+        self._reap(block=False)
+        return self.writer is None and time.monotonic() - self.last >= self.interval
+
+    def save(self, problem, frontier, explored):
+        """Snapshot frontier (an iterable of Nodes) and explored (a set of
+        states, or a dict of state -> Node) in the background."""
+        self.last   = time.monotonic()
+        self.saves += 1
+        if not hasattr(os, 'fork'):
+            self.write(problem, frontier, explored)
+            return
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                self.write(problem, frontier, explored)
+                status = 0
+            except BaseException:
+                traceback.print_exc()
+                sys.stderr.flush()
+            finally:
+                os._exit(status)
+        self.writer = pid
+
+    def close(self):
+        """Wait for any snapshot still being written."""
+        self._reap(block=True)
+
+    def _reap(self, block):
+        if self.writer is not None:
+            pid, status = os.waitpid(self.writer, 0 if block else os.WNOHANG)
+            if not pid: return
+            self.writer = None
+            if os.WIFSIGNALED(status):
+                reason = "killed by signal {}".format(os.WTERMSIG(status))
+            elif os.WEXITSTATUS(status):
+                reason = "exit status {}".format(os.WEXITSTATUS(status))
+            else:
+                return
+            self.failures += 1
+            warnings.warn("snapshot to {} failed ({}), the previous snapshot is kept".format(self.path, reason),
+                          RuntimeWarning)
+
+    def write(self, problem, frontier, explored):
+        codec = _StateCodec(problem)
+        nodes, index = [], {}
+
+        def number(node):
+            # ancestors are numbered before their children, so parents can be rebuilt first
+            chain = []
+            while node is not None and id(node) not in index:
+                chain.append(node)
+                node = node.parent
+            for node in reversed(chain):
+                index[id(node)] = len(nodes)
+                nodes.append(node)
+            return index[id(chain[0])] if chain else index[id(node)]
+
+        frontier_ids = array('i', (number(node) for node in frontier))
+        if isinstance(explored, dict):
+            explored_ids, explored_states = array('i', (number(node) for node in explored.values())), None
+        else:
+            explored_ids, explored_states = array('i'), codec.encode(explored)
+
+        data = {
+            'version':   self.version,
+            'label':     self.label,
+            'signature': _signature(problem),
+            'counters':  [getattr(problem, attr, 0) for attr in ('succs', 'goal_tests', 'states')],
+            'states':    codec.encode(node.state for node in nodes),
+            'parent':    array('i', (index[id(node.parent)] if node.parent else -1 for node in nodes)),
+            'action':    array('i', (codec.action_id(node.action) for node in nodes)),
+            'g':         array('d', (node.path_cost for node in nodes)),
+            'f':         array('d', (getattr(node, 'f', float('nan')) for node in nodes)),
+            'frontier':  frontier_ids,
+            'explored':  explored_ids,
+            'explored_states': explored_states,
+            'actions':   codec.actions,
+        }
+        with open(self.path + '.tmp', 'wb') as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+
+    def restore(self, problem):
+        """Returns (frontier nodes, explored) from the snapshot at path, or None
+        if not resuming or there is no snapshot. explored is a dict of
+        state -> Node if the search that saved it used one, else a set of states."""
+        if not self.resume or not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as file:
+            data = pickle.load(file)
+        if data['version'] != self.version or data['label'] != self.label \
+                or data['signature'] != _signature(problem):
+            raise ValueError("checkpoint {} is from a different search or problem".format(self.path))
+
+        codec = _StateCodec(problem, data['actions'])
+        nodes = []
+        for state, parent, action, g, f in zip(codec.decode(data['states']), data['parent'],
+                                               data['action'], data['g'], data['f']):
+            node = Node(state, nodes[parent] if parent >= 0 else None, codec.table[action], g)
+            if f == f: node.f = f
+            nodes.append(node)
+        if isinstance(problem, InstrumentedProblem):
+            problem.succs, problem.goal_tests, problem.states = data['counters']
+
+        frontier = [nodes[i] for i in data['frontier']]
+        if data['explored_states'] is not None:
+            explored = set(codec.decode(data['explored_states']))
+        else:
+            explored = {nodes[i].state: nodes[i] for i in data['explored']}
+        return frontier, explored
+
+
+def _signature(problem):
+    return problem.signature() if hasattr(problem, 'signature') else None
+
+
+class _StateCodec:
+
+    """Encode states as fixed width packed bytes, and actions as indices into
+    problem.actions_list, when the problem supports them."""
+
+    def __init__(self, problem, actions=None):
+        self.pack   = getattr(problem, 'pack_state', None)
+        self.unpack = getattr(problem, 'unpack_state', None)
+        self.width  = (len(problem.state_map) + 7) // 8 if self.pack else 0
+        listed      = getattr(problem, 'actions_list', None)
+        self.listed = listed is not None
+        self.table  = [None] + list(listed) if self.listed else list(actions or [None])
+        self.ids    = {id(action): i for i, action in enumerate(self.table)}
+
+    @property
+    def actions(self):
+        "The action table to store in a snapshot, if it can't be rebuilt from problem.actions_list"
+        return None if self.listed else self.table
+
+    def action_id(self, action):
+        if id(action) not in self.ids:
+            self.ids[id(action)] = len(self.table)
+            self.table.append(action)
+        return self.ids[id(action)]
+
+    def encode(self, states):
+        if not self.pack: return pickle.dumps(list(states))
+        return b''.join(self.pack(state).to_bytes(self.width, 'little') for state in states)
+
+    def decode(self, data):
+        if not self.pack: return pickle.loads(data)
+        return [self.unpack(int.from_bytes(data[i:i + self.width], 'little'))
+                for i in range(0, len(data), self.width)]
+
 # ______________________________________________________________________________
 
 # Code to compare searchers on various problems.
@@ -319,10 +1351,20 @@ class InstrumentedProblem(Problem):
 
     """Delegates to a problem, and keeps statistics."""
 
-    def __init__(self, problem):
+    def __init__(self, problem, telemetry=None):
         self.problem = problem
         self.succs = self.goal_tests = self.states = 0
+        self.max_frontier = self.stale_pops = 0
+        self.peak_nodes = 0
+        self.pruned_actions = self.applicable_actions = 0
+        self.backward_succs = 0
         self.found = None
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.attach(self)
+            # time calls through telemetry by shadowing the methods on this instance
+            for name in ('actions', 'result', 'goal_test'):
+                setattr(self, name, telemetry.timer(name).wrap(getattr(self, name)))
 
     def actions(self, state):
         self.succs += 1
@@ -353,6 +1395,46 @@ class InstrumentedProblem(Problem):
                                      self.states, str(self.found)[:4])
 
 
+def unwrap_problem(problem):
+    """The problem inside any InstrumentedProblem wrappers, to replay a plan without counting it in the statistics"""
+    while isinstance(problem, InstrumentedProblem):
+        problem = problem.problem
+    return problem
+
+
+def record_frontier_stats(problem, frontier):
+    """Copy the peak size and stale pop count of a frontier onto an InstrumentedProblem"""
+    if isinstance(problem, InstrumentedProblem):
+        problem.max_frontier = max(problem.max_frontier, frontier.peak if hasattr(frontier, 'peak') else len(frontier))
+        problem.stale_pops  += getattr(frontier, 'stale_pops', 0)
+
+
+def track_search(problem, frontier, explored):
+    """Let an InstrumentedProblem's telemetry sample the sizes of a search's frontier and explored set"""
+    if isinstance(problem, InstrumentedProblem) and problem.telemetry is not None:
+        problem.telemetry.track(frontier, explored)
+
+
+def record_peak_nodes(problem, nodes):
+    """Record the peak number of nodes held in memory on an InstrumentedProblem"""
+    if isinstance(problem, InstrumentedProblem):
+        problem.peak_nodes = max(problem.peak_nodes, nodes)
+
+
+def record_pruned_actions(problem, pruned, applicable):
+    """Record how many of the applicable actions a reduction pruned on an InstrumentedProblem"""
+    if isinstance(problem, InstrumentedProblem):
+        problem.pruned_actions     += pruned
+        problem.applicable_actions += applicable
+
+
+def record_backward_expansions(problem, expansions):
+    """Count the expansions of a backward search in the succs of an InstrumentedProblem"""
+    if isinstance(problem, InstrumentedProblem):
+        problem.succs          += expansions
+        problem.backward_succs += expansions
+
+
 def compare_searchers(problems, header,
                       searchers=[breadth_first_tree_search,
                                  breadth_first_search,
@@ -7,6 +7,8 @@ import operator
 import os.path
 import random
 import math
+import itertools
+import weakref
 
 import heapq
 from functools import lru_cache
@@ -142,16 +144,74 @@ class Expr(object):
     """A mathematical expression with an operator and 0 or more arguments.
     op is a str like '+' or 'sin'; args are Expressions.
     Expr('x') or Symbol('x') creates a symbol (a nullary Expr).
-    Expr('-', x) creates a unary; Expr('+', x, 1) creates a binary."""
-    __slots__ = ["op", "args", "__hash"]
-    def __init__(self, op, *args):
+    Expr('-', x) creates a unary; Expr('+', x, 1) creates a binary.
+
+    MODIFIED FROM AIMA VERSION
+        - Hash-consing: while Expr.interning is True (the default) a new
+          expression returns the live instance with the same op and args of
+          the same types, so the hash is only computed once per distinct
+          expression. The intern table holds weak references, so expressions
+          nobody uses any more are still garbage collected
+        - Expressions built only from interned expressions (eg. the literals
+          of a planning problem) compare with an identity test
+        - ~expr is cached on the instance, so the planning graph mutex tests
+          don't allocate a new Expr("~", expr) on every call
+        - Expressions with other arguments (eg. numbers, so that Expr('+', x, 1)
+          == Expr('+', x, 1.0) as before), created while interning is off,
+          or before the last Expr.clear_intern_table() compare structurally
+    """
+    __slots__ = ["op", "args", "__hash", "_negation", "_generation", "__weakref__"]
+    interning     = True
+    _intern_table = weakref.WeakValueDictionary()  # key(op, args) -> Expr
+    _table_generation = 1  # replaced by clear_intern_table(), 0 = compared structurally
+    _generations  = itertools.count(2)
+
+    def __new__(cls, op, *args):
+        if cls.interning:
+            generation = cls._table_generation
+            exact = True
+            for arg in args:
+                if type(arg) is not Expr or arg._generation != generation:
+                    exact = False
+                    break
+            if exact:
+                key = (op,) + args  # == is identity for these args
+            else:
+                # keyed by type, and Expr args by identity, so that eg. 1 and True aren't merged by ==
+                key = (op, tuple(map(type, args))) + tuple( id(arg) if isinstance(arg, Expr) else arg for arg in args )
+            self = cls._intern_table.get(key)
+            if self is not None:
+                return self
+        self = object.__new__(cls)
         self.op = op
         self.args = args
-        self.__hash = hash(self.op) ^ hash(self.args)
+        self.__hash = hash(op) ^ hash(args)
+        self._negation = None
+        self._generation = 0
+        if cls.interning:
+            if exact: self._generation = generation
+            cls._intern_table[key] = self
+        return self
+
+    @classmethod
+    def clear_intern_table(cls):
+        """Release all interned expressions. Existing instances remain valid,
+        but compare structurally with expressions interned afterwards."""
+        Expr._intern_table = weakref.WeakValueDictionary()
+        Expr._table_generation = next(Expr._generations)
+
+    def __reduce__(self):
+        # __new__ requires op, and unpickling re-interns the expression
+        return (Expr, (self.op,) + self.args)
 
     def __eq__(self, other):
-        return (isinstance(other, Expr)
-                and self.op == other.op
+        if self is other:
+            return True
+        if not isinstance(other, Expr):
+            return False
+        if self._generation and self._generation == other._generation:
+            return False  # both interned in the same table, so structurally different
+        return (self.op == other.op
                 and self.args == other.args)
 
     def __hash__(self): return self.__hash
@@ -159,7 +219,11 @@ class Expr(object):
     # custom unary operator overloads to handle 
     def __pos__(self): return self
     def __neg__(self): return self.args[0] if '-' == self.op else Expr("-", self)
-    def __invert__(self): return self.args[0] if '~' == self.op else Expr("~", self)
+    def __invert__(self):
+        if '~' == self.op: return self.args[0]
+        if self._negation is None:
+            self._negation = Expr("~", self)
+        return self._negation
 
     # Operator overloads
     # def __neg__(self): return Expr('-', self)
@@ -299,7 +363,7 @@ class defaultkeydict(collections.defaultdict):
 
 
 # ______________________________________________________________________________
-# Queues: Stack, FIFOQueue, PriorityQueue
+# Queues: Stack, LIFOQueue, FIFOQueue, PriorityQueue, IndexedPriorityQueue, BucketQueue
 
 
 class Queue:
@@ -329,6 +393,45 @@ def Stack():
     return []
 
 
+class LIFOQueue(Queue):
+    """A Last-In-First-Out Queue with constant time membership tests
+
+    Stack() is a plain list, so `item in stack` scans the whole stack. Items
+    are also counted in a multiset (equal items, eg. Nodes with the same
+    state, share a count), so membership is a dict lookup, and an item pushed
+    twice stays in the queue until both copies are popped.
+        q.peak -- largest number of items held at once
+    """
+    def __init__(self):
+        self.A      = []
+        self.counts = Counter()
+        self.peak   = 0
+
+    def append(self, item):
+        self.A.append(item)
+        self.counts[item] += 1
+        if len(self.A) > self.peak:
+            self.peak = len(self.A)
+
+    def __len__(self):
+        return len(self.A)
+
+    def __iter__(self):
+        return iter(self.A)
+
+    def pop(self):
+        item  = self.A.pop()
+        count = self.counts[item] - 1
+        if count:
+            self.counts[item] = count
+        else:
+            del self.counts[item]
+        return item
+
+    def __contains__(self, item):
+        return item in self.counts
+
+
 class FIFOQueue(Queue):
     """A First-In-First-Out Queue implemented with collections.deque
     
@@ -347,6 +450,9 @@ class FIFOQueue(Queue):
     def __len__(self):
         return len(self.A)
 
+    def __iter__(self):
+        return iter(self.A)
+
     def pop(self):
         key = self.A.popleft()
         self.__keys.discard(key)
@@ -389,6 +495,165 @@ class PriorityQueue(Queue):
         if self._A[key] > 0:
             return key
 
+
+class IndexedPriorityQueue(Queue):
+    """A binary heap with a position index for each item, supporting decrease-key.
+
+    Items are matched by equality, so for search Nodes a second node with the
+    same state replaces the queued one if (and only if) it has a lower f value,
+    rather than adding a duplicate entry. Ties are broken by item order, as
+    in PriorityQueue.
+        q.append(item)  -- insert item, or decrease-key if an equal item is queued
+        q[item]         -- the queued item equal to item
+        del q[item]     -- remove an arbitrary item
+        q.peak          -- largest number of items held at once
+    """
+
+    def __init__(self, order=None, f=lambda x: x):
+        self.A     = []  # heap of (f, item)
+        self.index = {}  # item -> position in self.A
+        self.f     = f
+        self.peak  = 0
+        self.stale_pops = 0  # decrease-key leaves no stale entries, but callers may count skipped items
+
+    def append(self, item):
+        priority = self.f(item)
+        if item in self.index:
+            i = self.index[item]
+            if priority < self.A[i][0]:
+                self.A[i] = (priority, item)
+                self._siftdown(i)
+            return
+        self.A.append((priority, item))
+        self.index[item] = len(self.A) - 1
+        self._siftdown(len(self.A) - 1)
+        self.peak = max(self.peak, len(self.A))
+
+    def __len__(self):
+        return len(self.A)
+
+    def __iter__(self):
+        return (item for _, item in self.A)
+
+    def pop(self):
+        return self._remove(0)
+
+    def __contains__(self, item):
+        return item in self.index
+
+    def __getitem__(self, key):
+        if key in self.index:
+            return self.A[self.index[key]][1]
+
+    def __delitem__(self, key):
+        self._remove(self.index[key])
+
+    def _remove(self, i):
+        last = self.A.pop()
+        if i == len(self.A):
+            del self.index[last[1]]
+            return last[1]
+        _, item = self.A[i]
+        del self.index[item]
+        self.A[i] = last
+        self.index[last[1]] = i
+        self._siftup(i)
+        self._siftdown(self.index[last[1]])
+        return item
+
+    # heapq naming: _siftdown moves an entry towards the root, _siftup towards the leaves
+    def _siftdown(self, i):
+        A, index = self.A, self.index
+        entry = A[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not entry < A[parent]: break
+            A[i] = A[parent]
+            index[A[i][1]] = i
+            i = parent
+        A[i] = entry
+        index[entry[1]] = i
+
+    def _siftup(self, i):
+        A, index = self.A, self.index
+        size  = len(A)
+        entry = A[i]
+        while True:
+            child = 2 * i + 1
+            if child >= size: break
+            if child + 1 < size and A[child + 1] < A[child]:
+                child += 1
+            if not A[child] < entry: break
+            A[i] = A[child]
+            index[A[i][1]] = i
+            i = child
+        A[i] = entry
+        index[entry[1]] = i
+
+
+class BucketQueue(Queue):
+    """A priority queue for small integer f values, with one LIFO bucket per value.
+
+    Decrease-key is done by lazy deletion: the superseded entry is left in its
+    bucket and skipped when it reaches the top, which is counted in stale_pops.
+    Ties within a bucket are broken last-in-first-out (deepest node first for A*).
+    Otherwise it has the interface of IndexedPriorityQueue:
+        q.append(item)  -- insert item, or decrease-key if an equal item is queued
+        q[item]         -- the queued item equal to item
+        del q[item]     -- remove an arbitrary item (its entry goes stale)
+        q.peak          -- largest number of items held at once
+    """
+
+    def __init__(self, order=None, f=lambda x: x):
+        self.buckets = defaultdict(list)  # f -> [item]
+        self.levels  = []                 # heap of f values with a non-empty bucket
+        self.best    = {}                 # item -> (f, item) of the live entry
+        self.f       = f
+        self.peak    = 0
+        self.stale_pops = 0
+
+    def append(self, item):
+        priority = self.f(item)
+        if item in self.best:
+            if priority >= self.best[item][0]: return
+            del self.best[item]  # the old entry becomes stale
+        self.best[item] = (priority, item)
+        if priority not in self.buckets:
+            heapq.heappush(self.levels, priority)
+        self.buckets[priority].append(item)
+        self.peak = max(self.peak, len(self.best))
+
+    def __len__(self):
+        return len(self.best)
+
+    def __iter__(self):
+        return (item for _, item in self.best.values())
+
+    def pop(self):
+        while self.levels:
+            priority = self.levels[0]
+            bucket   = self.buckets[priority]
+            item     = bucket.pop()
+            if not bucket:
+                heapq.heappop(self.levels)
+                del self.buckets[priority]
+            entry = self.best.get(item)
+            if entry is not None and entry[1] is item and entry[0] == priority:
+                del self.best[item]
+                return item
+            self.stale_pops += 1
+        raise IndexError('pop from empty BucketQueue')
+
+    def __contains__(self, item):
+        return item in self.best
+
+    def __getitem__(self, key):
+        if key in self.best:
+            return self.best[key][1]
+
+    def __delitem__(self, key):
+        del self.best[key]
+
 # ______________________________________________________________________________
 # Useful Shorthands
 
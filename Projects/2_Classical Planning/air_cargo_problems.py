@@ -1,4 +1,6 @@
 
+import random
+
 from aimacode.planning import Action
 from aimacode.utils import expr
 from _utils import (
@@ -54,6 +56,12 @@ class AirCargoProblem(BasePlanningProblem):
             list of Action objects
         """
 
+        # Literals are built directly from the problem's LiteralTable rather than
+        # parsed from strings with expr(), which dominates grounding time on large
+        # instances, and are the same objects as the fluents in self.state_map
+        literal = self.literals.literal
+        action  = self.literals.expr
+
         def load_actions():
             """ Create all concrete Load actions
 
@@ -65,13 +73,13 @@ class AirCargoProblem(BasePlanningProblem):
             for c in self.cargos:
                 for p in self.planes:
                     for a in self.airports:
-                        precond_pos = set([expr("At({}, {})".format(c, a)),
-                                       expr("At({}, {})".format(p, a))
+                        precond_pos = set([literal('At', c, a),
+                                       literal('At', p, a)
                                        ])
                         precond_neg = set([])
-                        effect_add = set([expr("In({}, {})".format(c, p))])
-                        effect_rem = set([expr("At({}, {})".format(c, a))])
-                        load = Action(expr("Load({}, {}, {})".format(c, p, a)),
+                        effect_add = set([literal('In', c, p)])
+                        effect_rem = set([literal('At', c, a)])
+                        load = Action(action('Load', c, p, a),
                                       [precond_pos, precond_neg],
                                       [effect_add, effect_rem])
                         loads.append(load)
@@ -88,13 +96,13 @@ class AirCargoProblem(BasePlanningProblem):
             for c in self.cargos:
                 for p in self.planes:
                     for a in self.airports:
-                        precond_pos = set([expr("In({}, {})".format(c, p)),
-                                       expr("At({}, {})".format(p, a)),
+                        precond_pos = set([literal('In', c, p),
+                                       literal('At', p, a),
                                        ])
                         precond_neg = set([])
-                        effect_add = set([expr("At({}, {})".format(c, a))])
-                        effect_rem = set([expr("In({}, {})".format(c, p))])
-                        unload = Action(expr("Unload({}, {}, {})".format(c, p, a)),
+                        effect_add = set([literal('At', c, a)])
+                        effect_rem = set([literal('In', c, p)])
+                        unload = Action(action('Unload', c, p, a),
                                       [precond_pos, precond_neg],
                                       [effect_add, effect_rem])
                         unloads.append(unload)
@@ -112,12 +120,12 @@ class AirCargoProblem(BasePlanningProblem):
                 for to in self.airports:
                     if fr != to:
                         for p in self.planes:
-                            precond_pos = set([expr("At({}, {})".format(p, fr)),
+                            precond_pos = set([literal('At', p, fr),
                                            ])
                             precond_neg = set([])
-                            effect_add = set([expr("At({}, {})".format(p, to))])
-                            effect_rem = set([expr("At({}, {})".format(p, fr))])
-                            fly = Action(expr("Fly({}, {}, {})".format(p, fr, to)),
+                            effect_add = set([literal('At', p, to)])
+                            effect_rem = set([literal('At', p, fr)])
+                            fly = Action(action('Fly', p, fr, to),
                                          [precond_pos, precond_neg],
                                          [effect_add, effect_rem])
                             flys.append(fly)
@@ -199,3 +207,47 @@ def air_cargo_p4():
     init = FluentState(pos, [r for r in at_relations + in_relations if r not in pos])
     goal = create_expressions(['At(C1, JFK)', 'At(C2, SFO)', 'At(C3, JFK)', 'At(C4, SFO)', 'At(C5, JFK)'])
     return AirCargoProblem(cargos, planes, airports, init, goal)
+
+
+def air_cargo_random(n_cargos, n_planes, n_airports, seed=None, n_goals=None):
+    """ Generate a random air cargo problem for scaling benchmarks
+
+    Every cargo and plane starts at a random airport, and n_goals of the cargos
+    (default: all of them) must be delivered to a different random airport.
+    Any such instance is solvable because every plane can fly between every
+    pair of airports.
+
+    Parameters
+    ----------
+    n_cargos, n_planes, n_airports : int
+        Number of each type of object; requires n_planes >= 1 and n_airports >= 2
+        unless n_goals == 0
+
+    seed : int
+        Seed for the random number generator, so that instances are reproducible
+
+    n_goals : int
+        Number of cargos with a goal location (0 <= n_goals <= n_cargos)
+    """
+    n_goals = n_cargos if n_goals is None else n_goals
+    if not 0 <= n_goals <= n_cargos:
+        raise ValueError("n_goals must be between 0 and n_cargos")
+    if n_goals and (n_planes < 1 or n_airports < 2):
+        raise ValueError("at least one plane and two airports are required to deliver cargo")
+
+    rng      = random.Random(seed)
+    cargos   = ['C{}'.format(i + 1) for i in range(n_cargos)]
+    planes   = ['P{}'.format(i + 1) for i in range(n_planes)]
+    airports = ['A{}'.format(i + 1) for i in range(n_airports)]
+    location = { thing: rng.choice(airports) for thing in cargos + planes }
+    goals    = {
+        cargo: rng.choice([ a for a in airports if a != location[cargo] ])
+        for cargo in rng.sample(cargos, n_goals)
+    }
+
+    at_relations = make_relations('At', cargos + planes, airports)
+    in_relations = make_relations('In', cargos, planes)
+    pos  = make_relations('At', cargos + planes, airports, key=lambda x: location[x[0]] == x[1])
+    init = FluentState(pos, set(at_relations + in_relations) - set(pos))
+    goal = make_relations('At', cargos, airports, key=lambda x: goals.get(x[0]) == x[1])
+    return AirCargoProblem(cargos, planes, airports, init, goal)
@@ -0,0 +1,210 @@
+""" External-memory breadth-first search with disk-backed layers [Korf 2008]
+
+Each BFS layer is a file of fixed width (state, parent) records, sorted by
+state, where states are packed with problem.pack_state. To build the next
+layer, the states of the current layer are streamed from disk and expanded;
+children are buffered in memory up to a budget, then sorted, de-duplicated and
+written out as a run file. Once the layer is expanded, the runs are merged
+and states already seen in any earlier layer are removed by merging against
+the sorted layer files (delayed duplicate detection), so memory use is bounded
+by the buffer rather than by the size of the explored set.
+
+A plan is rebuilt at the end by following parent records back through the
+layer files with a binary search on each.
+"""
+import heapq
+import os
+import shutil
+import tempfile
+
+from aimacode.search import Node, record_peak_nodes, unwrap_problem
+
+
+RECORD_OVERHEAD = 120  # approximate bytes of Python objects per buffered record, on top of the packed states
+
+
+class ExternalBFS:
+    """ Layered breadth-first search over a BasePlanningProblem, keeping layers on disk
+
+    Attributes
+    ----------
+    layers : list of int
+        Number of new states found at each depth
+
+    peak_buffer : int
+        Largest number of children held in memory at once
+    """
+    def __init__(self, problem, memory=64 * 2**20, directory=None, chunk_size=2**16):
+        """
+        Parameters
+        ----------
+        problem : BasePlanningProblem
+            Any problem with pack_state/unpack_state and a state_map
+
+        memory : int
+            Approximate budget in bytes for children buffered in memory before
+            a sorted run is written to disk
+
+        directory : str
+            Where to write layer and run files (default: a temporary directory,
+            removed when the search finishes)
+
+        chunk_size : int
+            Size in bytes of each read from a layer or run file
+        """
+        self.problem     = problem
+        self.width       = (len(problem.state_map) + 7) // 8
+        self.record      = 2 * self.width
+        self.max_buffer  = max(1, memory // (self.record + RECORD_OVERHEAD))
+        self.directory   = directory
+        self.chunk_size  = max(self.record, chunk_size - chunk_size % self.record)
+        self.layers      = []
+        self.peak_buffer = 0
+
+    def key(self, state) -> bytes:
+        return self.problem.pack_state(state).to_bytes(self.width, 'big')
+
+    def state(self, key: bytes):
+        return self.problem.unpack_state(int.from_bytes(key, 'big'))
+
+    def run(self, stop_at_goal=True):
+        """ Search layer by layer, until a goal is generated (if stop_at_goal) or no new states are found
+
+        Returns
+        -------
+        Node for the shallowest goal, or None
+        """
+        owns_directory = self.directory is None
+        self.path = tempfile.mkdtemp(prefix='external_bfs_') if owns_directory else self.directory
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            initial = self.key(self.problem.initial)
+            self._write(self._layer(0), [ initial + initial ])
+            self.layers = [1]
+            if self.problem.goal_test(self.problem.initial):
+                return Node(self.problem.initial)
+
+            depth, found = 0, None
+            while self.layers[-1]:
+                runs   = self._expand(depth)
+                merged = _unique(heapq.merge(*[ self._read(run) for run in runs ]), self.width)
+                for layer in range(depth + 1):
+                    merged = _subtract(merged, self._read(self._layer(layer)), self.width)
+
+                count = 0
+                with open(self._layer(depth + 1), 'wb') as file:
+                    for record in merged:
+                        file.write(record)
+                        count += 1
+                        if found is None and stop_at_goal and self.problem.goal_test(self.state(record[:self.width])):
+                            found = record[:self.width]
+                for run in runs: os.remove(run)
+                self.layers.append(count)
+                depth += 1
+                if found is not None:
+                    return self._solution(found, depth)
+            self.layers.pop()  # the last layer is empty
+            return None
+        finally:
+            record_peak_nodes(self.problem, self.peak_buffer)
+            if owns_directory: shutil.rmtree(self.path, ignore_errors=True)
+
+    def _layer(self, depth):
+        return os.path.join(self.path, 'layer-{:04d}.bin'.format(depth))
+
+    def _expand(self, depth):
+        """ Expand every state in a layer, writing children to sorted run files """
+        runs, buffer = [], []
+        for record in self._read(self._layer(depth)):
+            parent = record[:self.width]
+            state  = self.state(parent)
+            for action in self.problem.actions(state):
+                buffer.append(self.key(self.problem.result(state, action)) + parent)
+                if len(buffer) >= self.max_buffer:
+                    runs.append(self._write_run(buffer, depth, len(runs)))
+            self.peak_buffer = max(self.peak_buffer, len(buffer))
+        if buffer or not runs:
+            runs.append(self._write_run(buffer, depth, len(runs)))
+        return runs
+
+    def _write_run(self, buffer, depth, index):
+        path = os.path.join(self.path, 'run-{:04d}-{:06d}.bin'.format(depth + 1, index))
+        buffer.sort()
+        self._write(path, _unique(buffer, self.width))
+        buffer.clear()
+        return path
+
+    def _write(self, path, records):
+        with open(path, 'wb') as file:
+            for record in records:
+                file.write(record)
+
+    def _read(self, path):
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk: break
+                for i in range(0, len(chunk), self.record):
+                    yield chunk[i:i + self.record]
+
+    def _find(self, key, depth):
+        """ Binary search a sorted layer file for the record of state key """
+        with open(self._layer(depth), 'rb') as file:
+            lo, hi = 0, os.fstat(file.fileno()).st_size // self.record
+            while lo < hi:
+                mid = (lo + hi) // 2
+                file.seek(mid * self.record)
+                if file.read(self.width) < key: lo = mid + 1
+                else:                           hi = mid
+            file.seek(lo * self.record)
+            record = file.read(self.record)
+        if record[:self.width] != key:
+            raise KeyError("state not found in layer {}".format(depth))
+        return record
+
+    def _solution(self, key, depth):
+        """ Follow parent records back to the initial state, then replay the actions forwards """
+        keys = [key]
+        for layer in range(depth, 0, -1):
+            keys.append(self._find(keys[-1], layer)[self.width:])
+        states = [ self.state(k) for k in reversed(keys) ]
+
+        problem = unwrap_problem(self.problem)  # only the layers are counted as expansions
+        node = Node(states[0])
+        for state in states[1:]:
+            for action in problem.actions(node.state):
+                if problem.result(node.state, action) == state:
+                    node = node.child_node(problem, action)
+                    break
+        return node
+
+
+def _unique(records, width):
+    """ Drop records whose state repeats the previous one, from a stream sorted by state """
+    previous = None
+    for record in records:
+        key = record[:width]
+        if key != previous:
+            yield record
+            previous = key
+
+
+def _subtract(records, seen, width):
+    """ Drop records whose state appears in seen; both streams sorted by state """
+    seen = iter(seen)
+    other = next(seen, None)
+    for record in records:
+        key = record[:width]
+        while other is not None and other[:width] < key:
+            other = next(seen, None)
+        if other is None or other[:width] != key:
+            yield record
+
+
+def external_breadth_first_search(problem, memory=64 * 2**20, directory=None):
+    """ Breadth-first search keeping its layers on disk, with about `memory` bytes of buffered children
+
+    Finds a shortest plan, like breadth_first_search, but its memory use does
+    not grow with the number of states explored.
+    """
+    return ExternalBFS(problem, memory=memory, directory=directory).run()
@@ -0,0 +1,144 @@
+""" Landmarks and the landmark-count heuristic [Hoffmann, Porteous & Sebastia 2004; Richter & Westphal 2010]
+
+A landmark is a fluent, or a disjunction of fluents, which is true at some
+point in every plan. Landmarks are found by backchaining from the goals in the
+delete relaxation: for a landmark L, the possible first achievers are the
+actions adding L whose preconditions are reachable in a relaxed planning graph
+built without any achiever of L. A precondition shared by all of them is a
+fact landmark, and a set of fluents of the same predicate containing a
+precondition of each of them (eg. the cargo is in some plane) is a disjunctive
+landmark. Either must be reached before L, which gives the orderings.
+
+Landmarks are extracted once per problem. During search each node records the
+landmarks accepted on its path: those of its parent, plus any landmark true in
+its state whose predecessors were all accepted by the parent. The heuristic
+counts the landmarks not yet accepted, plus accepted goals which have since
+been made false again. Because it depends on the path, it is not cached by
+state like the planning graph heuristics.
+"""
+from collections import deque
+
+
+def relaxed_reachable(problem, initial, excluded=frozenset()):
+    """ Fluent indices reachable from the true fluents in initial, ignoring delete
+    effects and negative preconditions, without the actions in excluded
+
+    Builds the fact layers of a relaxed planning graph until they level off.
+    """
+    index   = problem.fluent_index
+    reached = set(initial)
+    actions = [
+        ({ index[s] for s in action.precond_pos }, { index[s] for s in action.effect_add })
+        for i, action in enumerate(problem.actions_list) if i not in excluded
+    ]
+    while True:
+        layer = set(reached)
+        for precond, effects in actions:
+            if precond <= reached: layer |= effects
+        if len(layer) == len(reached): return reached
+        reached = layer
+
+
+class LandmarkGraph:
+    """ The landmarks of a BasePlanningProblem and their orderings
+
+    Attributes
+    ----------
+    landmarks : list of frozensets of int
+        Each landmark is a set of indices into problem.state_map, reached when any of them is true
+
+    orderings : list of (int, int)
+        Pairs (a, b) of positions in landmarks: landmarks[a] must be reached before landmarks[b]
+    """
+    def __init__(self, problem, max_disjunction=4):
+        """
+        Parameters
+        ----------
+        problem : BasePlanningProblem
+
+        max_disjunction : int
+            Largest number of fluents in a disjunctive landmark
+        """
+        index    = problem.fluent_index
+        initial  = { i for i, f in enumerate(problem.initial) if f }
+        preconds = [ { index[s] for s in action.precond_pos } for action in problem.actions_list ]
+        adds     = [ { index[s] for s in action.effect_add } for action in problem.actions_list ]
+
+        self.landmarks = [ frozenset([index[g]]) for g in problem.goal ]
+        position = { landmark: j for j, landmark in enumerate(self.landmarks) }
+        orderings = set()
+        queue = deque(self.landmarks)
+        while queue:
+            landmark = queue.popleft()
+            if landmark & initial: continue
+            achievers = { i for i, effects in enumerate(adds) if effects & landmark }
+            reachable = relaxed_reachable(problem, initial, achievers)
+            first     = [ preconds[i] for i in achievers if preconds[i] <= reachable ]
+            if not first: continue
+
+            candidates = [ frozenset([p]) for p in set.intersection(*first) ]
+            shared     = set.intersection(*first)
+            by_predicate = {}
+            for precond in first:
+                for p in precond - shared:
+                    by_predicate.setdefault(problem.state_map[p].op, set()).add(p)
+            for op, fluents in by_predicate.items():
+                if len(fluents) <= max_disjunction and all( precond & fluents for precond in first ):
+                    candidates.append(frozenset(fluents))
+
+            for candidate in candidates:
+                if candidate & initial: continue  # reached before the search starts
+                if len(candidate) > 1 and any( other < candidate for other in position ): continue  # implied by a fact landmark
+                if candidate not in position:
+                    position[candidate] = len(self.landmarks)
+                    self.landmarks.append(candidate)
+                    queue.append(candidate)
+                orderings.add((position[candidate], position[landmark]))
+
+        self.orderings = sorted(orderings)
+        self.members   = [ tuple(sorted(landmark)) for landmark in self.landmarks ]
+        self.predecessors = [0] * len(self.landmarks)  # bitmask of landmarks which must be accepted first
+        for a, b in self.orderings: self.predecessors[b] |= 1 << a
+        self.goals = (1 << len(problem.goal)) - 1  # goals are the first landmarks
+        self.all   = (1 << len(self.landmarks)) - 1
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def true_in(self, state) -> int:
+        """ Bitmask of the landmarks true in state """
+        mask = 0
+        for j, members in enumerate(self.members):
+            for fluent in members:
+                if state[fluent]:
+                    mask |= 1 << j
+                    break
+        return mask
+
+    def accept(self, state, accepted=None) -> int:
+        """ Bitmask of the landmarks accepted after reaching state from a node with
+        accepted landmarks (None for the initial node: everything true is accepted) """
+        true = self.true_in(state)
+        if accepted is None: return true
+        parent = accepted
+        for j, predecessors in enumerate(self.predecessors):
+            if true >> j & 1 and predecessors & parent == predecessors:
+                accepted |= 1 << j
+        return accepted
+
+    def count(self, state, accepted) -> int:
+        """ Landmarks not yet accepted, plus accepted goals which are false in state """
+        required = self.goals & accepted & ~self.true_in(state)
+        return bin(self.all & ~accepted).count('1') + bin(required).count('1')
+
+    def node_accepted(self, node) -> int:
+        """ Accepted landmarks for a search node, computed from its parent's and stored
+        on the node (walking up to the nearest ancestor which already has them) """
+        path = []
+        while node is not None and getattr(node, 'landmarks', None) is None:
+            path.append(node)
+            node = node.parent
+        accepted = None if node is None else node.landmarks
+        for node in reversed(path):
+            accepted = node.landmarks = self.accept(node.state, accepted)
+        return accepted
@@ -177,6 +177,38 @@ class BaseActionLayer(BaseLayer):
             self.children.update({ k: set(v) for k, v in actions.children.items() })
 
     def update_mutexes(self):
+        """ Find every mutex pair of actions in the layer, using inverted indexes
+        from each literal to the actions which have it as an effect or a
+        precondition, so only pairs which share a literal (or its negation, or
+        a pair of mutex preconditions) are ever looked at. Gives the same
+        mutexes as update_mutexes_pairwise(), which tests every pair with the
+        _inconsistent_effects, _interference and _competing_needs methods.
+        """
+        actions = list(self)
+        if self._serialize:
+            real = { action for action in actions if not action.no_op }
+            for action in real:
+                others = real - {action}
+                if others: self._mutexes[action] |= others
+
+        effects, preconditions = defaultdict(list), defaultdict(list)
+        for action in actions:
+            for literal in action.effects:       effects[literal].append(action)
+            for literal in action.preconditions: preconditions[literal].append(action)
+
+        parent_mutexes = {} if self._ignore_mutexes or self.parent_layer is None else self.parent_layer._mutexes
+        for action in actions:
+            conflicts = set()
+            for effect in action.effects:
+                conflicts.update(effects.get(~effect, ()))        # inconsistent effects
+                conflicts.update(preconditions.get(~effect, ()))  # interference (the reverse is found from the other action)
+            for precondition in action.preconditions:
+                for other in parent_mutexes.get(precondition, ()):
+                    conflicts.update(preconditions.get(other, ()))  # competing needs
+            conflicts.discard(action)
+            for other in conflicts: self.set_mutex(action, other)
+
+    def update_mutexes_pairwise(self):
         for actionA, actionB in combinations(iter(self), 2):
             if self._serialize and actionA.no_op == actionB.no_op == False:
                 self.set_mutex(actionA, actionB)
@@ -205,6 +237,41 @@ class BaseLiteralLayer(BaseLayer):
             self.children.update({k: set(v) for k, v in literals.children.items()})
 
     def update_mutexes(self):
+        """ Find every mutex pair of literals in the layer. Literal A is mutex with
+        literal B by inconsistent support when every supporter of B is mutex with
+        every supporter of A, so B is only checked if one of its supporters is in
+        the intersection of the mutex sets of A's supporters. Gives the same
+        mutexes as update_mutexes_pairwise(), which tests every pair with the
+        _negation and _inconsistent_support methods.
+        """
+        literals = list(self)
+        for literal in literals:
+            if ~literal in self: self.set_mutex(literal, ~literal)
+        if self._ignore_mutexes or not len(self.parent_layer): return
+
+        parent_mutexes = self.parent_layer._mutexes
+        supported = defaultdict(list)  # action -> literals in this layer it supports
+        for literal in literals:
+            for action in self.parents[literal]: supported[action].append(literal)
+
+        for literal in literals:
+            supporters = self.parents[literal]
+            if not supporters:  # vacuously mutex: there is no pair of supporters which is not mutex
+                for other in literals:
+                    if other != literal: self.set_mutex(literal, other)
+                continue
+            common = None  # actions mutex with every supporter of literal
+            for action in sorted(supporters, key=lambda action: len(parent_mutexes.get(action, ()))):
+                mutexes = parent_mutexes.get(action, set())
+                common  = set(mutexes) if common is None else common & mutexes
+                if not common: break
+            if not common: continue
+            candidates = { other for action in common for other in supported.get(action, ()) }
+            for other in candidates:
+                if other != literal and self.parents[other] <= common:
+                    self.set_mutex(literal, other)
+
+    def update_mutexes_pairwise(self):
         for literalA, literalB in combinations(iter(self), 2):
             if self._negation(literalA, literalB):
                 self.set_mutex(literalA, literalB)
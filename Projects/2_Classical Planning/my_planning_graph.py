@@ -1,5 +1,6 @@
 from typing import List, Set
 
+from collections import defaultdict
 from itertools import chain, combinations, product
 
 from aimacode.utils import Expr
@@ -419,3 +420,157 @@ class PlanningGraph:
         self.action_layers.append(action_layer)
         self.literal_layers.append(literal_layer)
         self._is_leveled = literal_layer == action_layer.parent_layer
+
+
+
+def graphplan(problem):
+    """ Solve a planning problem with GraphPlan [Blum & Furst 1997]
+
+    Extends an unserialized planning graph until all the goals appear without
+    mutexes, then searches backwards from the last layer for a set of pairwise
+    non-mutex actions achieving the goals at each level. Goal sets which fail
+    to extract at a level are memoized as nogoods, and if extraction fails the
+    graph is extended by another level. Once the graph has leveled off at a
+    level n, the search stops with no solution when a failed stage adds no new
+    nogoods at level n (the fixpoint test).
+
+    Returns
+    -------
+    aimacode.search.Node or None
+        A node for the final state, so that node.solution() is the plan;
+        actions within a level are mutually independent and are applied in
+        name order
+    """
+    from aimacode.search import Node
+
+    graph   = PlanningGraph(problem, problem.initial, serialize=False)
+    actions = { str(action): action for action in problem.actions_list }
+    goals   = frozenset(problem.goal)
+    nogoods = defaultdict(set)  # level -> set of goal sets which can't be achieved at that level
+
+    # once leveled, every later layer is a copy of the last one
+    def literal_layer(level): return graph.literal_layers[min(level, len(graph.literal_layers) - 1)]
+    def action_layer(level):  return graph.action_layers[min(level, len(graph.action_layers) - 1)]
+
+    def extract(goals, level):
+        if level == 0:
+            return []
+        if goals in nogoods[level]:
+            return None
+        plan = assign(sorted(goals, key=str), 0, level, [], set())
+        if plan is None:
+            nogoods[level].add(goals)
+        return plan
+
+    def assign(goals, index, level, chosen, subgoals):
+        if index == len(goals):
+            plan = extract(frozenset(subgoals), level - 1)
+            return None if plan is None else plan + [chosen]
+        goal = goals[index]
+        if any( goal in action.effects for action in chosen ):
+            return assign(goals, index + 1, level, chosen, subgoals)
+        layer = action_layer(level - 1)
+        # try persisting a goal before achieving it with a new action
+        for action in sorted(literal_layer(level).parents[goal], key=lambda a: (not a.no_op, str(a))):
+            if any( layer.is_mutex(action, other) for other in chosen ): continue
+            plan = assign(goals, index + 1, level, chosen + [action], subgoals | action.preconditions)
+            if plan is not None:
+                return plan
+        return None
+
+    leveled  = None  # the level n where the graph leveled off
+    previous = None  # len(nogoods[n]) after the last failed stage
+    level = 0
+    while True:
+        layer = literal_layer(level)
+        if goals <= layer and not graph.goals_are_mutex(goals, layer):
+            plan = extract(goals, level)
+            if plan is not None:
+                node = Node(problem.initial)
+                for step in plan:
+                    for action in sorted( str(action) for action in step if not action.no_op ):
+                        node = node.child_node(problem, actions[action])
+                return node
+            if graph._is_leveled:
+                if leveled is None: leveled = len(graph.literal_layers) - 1
+                if len(nogoods[leveled]) == previous:
+                    return None
+                previous = len(nogoods[leveled])
+        elif graph._is_leveled:
+            return None  # the goals can never appear together without mutexes
+        graph._extend()
+        level += 1
+
+
+class RelaxedPlanner:
+    """ Relaxed plans for the FF heuristic [Hoffmann & Nebel 2001]
+
+    Builds a relaxed planning graph (delete effects and negative preconditions
+    ignored) over fluent indices until the goals appear, then extracts a plan
+    backwards from the goals, choosing for each subgoal the achiever in the
+    layer before it appears with the easiest preconditions (the lowest sum of
+    precondition levels). The number of actions in the relaxed plan estimates
+    the distance to the goal; unlike levelsum, actions which achieve several
+    subgoals are only counted once.
+    """
+    def __init__(self, problem):
+        index = problem.fluent_index
+        self.goals   = [ index[g] for g in problem.goal ]
+        self.actions = [
+            ({ index[s] for s in action.precond_pos }, { index[s] for s in action.effect_add })
+            for action in problem.actions_list
+        ]
+        self.achievers = defaultdict(list)
+        for i, (_, effects) in enumerate(self.actions):
+            for fluent in effects: self.achievers[fluent].append(i)
+
+    def plan(self, state):
+        """ Returns the indices into problem.actions_list of a relaxed plan from state, or None """
+        level  = { i: 0 for i, f in enumerate(state) if f }
+        action_level = {}
+        layer  = 0
+        while not all( goal in level for goal in self.goals ):
+            new = {}
+            for i, (preconditions, effects) in enumerate(self.actions):
+                if i not in action_level and all( p in level for p in preconditions ):
+                    action_level[i] = layer
+                    for fluent in effects:
+                        if fluent not in level: new[fluent] = layer + 1
+            if not new: return None
+            level.update(new)
+            layer += 1
+
+        subgoals = defaultdict(set)
+        for goal in self.goals: subgoals[level[goal]].add(goal)
+        achieved = defaultdict(set)  # level -> fluents made true there by chosen actions
+        plan = set()
+        for i in range(layer, 0, -1):
+            for goal in sorted(subgoals[i]):
+                if goal in achieved[i]: continue
+                action = min(( a for a in self.achievers[goal] if action_level.get(a) == i - 1 ),
+                             key=lambda a: (sum( level[p] for p in self.actions[a][0] ), a))
+                plan.add(action)
+                for p in self.actions[action][0]:
+                    if level[p] and p not in achieved[i - 1]: subgoals[level[p]].add(p)
+                for fluent in self.actions[action][1]:
+                    achieved[i].add(fluent)
+                    achieved[i - 1].add(fluent)
+        return sorted(plan)
+
+
+def static_mutexes(problem):
+    """ Pairs of literals which are never true together in a state reachable from
+    problem.initial: the literal mutexes in the last layer of a planning graph
+    grown until it levels off (eg. a plane is only ever at one airport)
+
+    Returns
+    -------
+    set of frozensets of two (index into problem.state_map, bool) literals
+    """
+    layer = PlanningGraph(problem, problem.initial, serialize=False).fill().literal_layers[-1]
+    index = problem.fluent_index
+
+    def literal(s):
+        return (index[s.args[0]], False) if s.op == '~' else (index[s], True)
+
+    return { frozenset((literal(a), literal(b))) for a, others in layer._mutexes.items() for b in others }
@@ -0,0 +1,199 @@
+""" Hash-distributed A* (HDA*) across worker processes [Kishimoto, Fukunaga & Botea 2009]
+
+Every state is owned by one worker, chosen by hashing the state. Each worker
+keeps its own open and closed lists and evaluates the heuristic for the states
+it owns, so expensive heuristics such as h_pg_levelsum run on every core.
+Children owned by another worker are buffered and sent to it in batches.
+
+Nodes travel as (packed state, path cost, path), where path is the index of
+each action in problem.actions(state) along the way from the initial state,
+so the plan can be replayed without parent pointers spread across processes.
+
+When a worker pops a goal it publishes the cost as the shared incumbent, and
+every worker prunes nodes with f >= incumbent. The search ends when every
+worker is idle and every batch sent has been received; with an admissible
+heuristic the best goal found by then is optimal.
+"""
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+
+from aimacode.search import InstrumentedProblem, Node, infinity, unwrap_problem
+
+
+def hda_star_search(problem, h=None, processes=None, batch_size=64):
+    """ Parallel A* search with f(n) = g(n)+h(n), over `processes` worker processes
+
+    Returns the same plan cost as astar_search for an admissible h, though
+    ties between equally good plans may be broken differently.
+
+    Parameters
+    ----------
+    problem : Problem
+        States are sent between processes with problem.pack_state() and
+        problem.unpack_state() if they are defined, or pickled as is
+
+    h : function
+        Heuristic, evaluated in the worker that owns each state (default problem.h)
+
+    processes : int
+        Number of worker processes (default: os.cpu_count())
+
+    batch_size : int
+        Number of nodes buffered for another worker before they are sent
+    """
+    h         = h or problem.h
+    processes = processes or os.cpu_count() or 1
+    # fork keeps problem and heuristic (including bound methods and caches) usable in workers
+    methods   = multiprocessing.get_all_start_methods()
+    context   = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    inboxes   = [ context.Queue() for _ in range(processes) ]
+    results   = context.Queue()
+    incumbent = context.Value('d', infinity)
+    counters  = context.Array('l', 2)  # batches [sent, received]
+    idle      = context.Array('b', processes)
+    stop      = context.Event()
+
+    workers = [
+        context.Process(target=_worker, daemon=True, args=(
+            rank, problem, h, batch_size, inboxes, results, incumbent, counters, idle, stop))
+        for rank in range(processes)
+    ]
+    for worker in workers: worker.start()
+
+    pack   = getattr(problem, 'pack_state', lambda state: state)
+    owner  = _owner(pack(problem.initial), processes)
+    with counters.get_lock(): counters[0] += 1
+    inboxes[owner].put([ (pack(problem.initial), 0, ()) ])
+
+    best, stats = None, []
+    try:
+        while len(stats) < processes:
+            try:
+                kind, value = results.get(timeout=0.01)
+                if kind == "solution" and (best is None or value[0] < best[0]):
+                    best = value
+                elif kind == "stats":
+                    stats.append(value)
+            except queue.Empty:
+                pass
+            if not stop.is_set() and _terminated(counters, idle):
+                stop.set()
+            if not any( worker.is_alive() for worker in workers ) and results.empty():
+                break  # a worker was killed before reporting
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(1)
+            if worker.is_alive(): worker.terminate()
+
+    if isinstance(problem, InstrumentedProblem):
+        for succs, goal_tests, states, peak in stats:
+            problem.succs      += succs
+            problem.goal_tests += goal_tests
+            problem.states     += states
+            problem.max_frontier = max(problem.max_frontier, peak)
+    if best is None:
+        return None
+
+    base = unwrap_problem(problem)  # the workers already counted these steps
+    node = Node(base.initial)
+    for index in best[1]:
+        node = node.child_node(base, base.actions(node.state)[index])
+    return node
+
+
+def _owner(packed, processes):
+    return hash((packed,)) % processes  # the tuple hash mixes all the bits of a packed int
+
+
+def _terminated(counters, idle):
+    """ All workers idle, and no batches in flight, twice in a row
+
+    Workers clear their idle flag before counting a received batch, and count
+    sent batches before they are queued, so a worker which is busy between the
+    two reads changes the counters.
+    """
+    sent, received = counters[:]
+    if sent != received or not all(idle[:]): return False
+    time.sleep(0.001)
+    return counters[:] == [sent, received] and all(idle[:])
+
+
+def _worker(rank, problem, h, batch_size, inboxes, results, incumbent, counters, idle, stop):
+    processes = len(inboxes)
+    pack      = getattr(problem, 'pack_state',   lambda state: state)
+    unpack    = getattr(problem, 'unpack_state', lambda state: state)
+    frontier  = []  # heap of (f, -g, counter, packed, g, path)
+    best_g    = {}  # packed -> lowest path cost seen, open or closed
+    outboxes  = [ [] for _ in range(processes) ]
+    counter   = itertools.count()
+    stats     = InstrumentedProblem(problem)
+    peak      = 0
+
+    def insert(packed, g, path, state=None):
+        if g >= best_g.get(packed, infinity): return
+        best_g[packed] = g
+        state = unpack(packed) if state is None else state
+        f = g + h(Node(state, path_cost=g))
+        if f < incumbent.value:
+            heapq.heappush(frontier, (f, -g, next(counter), packed, g, path))
+
+    def send(owner):
+        with counters.get_lock(): counters[0] += 1
+        inboxes[owner].put(outboxes[owner])
+        outboxes[owner] = []
+
+    def receive(batch):
+        idle[rank] = False
+        with counters.get_lock(): counters[1] += 1
+        for packed, g, path in batch:
+            insert(packed, g, path)
+
+    try:
+        while not stop.is_set():
+            try:
+                while True: receive(inboxes[rank].get_nowait())
+            except queue.Empty:
+                pass
+
+            if frontier and frontier[0][0] < incumbent.value:
+                f, _, _, packed, g, path = heapq.heappop(frontier)
+                if g > best_g[packed]: continue  # a cheaper path was found since
+                state = unpack(packed)
+                if stats.goal_test(state):
+                    with incumbent.get_lock():
+                        if g < incumbent.value:
+                            incumbent.value = g
+                            results.put(("solution", (g, path)))
+                    continue
+                for index, action in enumerate(stats.actions(state)):
+                    child  = stats.result(state, action)
+                    cost   = stats.path_cost(g, state, action, child)
+                    packed = pack(child)
+                    owner  = _owner(packed, processes)
+                    if owner == rank:
+                        insert(packed, cost, path + (index,), child)
+                    else:
+                        outboxes[owner].append((packed, cost, path + (index,)))
+                        if len(outboxes[owner]) >= batch_size: send(owner)
+                peak = max(peak, len(frontier))
+            else:
+                flushed = False
+                for owner in range(processes):
+                    if outboxes[owner]:
+                        send(owner)
+                        flushed = True
+                if flushed: continue
+                idle[rank] = True
+                try:
+                    receive(inboxes[rank].get(timeout=0.01))
+                except queue.Empty:
+                    pass
+    finally:
+        for inbox in inboxes: inbox.cancel_join_thread()  # batches left after stop are never read
+        results.put(("stats", (stats.succs, stats.goal_tests, stats.states, peak)))
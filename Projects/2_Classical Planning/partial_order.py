@@ -0,0 +1,138 @@
+""" Partial-order reduction with strong stubborn sets [Alkhazraji et al 2012; Wehrle & Helmert 2014]
+
+Many actions of a planning problem are independent, eg. loading two different
+cargos at two different airports, and a forward search explores every order
+in which they can be interleaved. A strong stubborn set for a state s is a set
+of actions T such that expanding only the actions in T which are applicable
+in s still leaves an optimal plan from s:
+
+    - T contains every achiever of some goal fluent false in s
+    - for an action in T which is applicable in s, T contains every action
+      which interferes with it (disables it, is disabled by it, or has a
+      conflicting effect), unless their preconditions are mutex so they are
+      never applicable together
+    - for an action in T which is not applicable in s, T contains every
+      achiever of one of its preconditions false in s
+
+The interference relation and the achievers of each literal are precomputed
+once per problem, using the problem's static mutexes (eg. a plane is only at
+one airport, so flying a plane out of SFO never interferes with loading it at
+JFK). StubbornSetProblem prunes problem.actions(state) down to a
+stubborn set, so the unmodified searches in aimacode.search stay complete,
+and optimal searches stay optimal.
+"""
+from functools import wraps
+
+from aimacode.search import Problem, record_pruned_actions
+
+
+class StubbornSetProblem(Problem):
+    """ Wraps a BasePlanningProblem so that actions() returns the applicable actions in a strong stubborn set
+
+    Attributes
+    ----------
+    pruned : int
+        Number of applicable actions left out of actions() so far
+
+    applicable : int
+        Number of applicable actions in the states passed to actions() so far
+    """
+    def __init__(self, problem):
+        self.problem = problem
+        index   = problem.fluent_index
+        actions = problem.actions_list
+        self.ids = { action: i for i, action in enumerate(actions) }
+
+        # preconditions and effects as (fluent index, value) literals
+        self.preconditions = [
+            [ (index[s], True) for s in action.precond_pos ] + [ (index[s], False) for s in action.precond_neg ]
+            for action in actions
+        ]
+        self.effects = [
+            { (index[s], True) for s in action.effect_add } |
+            { (index[s], False) for s in action.effect_rem if s not in action.effect_add }
+            for action in actions
+        ]
+        self.achievers = {}  # literal -> indices of actions which make it true
+        for i, effects in enumerate(self.effects):
+            for literal in effects: self.achievers.setdefault(literal, set()).add(i)
+
+        def disables(a, b):
+            return any( (fluent, not value) in self.effects[a] for fluent, value in self.preconditions[b] )
+
+        def conflicts(a, b):
+            return any( (fluent, not value) in self.effects[b] for fluent, value in self.effects[a] )
+
+        mutexes = problem.get_static_mutexes()
+
+        def compatible(a, b):
+            return not any( frozenset((p, q)) in mutexes for p in self.preconditions[a] for q in self.preconditions[b] )
+
+        self.interference = [ set() for _ in actions ]
+        for a in range(len(actions)):
+            for b in range(a + 1, len(actions)):
+                if (disables(a, b) or disables(b, a) or conflicts(a, b)) and compatible(a, b):
+                    self.interference[a].add(b)
+                    self.interference[b].add(a)
+
+        self.goals = [ (index[s], True) for s in problem.goal ]
+        self.pruned = self.applicable = 0
+        super().__init__(problem.initial, problem.goal)
+
+    def __getattr__(self, attr):
+        return getattr(self.problem, attr)
+
+    def stubborn_set(self, state, applicable):
+        """ Indices of the actions in a strong stubborn set for state, given the indices of its applicable actions """
+        unmet = [ literal for literal in self.goals if state[literal[0]] != literal[1] ]
+        if not unmet:
+            return set(applicable)
+        # choosing the literals with the fewest achievers keeps the set small
+        goal    = min(unmet, key=lambda literal: len(self.achievers.get(literal, ())))
+        stubborn = set(self.achievers.get(goal, ()))
+        queue    = list(stubborn)
+        while queue:
+            a = queue.pop()
+            if a in applicable:
+                added = self.interference[a] - stubborn
+            else:
+                # the unmet precondition whose achievers add the fewest new actions
+                unmet = [ literal for literal in self.preconditions[a] if state[literal[0]] != literal[1] ]
+                added = min(( self.achievers.get(literal, set()) - stubborn for literal in unmet ), key=len)
+            stubborn |= added
+            queue.extend(added)
+        return stubborn
+
+    def actions(self, state):
+        actions    = self.problem.actions(state)
+        applicable = { self.ids[action] for action in actions }
+        stubborn   = self.stubborn_set(state, applicable)
+        kept = [ action for action in actions if self.ids[action] in stubborn ]
+        self.pruned     += len(actions) - len(kept)
+        self.applicable += len(actions)
+        return kept
+
+    def result(self, state, action):
+        return self.problem.result(state, action)
+
+    def goal_test(self, state):
+        return self.problem.goal_test(state)
+
+    def path_cost(self, c, state1, action, state2):
+        return self.problem.path_cost(c, state1, action, state2)
+
+    def h(self, node):
+        return self.problem.h(node)
+
+
+def stubborn_sets(search_function):
+    """ Wrap a search function to expand only the actions in a strong stubborn set of each state,
+    recording the number of actions pruned on an InstrumentedProblem """
+    @wraps(search_function)
+    def search(problem, *args, **kwargs):
+        reduced = StubbornSetProblem(problem)
+        try:
+            return search_function(reduced, *args, **kwargs)
+        finally:
+            record_pruned_actions(problem, reduced.pruned, reduced.applicable)
+    return search
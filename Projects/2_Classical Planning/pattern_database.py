@@ -0,0 +1,260 @@
+""" Pattern database (PDB) heuristics [Culberson & Schaeffer 1998, Edelkamp 2001]
+
+A pattern is a subset of the fluents of a BasePlanningProblem. Projecting
+states and actions onto a pattern gives an abstract problem small enough to
+solve exhaustively: the abstract states reachable from the initial state are
+enumerated, then a breadth-first search backwards from the abstract goal
+states gives the exact abstract distance to the goal of every one of them.
+That distance is an admissible estimate for any real state with the same
+projection, and looking it up costs one array index per node, instead of
+building a PlanningGraph per node.
+
+Each database is an array of one byte per abstract state (2**len(pattern)
+entries), written to disk and memory-mapped when it is loaded, so databases are
+built once per problem and shared between processes through the page cache.
+
+Several databases can be added together, without losing admissibility, when
+their patterns are disjoint and no action changes fluents in more than one of
+them [Felner, Korf & Hanan 2004]. PatternDatabaseHeuristic partitions its
+patterns into such additive groups, and returns the largest group sum.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections import deque
+
+from aimacode.search import infinity
+
+
+MAGIC       = b'PDB1'
+UNREACHABLE = 255  # distances are stored in one byte, so 255 marks abstract states with no path to the goal
+
+
+def goal_objects(problem):
+    """ The first argument of each goal fluent, eg. the cargos in At(C1, JFK) """
+    objects = []
+    for goal in problem.goal:
+        if goal.args and goal.args[0] not in objects:
+            objects.append(goal.args[0])
+    return objects
+
+
+def goal_patterns(problem, max_size=20):
+    """ Two patterns for each goal object: the fluents which mention it, and the
+    larger pattern of every fluent whose arguments all appear in a fluent with it
+    (eg. a cargo's location together with the locations of the planes)
+
+    Returns
+    -------
+    list of lists of indices into problem.state_map
+    """
+    patterns = []
+    for obj in goal_objects(problem):
+        own = [ i for i, s in enumerate(problem.state_map) if obj in s.args ]
+        neighbours = { arg for i in own for arg in problem.state_map[i].args }
+        wide = [ i for i, s in enumerate(problem.state_map) if set(s.args) <= neighbours ]
+        for pattern in ([own, wide] if len(wide) > len(own) else [own]):
+            if len(pattern) <= max_size and pattern not in patterns:
+                patterns.append(pattern)
+    return patterns
+
+
+class AbstractAction:
+    """ An action projected onto a pattern, as bitmasks over the pattern's fluents """
+    __slots__ = ('pre_pos', 'pre_neg', 'add', 'rem')
+
+    def __init__(self, action, bits):
+        masks = []
+        for literals in (action.precond_pos, action.precond_neg, action.effect_add, action.effect_rem):
+            masks.append(sum( bits[s] for s in literals if s in bits ))
+        self.pre_pos, self.pre_neg, self.add, self.rem = masks
+
+    def key(self):
+        return self.pre_pos, self.pre_neg, self.add, self.rem
+
+    def applicable(self, state):
+        return state & self.pre_pos == self.pre_pos and not state & self.pre_neg
+
+    def result(self, state):
+        return (state & ~self.rem) | self.add
+
+
+class PatternDatabase:
+    """ Abstract goal distances for one pattern
+
+    Attributes
+    ----------
+    pattern : list of int
+        Indices into problem.state_map of the fluents in the pattern
+
+    size : int
+        Number of abstract states reachable from the initial state
+    """
+    def __init__(self, problem, pattern, path=None):
+        """
+        Parameters
+        ----------
+        problem : BasePlanningProblem
+
+        pattern : list of int
+            Indices into problem.state_map
+
+        path : str
+            File to memory-map the distances from; built and written there
+            first if it is missing or was built for a different problem.
+            Without a path the distances are kept in memory.
+        """
+        self.pattern = list(pattern)
+        self.size    = 0
+        self.signature = pattern_signature(problem, self.pattern)
+        self.data    = self.offset = None
+        if path is not None and os.path.exists(path):
+            self._load(path)
+        if self.data is None:
+            distances = self.build(problem)
+            if path is None:
+                self.data, self.offset = distances, 0
+            else:
+                self._write(path, distances)
+                self._load(path)
+
+    def build(self, problem) -> bytearray:
+        """ Enumerate the abstract states reachable from the initial state, then
+        search backwards from the abstract goal states """
+        bits    = { problem.state_map[i]: 1 << j for j, i in enumerate(self.pattern) }
+        goal    = sum( bits[s] for s in problem.goal if s in bits )
+        actions = {}
+        for action in problem.actions_list:
+            abstract = AbstractAction(action, bits)
+            if abstract.add | abstract.rem: actions[abstract.key()] = abstract  # others are self-loops in the abstraction
+        actions = list(actions.values())
+
+        initial = self.project(problem.initial)
+        parents = { initial: [] }
+        queue   = deque([initial])
+        while queue:
+            state = queue.popleft()
+            for action in actions:
+                if action.applicable(state):
+                    child = action.result(state)
+                    if child not in parents:
+                        parents[child] = []
+                        queue.append(child)
+                    parents[child].append(state)
+        self.size = len(parents)
+
+        distances = bytearray([UNREACHABLE]) * (1 << len(self.pattern))
+        queue = deque( state for state in parents if state & goal == goal )
+        for state in queue: distances[state] = 0
+        while queue:
+            state = queue.popleft()
+            distance = min(distances[state] + 1, UNREACHABLE - 1)
+            for parent in parents[state]:
+                if distances[parent] == UNREACHABLE:
+                    distances[parent] = distance
+                    queue.append(parent)
+        return distances
+
+    def project(self, state) -> int:
+        """ Index of the abstract state: bit j is the value of fluent pattern[j] """
+        index = 0
+        for j, i in enumerate(self.pattern):
+            if state[i]: index |= 1 << j
+        return index
+
+    def distance(self, state):
+        """ Abstract distance from state to the goal, or infinity if there is none """
+        value = self.data[self.offset + self.project(state)]
+        return infinity if value == UNREACHABLE else value
+
+    def _write(self, path, distances):
+        header = json.dumps({ "signature": self.signature, "size": self.size }).encode()
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(MAGIC + struct.pack('<I', len(header)) + header)
+            file.write(distances)
+        os.replace(tmp, path)
+
+    def _load(self, path):
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        length = struct.unpack('<I', data[4:8])[0] if data[:4] == MAGIC else 0
+        header = json.loads(data[8:8 + length].decode()) if length else {}
+        if header.get("signature") != self.signature or len(data) != 8 + length + (1 << len(self.pattern)):
+            data.close()  # stale or foreign file: rebuild it
+            return
+        self.data, self.offset, self.size = data, 8 + length, header["size"]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap): self.data.close()
+
+
+def pattern_signature(problem, pattern) -> str:
+    return hashlib.sha1((problem.signature() + repr(pattern)).encode()).hexdigest()
+
+
+def additive_groups(problem, patterns):
+    """ Partition pattern indices into groups whose databases can be added admissibly:
+    patterns in a group are disjoint, and no action changes fluents in two of them.
+    Each pattern seeds a group and greedily adds every compatible pattern, so a
+    pattern can appear in several groups.
+    """
+    index   = problem.fluent_index
+    touched = [
+        [ { index[s] for s in action.effect_add | action.effect_rem } & set(pattern) for pattern in patterns ]
+        for action in problem.actions_list
+    ]
+
+    def compatible(a, b):
+        return not set(patterns[a]) & set(patterns[b]) and not any( effects[a] and effects[b] for effects in touched )
+
+    groups = []
+    for seed in range(len(patterns)):
+        group = [seed]
+        for other in range(len(patterns)):
+            if other != seed and all( compatible(other, member) for member in group ):
+                group.append(other)
+        if sorted(group) not in groups:
+            groups.append(sorted(group))
+    return groups
+
+
+class PatternDatabaseHeuristic:
+    """ Admissible heuristic: the largest sum of pattern database distances over the additive groups
+
+    Attributes
+    ----------
+    databases : list of PatternDatabase
+
+    groups : list of lists of indices into databases
+    """
+    def __init__(self, problem, patterns=None, directory=None):
+        """
+        Parameters
+        ----------
+        problem : BasePlanningProblem
+
+        patterns : list of lists of int
+            Indices into problem.state_map (default: goal_patterns(problem))
+
+        directory : str
+            Where to keep memory-mapped databases between runs (default: in memory)
+        """
+        patterns = goal_patterns(problem) if patterns is None else patterns
+        if directory is not None: os.makedirs(directory, exist_ok=True)
+        self.databases = [
+            PatternDatabase(problem, pattern, path=None if directory is None else
+                            os.path.join(directory, "pdb-{}.bin".format(pattern_signature(problem, pattern)[:16])))
+            for pattern in patterns
+        ]
+        self.groups = additive_groups(problem, patterns)
+
+    def __call__(self, node):
+        state = node.state
+        distances = [ database.distance(state) for database in self.databases ]
+        return max(( sum( distances[i] for i in group ) for group in self.groups ), default=0)
+
+    def close(self):
+        for database in self.databases: database.close()
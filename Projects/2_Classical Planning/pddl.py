@@ -0,0 +1,456 @@
+""" Planning problems loaded from PDDL domain and problem files
+
+Supports the STRIPS subset of PDDL which BasePlanningProblem can represent:
+typed objects and constants (:typing), conjunctions of literals in action
+preconditions (:negative-preconditions, :equality), conjunctions of literals in
+effects, and a conjunction of atoms as the goal.
+
+Grounding instantiates every action schema with the objects of the right types,
+checking the static predicates (those no action changes, and equality) as soon
+as their arguments are bound, then keeps the actions reachable from the initial
+state in the delete relaxation. Static predicates are compiled away, and the
+fluents are the reachable atoms plus the goals.
+
+Grounding a large generated domain can take longer than searching it, so
+load_pddl() can cache the compiled problem (fluents, initial state, goals,
+action precondition and effect bitmasks, and static mutexes) in a binary file
+named after a hash of the input text. Later runs on the same files load it
+without parsing or grounding anything. Static mutexes come from invariants of
+the action schemas (see mutex_groups), which is much cheaper on large problems
+than growing a planning graph with mutexes.
+"""
+import hashlib
+import os
+import pickle
+import re
+from collections import defaultdict, namedtuple
+from itertools import combinations
+
+from aimacode.planning import Action
+from _utils import FluentState, LiteralTable
+from planning_problem import BasePlanningProblem
+
+
+FORMAT = 'pddl-1'  # bump when the compiled format changes, so old cache files are rebuilt
+
+Schema  = namedtuple("Schema", ("name", "parameters", "precondition", "effect"))
+Domain  = namedtuple("Domain", ("name", "types", "constants", "predicates", "actions"))
+Task    = namedtuple("Task", ("name", "domain", "objects", "init", "goal"))
+Literal = namedtuple("Literal", ("positive", "atom"))  # atom is a tuple (predicate, *args)
+
+
+def parse_sexpr(text):
+    """ Parse PDDL text into nested lists of tokens, dropping ; comments """
+    tokens = re.findall(r'[()]|[^\s()]+', re.sub(r';[^\n]*', '', text))
+    stack = [[]]
+    for token in tokens:
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            if len(stack) == 1: raise ValueError("unbalanced ')' in PDDL")
+            closed = stack.pop()
+            stack[-1].append(closed)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1: raise ValueError("unbalanced '(' in PDDL")
+    if len(stack[0]) != 1 or not isinstance(stack[0][0], list) or _keyword(stack[0][0]) != 'define':
+        raise ValueError("expected a single (define ...) in PDDL")
+    return stack[0][0]
+
+
+def _keyword(tokens):
+    return tokens[0].lower() if tokens and isinstance(tokens[0], str) else None
+
+
+def _sections(define):
+    """ Map the name of each (:section ...) of a (define ...) to its contents """
+    sections = {}
+    for item in define[2:]:
+        if not isinstance(item, list) or not _keyword(item) or not item[0].startswith(':'):
+            raise ValueError("unexpected {!r} in PDDL".format(item))
+        sections[item[0].lower()] = item[1:]
+    return sections
+
+
+def parse_typed_list(tokens):
+    """ Parse 'a b - t c' into [(a, t), (b, t), (c, 'object')] """
+    typed, names = [], []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] == '-':
+            if i + 1 == len(tokens): raise ValueError("missing type after '-' in PDDL")
+            kind = tokens[i + 1]
+            if isinstance(kind, list):
+                if _keyword(kind) != 'either': raise ValueError("unsupported type {!r} in PDDL".format(kind))
+                kind = tuple(kind[1:])
+            typed.extend( (name, kind) for name in names )
+            names = []
+            i += 2
+        else:
+            names.append(tokens[i])
+            i += 1
+    return typed + [ (name, 'object') for name in names ]
+
+
+def parse_literals(formula):
+    """ Flatten a conjunction of literals into a list of Literal """
+    if not formula:
+        return []
+    keyword = _keyword(formula)
+    if keyword == 'and':
+        return [ literal for part in formula[1:] for literal in parse_literals(part) ]
+    if keyword == 'not':
+        if len(formula) != 2 or _keyword(formula[1]) in ('and', 'not', 'or'):
+            raise ValueError("only atoms can be negated in PDDL: {!r}".format(formula))
+        return [ Literal(False, tuple(formula[1])) ]
+    if keyword in ('or', 'imply', 'exists', 'forall', 'when', 'increase', 'decrease'):
+        raise ValueError("unsupported PDDL formula ({} ...)".format(keyword))
+    if any( isinstance(token, list) for token in formula ):
+        raise ValueError("malformed PDDL atom {!r}".format(formula))
+    return [ Literal(True, tuple(formula)) ]
+
+
+def parse_domain(text) -> Domain:
+    define   = parse_sexpr(text)
+    sections = _sections(define)
+    types = { 'object': None }
+    for name, parent in parse_typed_list(sections.get(':types', [])):
+        types[name] = parent
+    predicates = { predicate[0]: [ kind for _, kind in parse_typed_list(predicate[1:]) ]
+                   for predicate in sections.get(':predicates', []) }
+    actions = []
+    for item in define[2:]:
+        if _keyword(item) != ':action': continue
+        fields = { item[i].lower(): item[i + 1] for i in range(2, len(item) - 1, 2) }
+        effect = parse_literals(fields.get(':effect', []))
+        actions.append(Schema(
+            item[1],
+            parse_typed_list(fields.get(':parameters', [])),
+            parse_literals(fields.get(':precondition', [])),
+            effect,
+        ))
+    return Domain(define[1][1], types, parse_typed_list(sections.get(':constants', [])), predicates, actions)
+
+
+def parse_problem(text) -> Task:
+    define   = parse_sexpr(text)
+    sections = _sections(define)
+    init = []
+    for atom in sections.get(':init', []):
+        if _keyword(atom) == 'not': continue  # closed world: everything not listed is false
+        init.extend( literal.atom for literal in parse_literals(atom) )
+    goal = parse_literals(sections[':goal'][0] if sections.get(':goal') else [])
+    if not all( literal.positive for literal in goal ):
+        raise ValueError("negative goals are not supported")
+    return Task(define[1][1], sections.get(':domain', [None])[0], parse_typed_list(sections.get(':objects', [])),
+                init, [ literal.atom for literal in goal ])
+
+
+def _objects_by_type(domain, task):
+    """ Map each type to the objects and constants of that type or one of its subtypes """
+    objects = defaultdict(dict)  # type -> {name: None}, a set which keeps the order of declaration
+    for name, kind in domain.constants + task.objects:
+        for member in (kind if isinstance(kind, tuple) else (kind,)):
+            while member is not None:
+                objects[member][name] = None
+                member = None if member == 'object' else domain.types.get(member, 'object')
+    return objects
+
+
+def ground(domain, task):
+    """ Ground a parsed domain and problem
+
+    Returns
+    -------
+    (fluents, initial, goal, actions)
+        fluents is a list of atoms (tuples of predicate and argument names),
+        initial the set of true atoms, goal a list of atoms, and actions a
+        list of (name, args, pre_pos, pre_neg, add, rem) with lists of atoms
+    """
+    fluent_predicates = { literal.atom[0] for schema in domain.actions for literal in schema.effect }
+    init    = set(task.init)
+    objects = _objects_by_type(domain, task)
+
+    def holds(literal, binding):
+        atom = tuple( binding.get(arg, arg) for arg in literal.atom )
+        true = atom[1] == atom[2] if atom[0] == '=' else atom in init
+        return true == literal.positive
+
+    def substitute(literals, positive, binding):
+        return [ tuple( binding.get(arg, arg) for arg in literal.atom ) for literal in literals if literal.positive == positive ]
+
+    grounded = []
+    for schema in domain.actions:
+        variables = [ name for name, _ in schema.parameters ]
+        # check each static literal as soon as the last of its variables is bound
+        checks = [ [] for _ in variables ]
+        dynamic = []
+        for literal in schema.precondition:
+            if literal.atom[0] == '=' or literal.atom[0] not in fluent_predicates:
+                depth = max(( variables.index(arg) for arg in literal.atom[1:] if arg in variables ), default=None)
+                if depth is None:
+                    if not holds(literal, {}): break  # never applicable
+                else:
+                    checks[depth].append(literal)
+            else:
+                dynamic.append(literal)
+        else:  # no static literal without variables is false
+            candidates = [
+                list({ name: None for member in (kind if isinstance(kind, tuple) else (kind,)) for name in objects[member] })
+                for _, kind in schema.parameters
+            ]
+
+            def bind(depth, binding):
+                if depth == len(variables):
+                    yield dict(binding)
+                    return
+                for name in candidates[depth]:
+                    binding[variables[depth]] = name
+                    if all( holds(literal, binding) for literal in checks[depth] ):
+                        yield from bind(depth + 1, binding)
+                binding.pop(variables[depth], None)
+
+            for binding in bind(0, {}):
+                grounded.append((
+                    schema.name, tuple( binding[name] for name in variables ),
+                    substitute(dynamic, True, binding), substitute(dynamic, False, binding),
+                    substitute(schema.effect, True, binding), substitute(schema.effect, False, binding),
+                ))
+
+    initial = { atom for atom in init if atom[0] in fluent_predicates }
+    reached = _relaxed_reachable(initial, grounded)
+    fluents = reached | set(task.goal)
+    actions = [
+        (name, args, pre_pos, [ atom for atom in pre_neg if atom in fluents ],
+         add, [ atom for atom in rem if atom in fluents ])
+        for name, args, pre_pos, pre_neg, add, rem in grounded
+        if all( atom in reached for atom in pre_pos )
+    ]
+    return list(fluents), initial, list(task.goal), actions
+
+
+def _relaxed_reachable(init, actions):
+    """ Atoms reachable from init ignoring delete effects and negative preconditions,
+    counting the unreached preconditions of each action (linear in the size of the actions) """
+    unreached = [ len(set(pre_pos)) for _, _, pre_pos, _, _, _ in actions ]
+    waiting   = defaultdict(list)
+    for i, (_, _, pre_pos, _, _, _) in enumerate(actions):
+        for atom in set(pre_pos): waiting[atom].append(i)
+    reached = set()
+    queue   = list(init)
+    for i, count in enumerate(unreached):
+        if not count: queue.extend(actions[i][4])
+    while queue:
+        atom = queue.pop()
+        if atom in reached: continue
+        reached.add(atom)
+        for i in waiting.pop(atom, ()):
+            unreached[i] -= 1
+            if not unreached[i]: queue.extend(actions[i][4])
+    return reached
+
+
+def _balanced(invariant, schema):
+    """ Whether every atom the schema adds to the invariant comes with the deletion of a
+    precondition in the invariant with the same fixed argument, so the number of true
+    atoms in the invariant never grows. Returns True, or a deleted precondition which
+    could be added to the invariant to balance it, or False.
+    """
+    def fixed(atom):
+        position = invariant[atom[0]]
+        return None if position is None else atom[1 + position]
+
+    adds = [ e.atom for e in schema.effect if e.positive and e.atom[0] in invariant ]
+    if len(adds) > 1: return False  # could add two atoms of the same instance
+    for atom in adds:
+        deletes = [ e.atom for e in schema.effect if not e.positive and Literal(True, e.atom) in schema.precondition ]
+        if any( d[0] in invariant and fixed(d) == fixed(atom) for d in deletes ):
+            continue
+        position = invariant[atom[0]]
+        for d in deletes:
+            if d[0] in invariant: continue
+            if position is None:
+                return d[0], None
+            if fixed(atom) in d[1:]:
+                return d[0], d[1:].index(fixed(atom))
+        return False
+    return True
+
+
+def mutex_groups(domain, fluents, initial, max_predicates=4):
+    """ Groups of fluents of which at most one is true in any reachable state, from
+    invariants of the action schemas [Helmert 2009]
+
+    An invariant maps some predicates to the position of one fixed argument (or
+    None), eg. {At: 0, In: 0}: for each object x, at most one of At(x, *) and
+    In(x, *) is true. It holds if it holds in the initial state and every
+    schema is balanced (see _balanced). Candidates start from each argument of
+    each fluent predicate and grow with the predicates needed to balance them.
+
+    Returns
+    -------
+    list of lists of atoms
+    """
+    arity = {}
+    for schema in domain.actions:
+        for literal in schema.effect: arity[literal.atom[0]] = len(literal.atom) - 1
+    candidates = [ { predicate: position } for predicate in sorted(arity)
+                   for position in [None] + list(range(arity[predicate])) ]
+    invariants, seen = [], set()
+    while candidates:
+        invariant = candidates.pop(0)
+        key = frozenset(invariant.items())
+        if key in seen: continue
+        seen.add(key)
+        for schema in domain.actions:
+            balanced = _balanced(invariant, schema)
+            if balanced is True: continue
+            if balanced and len(invariant) < max_predicates:
+                candidates.append({ **invariant, balanced[0]: balanced[1] })
+            break
+        else:
+            invariants.append(invariant)
+
+    groups = {}  # tuple of atoms -> None, a set which keeps the order groups are found in
+    for invariant in invariants:
+        instances = defaultdict(list)
+        for atom in fluents:
+            if atom[0] in invariant:
+                position = invariant[atom[0]]
+                instances[None if position is None else atom[1 + position]].append(atom)
+        if any( sum( atom in initial for atom in group ) > 1 for group in instances.values() ):
+            continue
+        groups.update( (tuple(sorted(group)), None) for group in instances.values() if len(group) > 1 )
+    return [ list(group) for group in groups ]
+
+
+def compile_pddl(domain_text, problem_text):
+    """ Parse and ground PDDL text into the dict stored in cache files (see PddlProblem) """
+    domain = parse_domain(domain_text)
+    task   = parse_problem(problem_text)
+    fluents, initial, goal, actions = ground(domain, task)
+
+    # fluent indices follow BasePlanningProblem.state_map, which is sorted by name
+    table = LiteralTable()
+    names = { atom: str(table.literal(*atom)) for atom in fluents }
+    fluents = sorted(fluents, key=names.get)
+    index = { atom: i for i, atom in enumerate(fluents) }
+
+    def mask(atoms):
+        return sum( 1 << index[atom] for atom in set(atoms) )
+
+    compiled = {
+        "format":  FORMAT,
+        "name":    task.name,
+        "fluents": fluents,
+        "initial": mask(initial),
+        "goal":    [ index[atom] for atom in goal ],
+        "actions": [ (name, args, mask(pre_pos), mask(pre_neg), mask(add), mask(rem))
+                     for name, args, pre_pos, pre_neg, add, rem in actions ],
+        "mutex_groups": [ [ index[atom] for atom in group ] for group in mutex_groups(domain, fluents, initial) ],
+    }
+    return compiled
+
+
+class PddlProblem(BasePlanningProblem):
+    """ A grounded PDDL problem
+
+    Attributes
+    ----------
+    name : str
+        The name of the PDDL problem
+
+    action_masks : list of (Action, int, int, int, int)
+        The compiled bitmasks (see BasePlanningProblem.get_action_masks), so
+        actions() tests each action with two integer operations
+
+    effect_masks : dict
+        Action -> (add, rem) bitmasks over state_map, used by result()
+    """
+    def __init__(self, compiled):
+        """
+        Parameters
+        ----------
+        compiled : dict
+            The output of compile_pddl()
+        """
+        table   = LiteralTable()
+        fluents = [ table.literal(*atom) for atom in compiled["fluents"] ]
+        initial = compiled["initial"]
+        pos = [ s for i, s in enumerate(fluents) if initial >> i & 1 ]
+        neg = [ s for i, s in enumerate(fluents) if not initial >> i & 1 ]
+        super().__init__(FluentState(pos, neg), [ fluents[i] for i in compiled["goal"] ])
+        self.name = compiled["name"]
+
+        def literals(mask):
+            found = []
+            while mask:
+                low = mask & -mask
+                found.append(self.state_map[low.bit_length() - 1])
+                mask ^= low
+            return found
+
+        self.actions_list = []
+        self.action_masks = []
+        self.effect_masks = {}
+        for name, args, pre_pos, pre_neg, add, rem in compiled["actions"]:
+            action = Action(self.literals.expr(name, *args), [literals(pre_pos), literals(pre_neg)],
+                            [literals(add), literals(rem)])
+            self.actions_list.append(action)
+            self.action_masks.append((action, pre_pos, pre_neg, add, rem & ~add))
+            self.effect_masks[action] = (add, rem)
+        self.static_mutexes = {
+            frozenset(((i, True), (j, True))) for group in compiled["mutex_groups"] for i, j in combinations(group, 2)
+        }
+
+    def actions(self, state):
+        packed = self.pack_state(state)
+        return [ action for action, pos, neg, _, _ in self.action_masks if packed & pos == pos and not packed & neg ]
+
+    def result(self, state, action):
+        add, rem = self.effect_masks[action]
+        return self.unpack_state(self.pack_state(state) & ~rem | add)
+
+
+def load_pddl(domain_path, problem_path, cache_dir=None) -> PddlProblem:
+    """ Load a PddlProblem from a domain and a problem file
+
+    Parameters
+    ----------
+    domain_path, problem_path : str
+
+    cache_dir : str
+        Directory to keep compiled problems in, named after a hash of both
+        files, so that later runs load them instead of grounding again.
+        Without a directory the problem is always compiled.
+    """
+    with open(domain_path) as file:
+        domain_text = file.read()
+    with open(problem_path) as file:
+        problem_text = file.read()
+    if cache_dir is None:
+        return PddlProblem(compile_pddl(domain_text, problem_text))
+
+    key  = hashlib.sha1('\0'.join((FORMAT, domain_text, problem_text)).encode()).hexdigest()
+    path = os.path.join(cache_dir, "pddl-{}.bin".format(key[:16]))
+    compiled = _load_compiled(path, key)
+    if compiled is None:
+        compiled = compile_pddl(domain_text, problem_text)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as file:
+            pickle.dump({ "key": key, "compiled": compiled }, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    return PddlProblem(compiled)
+
+
+def _load_compiled(path, key):
+    """ The compiled problem in a cache file, or None if it is missing, stale or unreadable """
+    try:
+        with open(path, 'rb') as file:
+            data = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(data, dict) or data.get("key") != key:
+        return None
+    return data["compiled"]
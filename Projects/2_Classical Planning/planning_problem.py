@@ -1,11 +1,16 @@
 
-from functools import lru_cache
+import hashlib
 
 from aimacode.logic import PropKB
 from aimacode.search import Node, Problem
 
-from _utils import encode_state, decode_state
-from my_planning_graph import PlanningGraph
+from _utils import (
+    HeuristicCache, LiteralTable, encode_state, decode_state, heuristic_cache,
+    load_heuristic_caches, save_heuristic_caches
+)
+from landmarks import LandmarkGraph
+from my_planning_graph import PlanningGraph, RelaxedPlanner, static_mutexes
+from pattern_database import PatternDatabaseHeuristic
 
     ##############################################################################
     #                 YOU DO NOT NEED TO MODIFY CODE IN THIS FILE                #
@@ -13,12 +18,81 @@ from my_planning_graph import PlanningGraph
 
 
 class BasePlanningProblem(Problem):
+    heuristic_cache_size = 2**16  # per heuristic, None = unbounded
+    pdb_directory = None          # where h_pdb memory-maps its pattern databases, None = in memory
+
     def __init__(self, initial, goal):
         self.state_map = sorted(initial.pos + initial.neg, key=str)
         self.initial_state_TF = encode_state(initial, self.state_map)
+        self.literals = LiteralTable(self.state_map)  # literal IDs == index in state_map
+        self.fluent_index = self.literals.ids
+        self.heuristic_caches = {}
+        self.pattern_databases = None
+        self.landmark_graph = None
+        self.relaxed_planner = None
+        self.static_mutexes = None
+        self.action_masks = None
         super().__init__(self.initial_state_TF, goal=goal)
 
-    @lru_cache()
+    def pack_state(self, state) -> int:
+        """ Encode a state as an int bitmask (bit i is the value of state_map[i]),
+        which is much smaller to store or send between processes than a tuple of bools
+        """
+        return int(''.join( '1' if f else '0' for f in reversed(state) ) or '0', 2)
+
+    def unpack_state(self, packed: int) -> tuple:
+        bits = bin(packed)[:1:-1].ljust(len(self.state_map), '0')
+        return tuple( bit == '1' for bit in bits )
+
+    def get_heuristic_cache(self, name) -> HeuristicCache:
+        if name not in self.heuristic_caches:
+            self.heuristic_caches[name] = HeuristicCache(self.heuristic_cache_size)
+        return self.heuristic_caches[name]
+
+    def get_static_mutexes(self) -> set:
+        """ Pairs of (fluent index, value) literals which are never true together in a
+        reachable state, found on the first call (see my_planning_graph.static_mutexes)
+        """
+        if self.static_mutexes is None:
+            self.static_mutexes = static_mutexes(self)
+        return self.static_mutexes
+
+    def get_action_masks(self) -> list:
+        """ (action, pre_pos, pre_neg, add, rem) for each action in actions_list, with
+        bitmasks over state_map in the layout of pack_state(), computed on the first call
+        (rem leaves out fluents which the action also adds)
+        """
+        if self.action_masks is None:
+            index = self.fluent_index
+            def mask(literals): return sum( 1 << index[s] for s in literals )
+            self.action_masks = [
+                (action, mask(action.precond_pos), mask(action.precond_neg),
+                 mask(action.effect_add), mask(action.effect_rem - action.effect_add))
+                for action in self.actions_list
+            ]
+        return self.action_masks
+
+    def signature(self) -> str:
+        """ Hash of the fluents, goal and actions, used to tag on-disk snapshots """
+        data = repr((
+            [ str(s) for s in self.state_map ],
+            sorted(str(g) for g in self.goal),
+            [ str(a) for a in getattr(self, 'actions_list', []) ],
+        ))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def save_heuristic_caches(self, path):
+        save_heuristic_caches(self.heuristic_caches, self.signature(), path)
+
+    def load_heuristic_caches(self, path) -> int:
+        """ Returns the number of cached heuristic values loaded from path """
+        count = 0
+        for name, items in load_heuristic_caches(path, self.signature()).items():
+            self.get_heuristic_cache(name).update(items)
+            count += len(items)
+        return count
+
+    @heuristic_cache
     def h_unmet_goals(self, node):
         """ This heuristic estimates the minimum number of actions that must be
         carried out from the current state in order to satisfy all of the goal
@@ -27,7 +101,39 @@ class BasePlanningProblem(Problem):
         """
         return sum(1 for i, f in enumerate(self.state_map) if not node.state[i] and f in self.goal)
 
-    @lru_cache()
+    def h_landmarks(self, node):
+        """ This heuristic counts the fact landmarks (fluents true at some point
+        in every relaxed plan) which have not been reached on the path to the
+        node, plus reached goals which have since been undone. Landmarks are
+        extracted once per problem; each node updates its parent's set of
+        reached landmarks, so the heuristic depends on the path and is not cached.
+
+        See Also
+        --------
+        landmarks.py
+        """
+        if self.landmark_graph is None:
+            self.landmark_graph = LandmarkGraph(self)
+        return self.landmark_graph.count(node.state, self.landmark_graph.node_accepted(node))
+
+    @heuristic_cache
+    def h_relaxed_plan(self, node):
+        """ This heuristic counts the actions in a plan for the relaxed problem
+        (ignoring delete effects), extracted from a relaxed planning graph as in
+        the FF planner. It is not admissible, but is usually more informative
+        than levelsum, because actions which achieve several goals are only
+        counted once.
+
+        See Also
+        --------
+        my_planning_graph.RelaxedPlanner
+        """
+        if self.relaxed_planner is None:
+            self.relaxed_planner = RelaxedPlanner(self)
+        plan = self.relaxed_planner.plan(node.state)
+        return float('inf') if plan is None else len(plan)
+
+    @heuristic_cache
     def h_pg_levelsum(self, node):
         """ This heuristic uses a planning graph representation of the problem
         state space to estimate the sum of the number of actions that must be
@@ -42,7 +148,7 @@ class BasePlanningProblem(Problem):
         score = pg.h_levelsum()
         return score
 
-    @lru_cache()
+    @heuristic_cache
     def h_pg_maxlevel(self, node):
         """ This heuristic uses a planning graph representation of the problem
         to estimate the maximum level cost out of all the individual goal literals.
@@ -57,7 +163,7 @@ class BasePlanningProblem(Problem):
         score = pg.h_maxlevel()
         return score
 
-    @lru_cache()
+    @heuristic_cache
     def h_pg_setlevel(self, node):
         """ This heuristic uses a planning graph representation of the problem
         to estimate the level cost in the planning graph to achieve all of the
@@ -71,6 +177,33 @@ class BasePlanningProblem(Problem):
         score = pg.h_setlevel()
         return score
 
+    def h_pdb(self, node):
+        """ This heuristic looks up the distance to the goal of the state projected
+        onto small sets of fluents (eg. one cargo and the planes) in pattern
+        databases, precomputed on the first call. It is admissible, and costs a
+        few array lookups per node.
+
+        See Also
+        --------
+        pattern_database.py
+        """
+        if self.pattern_databases is None:
+            self.pattern_databases = PatternDatabaseHeuristic(self, directory=self.pdb_directory)
+        return self.pattern_databases(node)
+
+    def preferred_actions(self, node):
+        """ Return the "helpful" actions in node.state: applicable actions that add
+        an unmet goal, or add an unmet precondition of an action that would.
+        Used as preferred operators by lazy_greedy_best_first_graph_search
+        """
+        state  = node.state
+        unmet  = { s for f, s in zip(state, self.state_map) if not f and s in self.goal }
+        needed = set(unmet)
+        for action in self.actions_list:
+            if action.effect_add & unmet:
+                needed |= { p for p in action.precond_pos if not state[self.fluent_index[p]] }
+        return [ action for action in self.actions(state) if action.effect_add & needed ]
+
     def actions(self, state):
         """ Return the actions that can be executed in the given state. """
         possible_actions = []
@@ -0,0 +1,179 @@
+""" Run a matrix of problem x search jobs in parallel worker processes
+
+Each job runs in its own process so that a run which exceeds its wall-clock
+or memory limit can be killed and reported without losing the rest of the
+matrix. Results are collected into one row per job, which can be written to
+CSV (same columns as logs/optimized/run_search.pypy3.csv) or JSON. max_rss_mb
+is the memory used by the job itself: the peak resident set size of its
+worker, less the resident memory the worker inherited from the runner when
+it was forked.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from collections import namedtuple
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from _utils import get_heuristic, max_rss_mb, solve
+
+
+Job = namedtuple("Job", ("problem", "algorithm", "heuristic", "problem_fn", "search_fn"))
+
+FIELDS = ("problem", "algorithm", "heuristic", "actions", "expansions", "goal_tests",
+          "new_nodes", "plan_length", "time_seconds", "max_rss_mb", "status")
+
+
+def run_job(job: Job) -> dict:
+    """ Solve a single job in the current process and return its result row
+
+    max_rss_mb is how far the job raised the peak resident set size of the
+    process, which in a freshly forked worker is the memory the job used
+    """
+    start  = max_rss_mb()
+    result = dict.fromkeys(FIELDS)
+    result.update(problem=job.problem, algorithm=job.algorithm, heuristic=job.heuristic)
+    try:
+        problem = job.problem_fn()
+        heuristic_fn = get_heuristic(problem, job.heuristic)
+        ip, node, elapsed = solve(problem, job.search_fn, heuristic_fn)
+        result.update(
+            actions      = len(problem.actions_list),
+            expansions   = ip.succs,
+            goal_tests   = ip.goal_tests,
+            new_nodes    = ip.states,
+            plan_length  = len(node.solution()) if node is not None else None,
+            time_seconds = elapsed,
+            status       = "ok" if node is not None else "failed",
+        )
+    except MemoryError:
+        result["status"] = "memory"
+    if start is not None:
+        result["max_rss_mb"] = max_rss_mb() - start
+    return result
+
+
+def _worker(job, connection, memory_limit):
+    # exit cleanly on terminate(), so that processes the search started (eg. HDA* workers) are stopped too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    if memory_limit and resource is not None:
+        limit = int(memory_limit * 1024 ** 2)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        result = run_job(job)
+    except Exception:
+        result = dict.fromkeys(FIELDS)
+        result.update(problem=job.problem, algorithm=job.algorithm, heuristic=job.heuristic,
+                      status="error: " + traceback.format_exc().strip().splitlines()[-1])
+    connection.send(result)
+    connection.close()
+
+
+def run_portfolio(jobs, processes=None, timeout=None, memory=None, callback=None):
+    """ Run each Job in a separate process, at most `processes` at a time
+
+    Parameters
+    ----------
+    jobs : iterable of Job
+
+    processes : int
+        Number of jobs to run concurrently (default: os.cpu_count())
+
+    timeout : float
+        Wall-clock limit per job in seconds; jobs still running are terminated
+        and reported with status "timeout"
+
+    memory : float
+        Address space limit per job in MB; jobs that exceed it report
+        status "memory" (or "killed" if the OS terminates them first)
+
+    callback : function
+        Called with each result row as soon as its job finishes
+
+    Returns
+    -------
+    list of result dicts, in the same order as jobs
+    """
+    # fork keeps problem and search functions (including lambdas and partials) usable in children
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pending = list(enumerate(jobs))[::-1]
+    results = [None] * len(pending)
+    running = {}  # connection -> (index, job, process, start time)
+    processes = processes or os.cpu_count() or 1
+
+    def finish(connection, result):
+        index, job, process, start = running.pop(connection)
+        process.join(1)
+        if process.is_alive(): process.terminate()
+        if result.get("time_seconds") is None and result["status"] != "ok":
+            result["time_seconds"] = time.monotonic() - start
+        results[index] = result
+        if callback: callback(result)
+
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                index, job = pending.pop()
+                receiver, sender = context.Pipe(duplex=False)
+                # not a daemon, so that searches can start their own processes
+                process = context.Process(target=_worker, args=(job, sender, memory))
+                process.start()
+                sender.close()
+                running[receiver] = (index, job, process, time.monotonic())
+
+            for connection in wait(list(running), timeout=0.1):
+                try:
+                    result = connection.recv()
+                except EOFError:  # child died without reporting, eg. killed by the OOM killer
+                    index, job, process, start = running[connection]
+                    process.join(1)
+                    result = _failed(job, "killed (exit code {})".format(process.exitcode))
+                finish(connection, result)
+
+            if timeout is not None:
+                now = time.monotonic()
+                for connection, (index, job, process, start) in list(running.items()):
+                    if now - start > timeout:
+                        process.terminate()
+                        finish(connection, _failed(job, "timeout"))
+    finally:
+        # eg. on KeyboardInterrupt, as the workers aren't daemons and would outlive the runner
+        for index, job, process, start in running.values():
+            process.terminate()
+            process.join(1)
+    return results
+
+
+def _failed(job, status):
+    result = dict.fromkeys(FIELDS)
+    result.update(problem=job.problem, algorithm=job.algorithm, heuristic=job.heuristic, status=status)
+    return result
+
+
+def write_results(results, path):
+    """ Write result rows as JSON if path ends in .json, else as CSV """
+    with open(path, "w", newline="") as file:
+        if path.endswith(".json"):
+            json.dump(results, file, indent=2)
+        else:
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def format_result(result) -> str:
+    return "{problem!s:>8}  {algorithm:<40} {heuristic:<15} {status:<8} {expansions!s:>10} {plan_length!s:>6} {time:>9}  {rss:>8}".format(
+        time = "{:.2f}s".format(result["time_seconds"]) if result["time_seconds"] is not None else "-",
+        rss  = "{:.0f}MB".format(result["max_rss_mb"]) if result["max_rss_mb"] is not None else "-",
+        **{ **result, "heuristic": result["heuristic"] or "" }
+    )
@@ -0,0 +1,124 @@
+import argparse
+import textwrap
+from collections import defaultdict
+from functools import partial
+
+from air_cargo_problems import air_cargo_random
+from portfolio import Job, format_result, run_portfolio, write_results
+from run_search import SEARCHES
+
+
+DEFAULT_SIZES = ["2x2x2", "3x2x3", "4x2x4", "5x3x4", "6x3x5", "8x4x6"]
+
+
+def parse_size(size):
+    """ Parse a "CARGOSxPLANESxAIRPORTS" string, eg. "4x2x4" """
+    try:
+        n_cargos, n_planes, n_airports = map(int, size.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must be CARGOSxPLANESxAIRPORTS, eg. 4x2x4")
+    return n_cargos, n_planes, n_airports
+
+
+def benchmark(sizes, s_choices, seed=0, n_goals=None, jobs=None, timeout=None, memory=None):
+    """ Solve random air cargo problems of each size with each search, in parallel
+
+    Returns
+    -------
+    list of result rows (see portfolio.FIELDS), with problem labelled "CxPxA"
+    """
+    portfolio = []
+    for n_cargos, n_planes, n_airports in sizes:
+        label = "{}x{}x{}".format(n_cargos, n_planes, n_airports)
+        problem_fn = partial(air_cargo_random, n_cargos, n_planes, n_airports, seed=seed, n_goals=n_goals)
+        for i in s_choices:
+            name, search_fn, heuristic = SEARCHES[i-1]
+            portfolio.append(Job(label, name, heuristic, problem_fn, search_fn))
+    return run_portfolio(portfolio, processes=jobs, timeout=timeout, memory=memory,
+                         callback=lambda result: print(format_result(result), flush=True))
+
+
+def print_table(results, sizes):
+    """ Tabulate expansions, time and memory for each search (rows) against problem size (columns) """
+    labels = [ "{}x{}x{}".format(*size) for size in sizes ]
+    table  = defaultdict(dict)
+    for result in results:
+        table[(result["algorithm"], result["heuristic"])][result["problem"]] = result
+
+    for field, fmt in [("expansions", "{:d}"), ("time_seconds", "{:.2f}"), ("max_rss_mb", "{:.0f}")]:
+        print("\n{}".format(field))
+        print("{:<60}".format("") + "".join("{:>12}".format(label) for label in labels))
+        for (algorithm, heuristic), row in table.items():
+            cells = []
+            for label in labels:
+                result = row.get(label)
+                if result is None or result["status"] != "ok":
+                    cells.append(result["status"] if result else "-")
+                else:
+                    cells.append(fmt.format(result[field]))
+            print("{:<60}".format("{} {}".format(algorithm, heuristic)) + "".join("{:>12}".format(cell[:11]) for cell in cells))
+
+
+def plot(results, sizes, path):
+    """ Plot expansions, time and memory against problem size for each search (requires matplotlib) """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = [ "{}x{}x{}".format(*size) for size in sizes ]
+    series = defaultdict(list)
+    for result in results:
+        if result["status"] == "ok":
+            series["{} {}".format(result["algorithm"], result["heuristic"])].append(result)
+
+    figure, axes = plt.subplots(1, 3, figsize=(18, 5))
+    for ax, field in zip(axes, ["expansions", "time_seconds", "max_rss_mb"]):
+        for name, rows in sorted(series.items()):
+            rows = sorted(rows, key=lambda r: labels.index(r["problem"]))
+            ax.plot([ r["problem"] for r in rows ], [ r[field] for r in rows ], marker="o", label=name)
+        ax.set_title(field)
+        ax.set_xlabel("cargos x planes x airports")
+        if field != "max_rss_mb": ax.set_yscale("log")
+    axes[0].legend(fontsize="small")
+    figure.tight_layout()
+    figure.savefig(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Sweep randomly generated air cargo problems of increasing size to see how "
+                    "expansions, time and memory grow for each search and heuristic.",
+        epilog=textwrap.dedent("""\
+            Example Usage:
+            --------------
+            - Greedy search with each heuristic, 4 processes, 60s per run:
+
+                $python run_benchmark.py -s 4 5 6 7 -j 4 --timeout 60 -o logs/benchmark.csv --plot logs/benchmark.png
+        """)
+    )
+    parser.add_argument('--sizes', nargs="+", type=parse_size, default=list(map(parse_size, DEFAULT_SIZES)), metavar='CxPxA',
+                        help="Problem sizes as CARGOSxPLANESxAIRPORTS. Default: {}".format(" ".join(DEFAULT_SIZES)))
+    parser.add_argument('-s', '--searches', nargs="+", choices=range(1, len(SEARCHES)+1), type=int, metavar='',
+                        default=list(range(1, len(SEARCHES)+1)),
+                        help="Indices of the search algorithms (see run_search.py). Default: all")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the generated problems")
+    parser.add_argument('--goals', type=int, default=None, metavar='N',
+                        help="Number of cargos with a goal location. Default: all cargos")
+    parser.add_argument('-j', '--jobs', type=int, default=None, metavar='N', help="Number of worker processes")
+    parser.add_argument('--timeout', type=float, default=60, metavar='SECONDS', help="Wall-clock limit per run")
+    parser.add_argument('--memory', type=float, default=None, metavar='MB', help="Memory limit per run")
+    parser.add_argument('-o', '--output', default=None, metavar='PATH', help="Write results as CSV (or JSON if PATH ends with .json)")
+    parser.add_argument('--plot', default=None, metavar='PATH', help="Save a plot of the results (requires matplotlib)")
+    args = parser.parse_args()
+
+    results = benchmark(args.sizes, sorted(set(args.searches)), seed=args.seed, n_goals=args.goals,
+                        jobs=args.jobs, timeout=args.timeout, memory=args.memory)
+    print_table(results, args.sizes)
+    if args.output:
+        write_results(results, args.output)
+    if args.plot:
+        try:
+            plot(results, args.sizes, args.plot)
+        except ImportError:
+            print("\n--plot requires matplotlib: pip install matplotlib")
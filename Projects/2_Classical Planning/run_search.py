@@ -1,13 +1,26 @@
 
 import argparse
+import os
+from functools import partial
 
 from aimacode.search import (breadth_first_search, astar_search,
     breadth_first_tree_search, depth_first_graph_search, uniform_cost_search,
-    greedy_best_first_graph_search, depth_limited_search,
-    recursive_best_first_search)
+    greedy_best_first_graph_search, lazy_greedy_best_first_graph_search,
+    depth_limited_search, recursive_best_first_search,
+    iterative_deepening_astar_search, iterative_deepening_depth_first_search, simplified_memory_bounded_astar_search,
+    anytime_weighted_astar_search, alternation_search, bidirectional_breadth_first_search, Checkpoint)
 from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_p4
+from external_search import external_breadth_first_search
+from my_planning_graph import graphplan
+from parallel_search import hda_star_search
+from partial_order import stubborn_sets
+from pddl import load_pddl
+from planning_problem import BasePlanningProblem
+from portfolio import Job, format_result, run_portfolio, write_results
+from symmetry import symmetry_reduced
+from telemetry import HistogramSink, make_telemetry
 
-from _utils import run_search
+from _utils import get_heuristic, run_search
 
     ##############################################################################
     #                 YOU DO NOT NEED TO MODIFY CODE IN THIS FILE                #
@@ -44,7 +57,34 @@ SEARCHES = [["breadth_first_search", breadth_first_search, ""],
             ['astar_search', astar_search, 'h_unmet_goals'],
             ['astar_search', astar_search, 'h_pg_levelsum'],
             ['astar_search', astar_search, 'h_pg_maxlevel'],
-            ['astar_search', astar_search, 'h_pg_setlevel']
+            ['astar_search', astar_search, 'h_pg_setlevel'],
+            ['lazy_greedy_best_first_graph_search', lazy_greedy_best_first_graph_search, 'h_pg_levelsum'],
+            ['lazy_greedy_best_first_graph_search (preferred)', partial(lazy_greedy_best_first_graph_search, preferred=True), 'h_pg_levelsum'],
+            ['lazy_greedy_best_first_graph_search (preferred)', partial(lazy_greedy_best_first_graph_search, preferred=True), 'h_pg_setlevel'],
+            ['iterative_deepening_astar_search', iterative_deepening_astar_search, 'h_unmet_goals'],
+            ['iterative_deepening_astar_search', iterative_deepening_astar_search, 'h_pg_levelsum'],
+            ['simplified_memory_bounded_astar_search', simplified_memory_bounded_astar_search, 'h_unmet_goals'],
+            ['simplified_memory_bounded_astar_search', simplified_memory_bounded_astar_search, 'h_pg_levelsum'],
+            ['anytime_weighted_astar_search', anytime_weighted_astar_search, 'h_unmet_goals'],
+            ['anytime_weighted_astar_search', anytime_weighted_astar_search, 'h_pg_levelsum'],
+            ['anytime_weighted_astar_search (restarting)', partial(anytime_weighted_astar_search, restart=True), 'h_pg_levelsum'],
+            ['graphplan', graphplan, ""],
+            ['breadth_first_search (symmetry reduced)', symmetry_reduced(breadth_first_search), ""],
+            ['astar_search (symmetry reduced)', symmetry_reduced(astar_search), 'h_pg_levelsum'],
+            ['hda_star_search', hda_star_search, 'h_unmet_goals'],
+            ['hda_star_search', hda_star_search, 'h_pg_levelsum'],
+            ['astar_search (compact nodes)', partial(astar_search, compact=True), 'h_unmet_goals'],
+            ['external_breadth_first_search', external_breadth_first_search, ""],
+            ['astar_search', astar_search, 'h_pdb'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_landmarks'],
+            ['astar_search', astar_search, 'h_landmarks'],
+            ['greedy_best_first_graph_search', greedy_best_first_graph_search, 'h_relaxed_plan'],
+            ['alternation_search', alternation_search, 'h_unmet_goals,h_pg_levelsum,h_relaxed_plan'],
+            ['alternation_search (boosted)', partial(alternation_search, boost=1000), 'h_unmet_goals,h_pg_levelsum,h_relaxed_plan'],
+            ['breadth_first_search (stubborn sets)', stubborn_sets(breadth_first_search), ""],
+            ['astar_search (stubborn sets)', stubborn_sets(astar_search), 'h_pg_levelsum'],
+            ['bidirectional_breadth_first_search', bidirectional_breadth_first_search, ""],
+            ['iterative_deepening_depth_first_search', iterative_deepening_depth_first_search, ""],
             ]
 
 
@@ -66,18 +106,88 @@ def manual():
         __file__, " ".join(p_choices), " ".join(s_choices)))
 
 
-def main(p_choices, s_choices):
-    problems = [PROBLEMS[i-1] for i in map(int, p_choices)]
-    searches = [SEARCHES[i-1] for i in map(int, s_choices)]
+def main(p_choices, s_choices, cache_size=None, cache_file=None, budget=None,
+         checkpoint=None, checkpoint_interval=300, resume=False,
+         telemetry=None, telemetry_interval=5.0, telemetry_sample=1, pdb_directory=None,
+         processes=None):
+    """ checkpoint is a path to snapshot each search to every checkpoint_interval
+    seconds; with resume=True each search first restores itself from its snapshot.
+    With several problems or searches, each run uses checkpoint.p<problem>.s<search>
 
-    for pname, problem_fn in problems:
-        for sname, search_fn, heuristic in searches:
+    telemetry is a comma separated list of sinks (see telemetry.make_telemetry)
+    to report each search to every telemetry_interval seconds, timing one call
+    in telemetry_sample
+
+    pdb_directory is where h_pdb keeps its pattern databases between runs
+
+    processes is the number of worker processes for searches which take it
+    (heuristic evaluation in A* and greedy best first search, and HDA*)
+    """
+    problems = [(i, PROBLEMS[i-1]) for i in map(int, p_choices)]
+    searches = [(j, SEARCHES[j-1]) for j in map(int, s_choices)]
+
+    for p_index, (pname, problem_fn) in problems:
+        for s_index, (sname, search_fn, heuristic) in searches:
             hstring = heuristic if not heuristic else " with {}".format(heuristic)
             print("\nSolving {} using {}{}...".format(pname, sname, hstring))
 
             problem_instance = problem_fn()
-            heuristic_fn = None if not heuristic else getattr(problem_instance, heuristic)
-            run_search(problem_instance, search_fn, heuristic_fn)
+            if cache_size is not None:
+                problem_instance.heuristic_cache_size = cache_size or None
+            problem_instance.pdb_directory = pdb_directory
+            if cache_file and heuristic:
+                count = problem_instance.load_heuristic_caches(cache_file)
+                print("Loaded {} cached heuristic values from {}".format(count, cache_file))
+
+            snapshots = None
+            if checkpoint:
+                path = checkpoint if len(problems) * len(searches) == 1 else "{}.p{}.s{}".format(checkpoint, p_index, s_index)
+                snapshots = Checkpoint(path, checkpoint_interval, resume=resume, label="{} {}".format(sname, heuristic))
+
+            heuristic_fn = get_heuristic(problem_instance, heuristic)
+            monitor = make_telemetry(telemetry, telemetry_interval, telemetry_sample) if telemetry else None
+            run_search(problem_instance, search_fn, heuristic_fn, time_budget=budget, checkpoint=snapshots,
+                       telemetry=monitor, processes=processes)
+
+            for sink in (monitor.sinks if monitor else []):
+                if isinstance(sink, HistogramSink):
+                    print("Call durations (sampled):\n{}\n".format(sink.format()))
+
+            if snapshots:
+                snapshots.close()
+                print("Checkpoint: {} snapshots written to {}, {} failed".format(
+                    snapshots.saves - snapshots.failures, snapshots.path, snapshots.failures))
+
+            if cache_file and heuristic:
+                problem_instance.save_heuristic_caches(cache_file)
+
+
+def main_parallel(p_choices, s_choices, jobs, timeout=None, memory=None, output=None, cache_size=None):
+    """ Run every problem x search combination in a pool of `jobs` processes,
+    killing runs that exceed the timeout (seconds) or memory (MB) limits, and
+    write one row per run to output (.csv or .json)
+    """
+    def problem_factory(problem_fn):
+        def make_problem():
+            problem = problem_fn()
+            if cache_size is not None:
+                problem.heuristic_cache_size = cache_size or None
+            return problem
+        return make_problem
+
+    portfolio = [
+        Job(i, SEARCHES[j-1][0], SEARCHES[j-1][2], problem_factory(PROBLEMS[i-1][1]), SEARCHES[j-1][1])
+        for i in map(int, p_choices)
+        for j in map(int, s_choices)
+    ]
+    print("Running {} searches with {} processes (memory: peak RSS of each run, less what its worker inherited)...\n".format(
+        len(portfolio), jobs))
+    results = run_portfolio(portfolio, processes=jobs, timeout=timeout, memory=memory,
+                            callback=lambda result: print(format_result(result), flush=True))
+    if output:
+        write_results(results, output)
+        print("\nResults written to {}".format(output))
+    return results
 
 
 if __name__=="__main__":
@@ -90,12 +200,69 @@ if __name__=="__main__":
                         help="Specify the indices of the problems to solve as a list of space separated values. Choose from: {!s}".format(list(range(1, len(PROBLEMS)+1))))
     parser.add_argument('-s', '--searches', nargs="+", choices=range(1, len(SEARCHES)+1), type=int, metavar='',
                         help="Specify the indices of the search algorithms to use as a list of space separated values. Choose from: {!s}".format(list(range(1, len(SEARCHES)+1))))
+    parser.add_argument('--cache-size', type=int, default=None, metavar='N',
+                        help="Maximum number of states cached per heuristic (0 = unbounded). Default: {}".format(BasePlanningProblem.heuristic_cache_size))
+    parser.add_argument('--cache-file', default=None, metavar='PATH',
+                        help="Load heuristic values from PATH before each search, and save them back afterwards. " +
+                             "The file keeps a snapshot per problem.")
+    parser.add_argument('-j', '--jobs', type=int, default=None, metavar='N',
+                        help="Run the problem x search matrix in parallel with N worker processes, " +
+                             "printing one summary line per run")
+    parser.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                        help="With --jobs: wall-clock limit per run; slower runs are killed and reported as timeout")
+    parser.add_argument('--memory', type=float, default=None, metavar='MB',
+                        help="With --jobs: memory limit per run; larger runs are killed and reported")
+    parser.add_argument('-o', '--output', default=None, metavar='PATH',
+                        help="With --jobs: write the results to PATH as CSV, or JSON if PATH ends with .json")
+    parser.add_argument('--budget', type=float, default=None, metavar='SECONDS',
+                        help="Time budget for anytime searches, which print each improved solution " +
+                             "and return the best found within the budget")
+    parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                        help="Snapshot the frontier and explored set of each search to PATH at intervals " +
+                             "(uninformed, uniform cost, greedy and A* searches)")
+    parser.add_argument('--checkpoint-interval', type=float, default=300, metavar='SECONDS',
+                        help="Seconds between checkpoint snapshots. Default: 300")
+    parser.add_argument('--resume', default=None, metavar='PATH',
+                        help="Resume each search from the snapshot at PATH (if it exists), and keep checkpointing to it")
+    parser.add_argument('--telemetry', default=None, metavar='SINKS',
+                        help="Report where search time goes to a comma separated list of sinks: " +
+                             "progress (a line on stderr), jsonl:PATH, histogram (call durations printed at the end)")
+    parser.add_argument('--telemetry-interval', type=float, default=5.0, metavar='SECONDS',
+                        help="Seconds between telemetry reports. Default: 5")
+    parser.add_argument('--telemetry-sample', type=int, default=1, metavar='N',
+                        help="Time one call in N, to reduce the overhead of telemetry. Default: 1")
+    parser.add_argument('--pdb-dir', default=None, metavar='PATH',
+                        help="Directory to save the pattern databases built by h_pdb, which are memory-mapped " +
+                             "by later runs instead of being rebuilt")
+    parser.add_argument('--processes', type=int, default=None, metavar='N',
+                        help="Evaluate the heuristic for the children of each expansion in N worker processes " +
+                             "(A* and greedy best first search; same search as serial), or run HDA* on N workers")
+    parser.add_argument('--pddl', nargs=2, action='append', default=[], metavar=('DOMAIN', 'PROBLEM'),
+                        help="Also solve the problem in the PDDL files DOMAIN and PROBLEM (may be repeated)")
+    parser.add_argument('--pddl-cache', default=None, metavar='PATH',
+                        help="Directory to save grounded PDDL problems in, which later runs load instead of grounding again")
     args = parser.parse_args()
 
+    for domain_file, problem_file in args.pddl:
+        PROBLEMS.append(["PDDL problem {}".format(os.path.basename(problem_file)),
+                         partial(load_pddl, domain_file, problem_file, cache_dir=args.pddl_cache)])
+        args.problems = (args.problems or []) + [len(PROBLEMS)]
+
+    if args.jobs and args.cache_file:
+        parser.error("--cache-file can't be combined with --jobs, whose runs would overwrite each other's caches")
+
     if args.manual:
         manual()
+    elif args.problems and args.searches and args.jobs:
+        main_parallel(list(sorted(set(args.problems))), list(sorted(set((args.searches)))), args.jobs,
+                      timeout=args.timeout, memory=args.memory, output=args.output, cache_size=args.cache_size)
     elif args.problems and args.searches:
-        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))))
+        main(list(sorted(set(args.problems))), list(sorted(set((args.searches)))),
+             cache_size=args.cache_size, cache_file=args.cache_file, budget=args.budget,
+             checkpoint=args.resume or args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+             resume=bool(args.resume), telemetry=args.telemetry,
+             telemetry_interval=args.telemetry_interval, telemetry_sample=args.telemetry_sample,
+             pdb_directory=args.pdb_dir, processes=args.processes)
     else:
         print()
         parser.print_help()
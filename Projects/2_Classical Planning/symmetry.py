@@ -0,0 +1,181 @@
+""" Symmetry reduction for planning problems with interchangeable objects
+
+Two objects are interchangeable if swapping their names maps the initial
+state, the goal and the set of ground actions onto themselves, eg. two cargos
+with no goal waiting at the same airport, or two empty planes parked at the
+same airport. States which are the same up to renaming interchangeable
+objects have plans of the same cost, so a search only needs to visit one of
+them. SymmetryReducedProblem maps every state it generates onto a canonical
+representative, so the unmodified graph searches in aimacode.search store one
+entry per symmetry class in their explored sets, and unreduce() maps a plan
+found in canonical space back to the real objects.
+"""
+from functools import wraps
+from math import factorial
+
+from aimacode.search import Node, Problem, unwrap_problem
+from aimacode.utils import Expr
+
+
+def rename(literal: Expr, mapping: dict) -> Expr:
+    return Expr(literal.op, *( mapping.get(arg, arg) for arg in literal.args ))
+
+
+def action_key(action, mapping=None):
+    mapping = mapping or {}
+    return (
+        action.name,
+        tuple( mapping.get(arg, arg) for arg in action.args ),
+        frozenset( rename(s, mapping) for s in action.precond_pos ),
+        frozenset( rename(s, mapping) for s in action.precond_neg ),
+        frozenset( rename(s, mapping) for s in action.effect_add ),
+        frozenset( rename(s, mapping) for s in action.effect_rem ),
+    )
+
+
+def find_symmetries(problem):
+    """ Partition the objects of a planning problem into classes of interchangeable objects
+
+    Swapping any two objects in a class is a symmetry of the problem, so the
+    symmetry group is the product of the permutation groups of each class.
+
+    Returns
+    -------
+    list of lists of object symbols; classes with a single member are omitted
+    """
+    objects = sorted({ arg for fluent in problem.state_map for arg in fluent.args }, key=str)
+    initial = { s for f, s in zip(problem.initial, problem.state_map) if f }
+    goal    = set(problem.goal)
+    actions = { action_key(action) for action in problem.actions_list }
+
+    def is_symmetry(a, b):
+        mapping = { a: b, b: a }
+        return (all( rename(s, mapping) in problem.fluent_index for s in problem.state_map )
+            and { rename(s, mapping) for s in initial } == initial
+            and { rename(s, mapping) for s in goal } == goal
+            and { action_key(action, mapping) for action in problem.actions_list } == actions)
+
+    # swaps compose, so testing against the first member of each class is enough
+    classes = []
+    for obj in objects:
+        for members in classes:
+            if is_symmetry(members[0], obj):
+                members.append(obj)
+                break
+        else:
+            classes.append([obj])
+    return [ members for members in classes if len(members) > 1 ]
+
+
+class SymmetryReducedProblem(Problem):
+    """ Wraps a BasePlanningProblem so that result() returns canonical states
+
+    Within each class of interchangeable objects, objects are sorted by the
+    values of the fluents that mention them, and renamed in that order. Classes
+    are canonicalized one after another, so states which differ by renaming
+    objects in two classes at once (eg. swapping two cargos together with the
+    planes they are loaded in) are not always merged: every state is mapped to
+    a symmetric state, but not always to the same representative.
+
+    Attributes
+    ----------
+    classes : list of lists of object symbols
+        See find_symmetries()
+
+    group_size : int
+        Number of object renamings in the symmetry group, the most states that
+        can be merged into one canonical state
+    """
+    def __init__(self, problem, classes=None):
+        self.problem    = problem
+        self.unwrapped  = unwrap_problem(problem)  # to rebuild plans without counting the steps as search statistics
+        self.classes    = find_symmetries(problem) if classes is None else classes
+        self.group_size = 1
+        for members in self.classes: self.group_size *= factorial(len(members))
+
+        self.fluent_args = [ (s.op, s.args) for s in problem.state_map ]
+        self.fluent_ids  = { key: i for i, key in enumerate(self.fluent_args) }
+        self.actions_by_key = { (action.name, action.args): action for action in problem.actions_list }
+
+        # columns[c][k] lists the fluents mentioning the k-th member of class c,
+        # in the order of the matching fluents for the first member
+        self.columns = []
+        for members in self.classes:
+            first = [ i for i, (op, args) in enumerate(self.fluent_args) if members[0] in args ]
+            self.columns.append([
+                [ self.fluent_ids[ self._rename(i, { members[0]: obj, obj: members[0] }) ] for i in first ]
+                for obj in members
+            ])
+
+        initial, self.initial_mapping = self.canonicalize(problem.initial)
+        super().__init__(initial, problem.goal)
+
+    def __getattr__(self, attr):
+        return getattr(self.problem, attr)
+
+    def _rename(self, i, mapping):
+        op, args = self.fluent_args[i]
+        return op, tuple( mapping.get(arg, arg) for arg in args )
+
+    def permute(self, state, mapping):
+        """ Rename the objects in state according to mapping """
+        if not mapping: return state
+        permuted = [False] * len(state)
+        for i, f in enumerate(state):
+            if f: permuted[ self.fluent_ids[self._rename(i, mapping)] ] = True
+        return tuple(permuted)
+
+    def canonicalize(self, state):
+        """ Returns (canonical state, mapping of renamed objects to their canonical names) """
+        mapping = {}
+        for members, columns in zip(self.classes, self.columns):
+            signatures = [ tuple( state[i] for i in column ) for column in columns ]
+            order      = sorted(range(len(members)), key=lambda k: signatures[k], reverse=True)
+            renames    = { members[k]: members[slot] for slot, k in enumerate(order) if k != slot }
+            state      = self.permute(state, renames)
+            mapping.update(renames)  # classes are disjoint, so composing renames is a union
+        return state, mapping
+
+    def actions(self, state):
+        return self.problem.actions(state)
+
+    def result(self, state, action):
+        return self.canonicalize(self.problem.result(state, action))[0]
+
+    def goal_test(self, state):
+        return self.problem.goal_test(state)
+
+    def path_cost(self, c, state1, action, state2):
+        return self.problem.path_cost(c, state1, action, state2)
+
+    def h(self, node):
+        return self.problem.h(node)
+
+    def unreduce(self, node):
+        """ Map a node found in canonical space back to a node for the same plan on the real objects
+
+        Tracks sigma, the renaming which maps the real state onto the canonical
+        state at each step, and applies the inverse to each canonical action.
+        """
+        if node is None: return None
+        problem = self.unwrapped
+        sigma = dict(self.initial_mapping)
+        real  = Node(problem.initial)
+        path  = node.path()
+        for parent, child in zip(path, path[1:]):
+            inverse = { canonical: obj for obj, canonical in sigma.items() }
+            action  = self.actions_by_key[(child.action.name, tuple( inverse.get(arg, arg) for arg in child.action.args ))]
+            real    = real.child_node(problem, action)
+            _, step = self.canonicalize(problem.result(parent.state, child.action))
+            sigma   = { obj: step.get(sigma.get(obj, obj), sigma.get(obj, obj)) for obj in set(sigma) | set(step) }
+            sigma   = { obj: canonical for obj, canonical in sigma.items() if obj != canonical }
+        return real
+
+
+def symmetry_reduced(search_function):
+    """ Wrap a search function to search in canonical space and return a plan on the real objects """
+    @wraps(search_function)
+    def search(problem, *args, **kwargs):
+        reduced = SymmetryReducedProblem(problem)
+        return reduced.unreduce(search_function(reduced, *args, **kwargs))
+    return search
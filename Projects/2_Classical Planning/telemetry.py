@@ -0,0 +1,228 @@
+""" Search telemetry: where the time goes, how fast the search expands, and how big it gets
+
+A Telemetry object is attached to an InstrumentedProblem, which then times
+calls to actions(), result() and goal_test(), and solve() wraps the heuristic
+so that it is timed too. Only one call in `sample` is timed (totals are scaled
+up by the sampling rate), so with a large sample the overhead is a counter
+increment per call. Every `interval` seconds, checked on timed calls, a
+snapshot is sent to each sink:
+
+    {"elapsed": seconds since start, "expansions": ..., "expansions_per_sec": since the last snapshot,
+     "goal_tests": ..., "states": ..., "frontier": ..., "explored": ..., "peak_frontier": ...,
+     "peak_explored": ..., "rss_mb": ..., "final": bool,
+     "timers": {name: {"calls": ..., "seconds": estimated total, "histogram": {microseconds: count}}}}
+
+Frontier and explored sizes are read from the containers a search registers
+with aimacode.search.track_search(), so peaks are sampled at each snapshot.
+
+Sinks: ProgressSink prints a progress line, JSONLinesSink writes one JSON
+object per line, and HistogramSink keeps the snapshots in memory.
+"""
+import json
+import sys
+import time
+from functools import wraps
+
+from _utils import max_rss_mb
+
+
+def rss_mb():
+    """ Current resident set size of this process in MB (peak RSS where /proc is unavailable) """
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        import resource
+        return pages * resource.getpagesize() / 1024 ** 2
+    except (OSError, ImportError, ValueError, IndexError):
+        return max_rss_mb()
+
+
+class Timer:
+    """ Times one in `sample` calls of one operation, into a total and a log2 histogram """
+    __slots__ = ('name', 'telemetry', 'sample', 'calls', 'sampled', 'seconds', 'histogram')
+
+    def __init__(self, name, telemetry, sample):
+        self.name      = name
+        self.telemetry = telemetry
+        self.sample    = sample
+        self.calls     = 0
+        self.sampled   = 0
+        self.seconds   = 0.0
+        self.histogram = {}  # upper bound in microseconds (a power of two) -> count
+
+    def measure(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.seconds += elapsed
+            self.sampled += 1
+            bucket = 1 << int(elapsed * 1e6).bit_length()
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+            self.telemetry.tick()
+
+    def wrap(self, fn):
+        """ Returns fn timed by this timer (with the unsampled path inlined, as it is the common case) """
+        timer = self
+        @wraps(fn)
+        def timed(*args):
+            timer.calls += 1
+            if timer.calls % timer.sample:
+                return fn(*args)
+            return timer.measure(fn, *args)
+        return timed
+
+    @property
+    def total(self):
+        """ Estimated total seconds across all calls """
+        return self.seconds * self.calls / self.sampled if self.sampled else 0.0
+
+    def snapshot(self):
+        return { "calls": self.calls, "seconds": self.total, "histogram": dict(sorted(self.histogram.items())) }
+
+
+class Telemetry:
+    def __init__(self, sinks=(), interval=5.0, sample=1):
+        """
+        Parameters
+        ----------
+        sinks : list
+            Objects with emit(snapshot) and close() methods
+
+        interval : float
+            Seconds between snapshots
+
+        sample : int
+            Time one in every `sample` calls
+        """
+        self.sinks    = list(sinks)
+        self.interval = interval
+        self.sample   = max(1, int(sample))
+        self.timers   = {}
+        self.problem  = None
+        self.frontier = self.explored = None
+        self.peak_frontier = self.peak_explored = 0
+        self.start    = self.last = time.monotonic()
+        self.last_expansions = 0
+
+    def timer(self, name) -> Timer:
+        if name not in self.timers:
+            self.timers[name] = Timer(name, self, self.sample)
+        return self.timers[name]
+
+    def attach(self, problem):
+        """ Called by InstrumentedProblem, whose counters are reported """
+        self.problem = problem
+        self.start = self.last = time.monotonic()
+
+    def track(self, frontier, explored):
+        """ Called by search functions with their frontier and explored containers """
+        self.frontier, self.explored = frontier, explored
+
+    def tick(self):
+        if time.monotonic() - self.last >= self.interval:
+            self.report()
+
+    def report(self, final=False):
+        now        = time.monotonic()
+        expansions = getattr(self.problem, 'succs', 0)
+        frontier   = len(self.frontier) if self.frontier is not None else None
+        explored   = len(self.explored) if self.explored is not None else None
+        self.peak_frontier = max(self.peak_frontier, frontier or 0, getattr(self.problem, 'max_frontier', 0))
+        self.peak_explored = max(self.peak_explored, explored or 0)
+        snapshot = {
+            "elapsed":            now - self.start,
+            "expansions":         expansions,
+            "expansions_per_sec": (expansions - self.last_expansions) / max(now - self.last, 1e-9),
+            "goal_tests":         getattr(self.problem, 'goal_tests', 0),
+            "states":             getattr(self.problem, 'states', 0),
+            "frontier":           frontier,
+            "explored":           explored,
+            "peak_frontier":      self.peak_frontier,
+            "peak_explored":      self.peak_explored,
+            "rss_mb":             rss_mb(),
+            "final":              final,
+            "timers":             { name: timer.snapshot() for name, timer in self.timers.items() },
+        }
+        self.last, self.last_expansions = now, expansions
+        for sink in self.sinks: sink.emit(snapshot)
+        return snapshot
+
+    def close(self):
+        """ Send a final snapshot and close the sinks """
+        snapshot = self.report(final=True)
+        for sink in self.sinks: sink.close()
+        return snapshot
+
+
+class ProgressSink:
+    """ Print a one line summary of each snapshot """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def emit(self, snapshot):
+        total  = sum( timer["seconds"] for timer in snapshot["timers"].values() ) or 1
+        shares = "  ".join( "{} {:.0%}".format(name, timer["seconds"] / total)
+                            for name, timer in sorted(snapshot["timers"].items(), key=lambda kv: -kv[1]["seconds"]) )
+        print("[{elapsed:7.1f}s] expansions {expansions} ({expansions_per_sec:.0f}/s)  frontier {frontier} (peak {peak_frontier})"
+              "  explored {explored} (peak {peak_explored})  rss {rss:.0f}MB  {shares}".format(
+                  rss=snapshot["rss_mb"] or 0, shares=shares, **snapshot),
+              file=self.stream, flush=True)
+
+    def close(self):
+        pass
+
+
+class JSONLinesSink:
+    """ Write each snapshot as a line of JSON """
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def emit(self, snapshot):
+        self.file.write(json.dumps(snapshot) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class HistogramSink:
+    """ Keep every snapshot in memory: the expansion rate over time, and the
+    call duration histograms of the last snapshot """
+    def __init__(self):
+        self.snapshots = []
+
+    def emit(self, snapshot):
+        self.snapshots.append(snapshot)
+
+    def close(self):
+        pass
+
+    @property
+    def histograms(self):
+        return { name: timer["histogram"] for name, timer in self.snapshots[-1]["timers"].items() } if self.snapshots else {}
+
+    def format(self) -> str:
+        """ Tabulate the call duration histograms: calls taking up to N microseconds """
+        histograms = self.histograms
+        buckets = sorted({ bucket for histogram in histograms.values() for bucket in histogram })
+        lines = [ "{:<16}".format("<= us") + "".join( "{:>10}".format(bucket) for bucket in buckets ) ]
+        for name, histogram in sorted(histograms.items()):
+            lines.append("{:<16}".format(name) + "".join( "{:>10}".format(histogram.get(bucket, 0)) for bucket in buckets ))
+        return "\n".join(lines)
+
+
+def make_telemetry(spec, interval=5.0, sample=1):
+    """ Build a Telemetry from a comma separated list of sinks: progress, jsonl:PATH, histogram """
+    sinks = []
+    for name in spec.split(","):
+        if name == "progress":
+            sinks.append(ProgressSink())
+        elif name.startswith("jsonl:"):
+            sinks.append(JSONLinesSink(name[len("jsonl:"):]))
+        elif name == "histogram":
+            sinks.append(HistogramSink())
+        else:
+            raise ValueError("unknown telemetry sink: {}".format(name))
+    return Telemetry(sinks, interval=interval, sample=sample)
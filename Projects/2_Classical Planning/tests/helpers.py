@@ -0,0 +1,8 @@
+class PlanAssertions:
+    """ Assertions on plans, mixed into the unittest.TestCase classes """
+    def assertValidPlan(self, problem, node):
+        state = problem.initial
+        for action in node.solution():
+            self.assertIn(action, problem.actions(state))
+            state = problem.result(state, action)
+        self.assertTrue(problem.goal_test(state))
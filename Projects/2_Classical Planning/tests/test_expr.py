@@ -0,0 +1,63 @@
+import gc
+import pickle
+import unittest
+
+from aimacode.utils import Expr, expr
+
+
+class Test_ExprInterning(unittest.TestCase):
+    def test_structurally_equal_expressions_are_shared(self):
+        self.assertIs(expr('At(C1, SFO)'), Expr('At', Expr('C1'), Expr('SFO')))
+        self.assertIsNot(expr('At(C1, SFO)'), expr('At(C2, SFO)'))
+        self.assertNotEqual(expr('At(C1, SFO)'), expr('At(C2, SFO)'))
+
+    def test_cached_negation(self):
+        literal = expr('At(C1, SFO)')
+        self.assertIs(~literal, ~literal)
+        self.assertIs(~~literal, literal)
+        self.assertEqual(~literal, expr('~At(C1, SFO)'))
+
+    def test_pickle(self):
+        literal = expr('~At(C1, SFO)')
+        self.assertIs(pickle.loads(pickle.dumps(literal)), literal)
+
+    def test_uninterned_expressions_compare_structurally(self):
+        literal = expr('At(C1, SFO)')
+        try:
+            Expr.interning = False
+            copy = Expr('At', Expr('C1'), Expr('SFO'))
+        finally:
+            Expr.interning = True
+        self.assertIsNot(copy, literal)
+        self.assertEqual(copy, literal)
+        self.assertEqual(hash(copy), hash(literal))
+
+        table, generation = Expr._intern_table, Expr._table_generation
+        try:
+            Expr.clear_intern_table()
+            self.assertEqual(Expr('At', Expr('C1'), Expr('SFO')), literal)
+        finally:
+            Expr._intern_table, Expr._table_generation = table, generation
+
+    def test_numbers_keep_their_type(self):
+        self.assertEqual(Expr('+', 1.5, True).args, (1.5, True))
+        self.assertEqual(Expr('+', 1.5, 1).args, (1.5, 1))
+        self.assertIs(type(Expr('+', 1.5, 1).args[1]), int)
+        self.assertIs(type(Expr('f', Expr('+', 1)).args[0].args[0]), int)
+        self.assertIs(type(Expr('f', Expr('+', True)).args[0].args[0]), bool)
+        # structural equality is unchanged
+        self.assertEqual(Expr('+', 1.5, 1), Expr('+', 1.5, 1.0))
+        self.assertEqual(Expr('f', Expr('+', 1)), Expr('f', Expr('+', True)))
+
+    def test_unused_expressions_are_released(self):
+        gc.collect()
+        size = len(Expr._intern_table)
+        sentences = [ Expr('==>', Expr('&', Expr('P', i), Expr('Q', i)), Expr('R', i)) for i in range(100) ]
+        self.assertGreater(len(Expr._intern_table), size + 100)
+        del sentences
+        gc.collect()
+        self.assertLessEqual(len(Expr._intern_table), size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from aimacode.search import InstrumentedProblem, breadth_first_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from external_search import ExternalBFS, external_breadth_first_search
+
+
+def reachable_states(problem):
+    seen, stack = {problem.initial}, [problem.initial]
+    while stack:
+        state = stack.pop()
+        for action in problem.actions(state):
+            child = problem.result(state, action)
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return seen
+
+
+class Test_ExternalBFS(unittest.TestCase):
+    def test_shortest_plan(self):
+        for problem_fn in [ air_cargo_p1, air_cargo_p2 ]:
+            problem  = problem_fn()
+            expected = breadth_first_search(problem)
+            instrumented = InstrumentedProblem(problem)
+            node = external_breadth_first_search(instrumented, memory=2**14)  # forces several runs per layer
+            self.assertTrue(problem.goal_test(node.state))
+            self.assertEqual(len(node.solution()), len(expected.solution()))
+            self.assertLess(instrumented.peak_nodes, 2**14)
+
+    def test_only_layers_are_counted(self):
+        for problem_fn in [ air_cargo_p1, air_cargo_p2 ]:
+            instrumented = InstrumentedProblem(problem_fn())
+            search = ExternalBFS(instrumented)
+            node   = search.run()
+            # every layer before the goal's is expanded once, and rebuilding the plan isn't counted
+            self.assertEqual(instrumented.succs, sum(search.layers[:-1]))
+            self.assertLessEqual(instrumented.goal_tests, sum(search.layers))
+            self.assertTrue(instrumented.goal_test(node.state))
+
+    def test_exhaustive_layers(self):
+        problem = air_cargo_p1()
+        with tempfile.TemporaryDirectory() as directory:
+            search = ExternalBFS(problem, memory=2**12, directory=directory)
+            self.assertIsNone(search.run(stop_at_goal=False))
+            self.assertEqual(sum(search.layers), len(reachable_states(problem)))
+            self.assertEqual(len([ f for f in os.listdir(directory) if f.startswith('layer') ]), len(search.layers) + 1)
+            self.assertFalse([ f for f in os.listdir(directory) if f.startswith('run') ])
+
+
+if __name__ == '__main__':
+    unittest.main()
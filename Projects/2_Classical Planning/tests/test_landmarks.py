@@ -0,0 +1,67 @@
+import unittest
+
+from aimacode.search import InstrumentedProblem, Node, astar_search, breadth_first_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from landmarks import LandmarkGraph, relaxed_reachable
+
+
+class Test_LandmarkGraph(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+        self.graph   = LandmarkGraph(self.problem)
+
+    def names(self, landmark):
+        return { str(self.problem.state_map[i]) for i in landmark }
+
+    def test_landmarks(self):
+        landmarks = [ self.names(landmark) for landmark in self.graph.landmarks ]
+        self.assertEqual(landmarks, [
+            { "At(C1, JFK)" }, { "At(C2, SFO)" },
+            { "In(C1, P1)", "In(C1, P2)" }, { "In(C2, P1)", "In(C2, P2)" },
+        ])
+        self.assertEqual(self.graph.orderings, [(2, 0), (3, 1)])  # loaded before unloaded at the goal
+
+    def test_landmarks_are_in_every_plan(self):
+        node = breadth_first_search(self.problem)
+        visited = [ n.state for n in node.path() ]
+        for landmark in self.graph.landmarks:
+            self.assertTrue(any( any( state[i] for i in landmark ) for state in visited ))
+
+    def test_relaxed_reachable(self):
+        initial = { i for i, f in enumerate(self.problem.initial) if f }
+        self.assertEqual(len(relaxed_reachable(self.problem, initial)), len(self.problem.state_map))
+        loads = { i for i, action in enumerate(self.problem.actions_list) if action.name == 'Load' }
+        reachable = relaxed_reachable(self.problem, initial, loads)
+        self.assertFalse({ "In(C1, P1)", "At(C1, JFK)" } & { str(self.problem.state_map[i]) for i in reachable })
+
+    def test_accept_after_predecessors(self):
+        # with the ordering reversed, In(C1, P1) needs At(C1, JFK) accepted first: by the parent,
+        # not by the same step, whatever the order of the landmarks
+        self.graph.predecessors = [0, 0, 1 << 0, 1 << 1]
+        state = [ str(s) in ("At(C1, JFK)", "In(C1, P1)") for s in self.problem.state_map ]
+        self.assertEqual(self.graph.accept(state, 0), 1 << 0)
+        self.assertEqual(self.graph.accept(state, 1 << 0), 1 << 0 | 1 << 2)
+
+    def test_incremental_count(self):
+        node = Node(self.problem.initial)
+        self.assertEqual(self.problem.h_landmarks(node), 4)
+        path = breadth_first_search(air_cargo_p1()).path()
+        counts = []
+        for step in path:
+            node = Node(step.state, node if step.parent else None, step.action)
+            counts.append(self.problem.h_landmarks(node))
+        self.assertEqual(counts[-1], 0)
+        self.assertEqual(counts, sorted(counts, reverse=True))  # each action of this plan reaches a landmark or none
+        self.assertIsNotNone(node.landmarks)
+
+    def test_astar(self):
+        problem = air_cargo_p2()
+        ip, unmet = InstrumentedProblem(problem), InstrumentedProblem(air_cargo_p2())
+        node = astar_search(ip, problem.h_landmarks)
+        astar_search(unmet, unmet.problem.h_unmet_goals)
+        self.assertEqual(len(node.solution()), 9)
+        self.assertLess(ip.succs, unmet.succs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,7 +11,9 @@ from example_have_cake import have_cake
 from air_cargo_problems import (
     air_cargo_p1, air_cargo_p2, air_cargo_p3, air_cargo_p4
 )
-from my_planning_graph import PlanningGraph, LiteralLayer, ActionLayer
+from my_planning_graph import PlanningGraph, LiteralLayer, ActionLayer, RelaxedPlanner, graphplan
+from planning_problem import BasePlanningProblem
+from _utils import FluentState, create_expressions
 from layers import makeNoOp, make_node
 
 
@@ -355,5 +357,72 @@ class Test_8_SetLevelHeuristic(BaseHeuristicTest):
         self.assertEqual(self.ac_problem_4.h_pg_setlevel(self.ac_node_4), 6, self.msg)
 
 
+class Test_9_GraphPlan(unittest.TestCase):
+    def test_9a_graphplan(self):
+        for problem_fn, plan_length in [ (have_cake, 2), (air_cargo_p1, 6), (air_cargo_p2, 9) ]:
+            problem = problem_fn()
+            node    = graphplan(problem)
+            self.assertTrue(problem.goal_test(node.state))
+            self.assertEqual(len(node.solution()), plan_length)
+
+    def test_9b_graphplan_unsolvable(self):
+        problem = air_cargo_p1()
+        problem.goal = create_expressions(['At(C1, JFK)', 'At(C1, SFO)'])
+        self.assertIsNone(graphplan(problem))
+
+    def test_9c_graphplan_unsolvable_without_goal_mutexes(self):
+        # every pair of goals is reachable together, but not all three: C needs MakeC, or A and B
+        # together, which only happens after MakeC, and MakeC deletes G for good
+        G, A, B, C = expr('G'), expr('A'), expr('B'), expr('C')
+        problem = BasePlanningProblem(FluentState([G, B], [A, C]), [C, G, B])
+        problem.actions_list = [
+            Action(expr('GetA()'), [[], []], [[A], [B]]),
+            Action(expr('GetB()'), [[], []], [[B], [A]]),
+            Action(expr('Combine()'), [[A, B], []], [[C], []]),
+            Action(expr('MakeC()'), [[], []], [[C, A], [G]]),
+        ]
+        graph = PlanningGraph(problem, problem.initial, serialize=False).fill()
+        self.assertFalse(graph.goals_are_mutex(set(problem.goal), graph.literal_layers[-1]))
+        self.assertIsNone(graphplan(problem))
+
+
+class Test_10_IndexedMutexes(unittest.TestCase):
+    def test_10a_same_as_pairwise(self):
+        # update_mutexes (inverted indexes) must find exactly the mutexes of update_mutexes_pairwise
+        for problem_fn in [ have_cake, air_cargo_p1, air_cargo_p2 ]:
+            problem = problem_fn()
+            states  = [ problem.initial ] + [ problem.result(problem.initial, a) for a in problem.actions(problem.initial) ]
+            for state in states:
+                for serialize in [ True, False ]:
+                    for ignore_mutexes in [ True, False ]:
+                        pg = PlanningGraph(problem, state, serialize, ignore_mutexes).fill()
+                        for layer in pg.action_layers + pg.literal_layers:
+                            indexed = dict(layer._mutexes)
+                            layer._mutexes.clear()
+                            layer.update_mutexes_pairwise()
+                            self.assertEqual(indexed, dict(layer._mutexes))
+
+
+
+class Test_11_RelaxedPlan(unittest.TestCase):
+    def test_11a_relaxed_plan(self):
+        for problem_fn, length in [ (have_cake, 1), (air_cargo_p1, 6), (air_cargo_p2, 9) ]:
+            problem = problem_fn()
+            plan    = RelaxedPlanner(problem).plan(problem.initial)
+            self.assertEqual(len(plan), length)
+            # the plan reaches the goals when delete effects are ignored
+            true = { s for f, s in zip(problem.initial, problem.state_map) if f }
+            for index in plan:
+                true |= problem.actions_list[index].effect_add
+            self.assertTrue(set(problem.goal) <= true)
+            self.assertEqual(problem.h_relaxed_plan(Node(problem.initial)), length)
+
+    def test_11b_relaxed_plan_unreachable(self):
+        problem = air_cargo_p1()
+        problem.actions_list = [ action for action in problem.actions_list if action.name != 'Unload' ]
+        self.assertIsNone(RelaxedPlanner(problem).plan(problem.initial))
+        self.assertEqual(problem.h_relaxed_plan(Node(problem.initial)), float('inf'))
+
+
 if __name__ == '__main__':
     unittest.main()
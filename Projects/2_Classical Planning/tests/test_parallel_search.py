@@ -0,0 +1,41 @@
+import unittest
+
+from aimacode.search import InstrumentedProblem, astar_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from parallel_search import hda_star_search
+from _utils import create_expressions
+
+
+class Test_HDAStarSearch(unittest.TestCase):
+    def test_optimal_plan(self):
+        for problem_fn in [ air_cargo_p1, air_cargo_p2 ]:
+            problem  = problem_fn()
+            expected = astar_search(problem, problem.h_unmet_goals)
+            for processes in [1, 3]:
+                instrumented = InstrumentedProblem(problem)
+                node = hda_star_search(instrumented, problem.h_unmet_goals, processes=processes, batch_size=8)
+                self.assertTrue(problem.goal_test(node.state))
+                self.assertEqual(node.path_cost, expected.path_cost)
+                self.assertGreater(instrumented.succs, 0)
+
+    def test_counts_exclude_plan_replay(self):
+        # with one worker, every node popped is goal tested and expanded unless it is the goal, as
+        # in astar_search (which also goal tests the initial state before the loop)
+        for problem_fn in [ air_cargo_p1, air_cargo_p2 ]:
+            problem  = problem_fn()
+            expected = InstrumentedProblem(problem)
+            astar_search(expected, problem.h_unmet_goals, bucket=True)
+            instrumented = InstrumentedProblem(problem)
+            hda_star_search(instrumented, problem.h_unmet_goals, processes=1)
+            self.assertEqual(expected.goal_tests - expected.succs, 2)
+            self.assertEqual(instrumented.goal_tests - instrumented.succs, 1)
+            self.assertLessEqual(instrumented.succs, expected.succs)
+
+    def test_unsolvable(self):
+        problem = air_cargo_p1()
+        problem.goal = create_expressions(['At(C1, JFK)', 'At(C1, SFO)'])
+        self.assertIsNone(hda_star_search(problem, problem.h_unmet_goals, processes=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
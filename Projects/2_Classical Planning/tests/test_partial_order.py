@@ -0,0 +1,68 @@
+import unittest
+
+from aimacode.planning import Action
+from aimacode.search import InstrumentedProblem, astar_search, breadth_first_search, uniform_cost_search
+from aimacode.utils import expr
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from example_have_cake import have_cake
+from partial_order import StubbornSetProblem, stubborn_sets
+from planning_problem import BasePlanningProblem
+from _utils import FluentState
+from tests.helpers import PlanAssertions
+
+
+class SwitchProblem(BasePlanningProblem):
+    """ Independent switches, some of which must be turned on """
+    def __init__(self, switches, goal):
+        super().__init__(FluentState([], [ expr("On({})".format(s)) for s in switches ]),
+                         [ expr("On({})".format(s)) for s in goal ])
+        self.actions_list = []
+        for s in switches:
+            on = expr("On({})".format(s))
+            self.actions_list.append(Action(expr("TurnOn({})".format(s)), [[], [on]], [[on], []]))
+            self.actions_list.append(Action(expr("TurnOff({})".format(s)), [[on], []], [[], [on]]))
+
+
+class Test_PartialOrder(PlanAssertions, unittest.TestCase):
+    def test_interference(self):
+        reduced = StubbornSetProblem(air_cargo_p1())
+        names   = [ str(action.name) + str(action.args) for action in reduced.actions_list ]
+        for a, interfering in enumerate(reduced.interference):
+            self.assertNotIn(a, interfering)
+            for b in interfering: self.assertIn(a, reduced.interference[b])
+        fly     = names.index("Fly(P1, SFO, JFK)")
+        self.assertIn(names.index("Load(C1, P1, SFO)"), reduced.interference[fly])
+        # the plane can't be at SFO and at JFK, so loading it at JFK never interferes with flying it out of SFO
+        self.assertNotIn(names.index("Load(C2, P1, JFK)"), reduced.interference[fly])
+
+    def test_stubborn_set(self):
+        problem = SwitchProblem("ABCD", "AB")
+        reduced = StubbornSetProblem(problem)
+        names   = [ str(action.name) + str(action.args) for action in reduced.actions(problem.initial) ]
+        self.assertEqual(names, ["TurnOn(A,)"])
+        self.assertEqual((reduced.pruned, reduced.applicable), (3, 4))
+
+    def test_reduced_search(self):
+        for problem_fn in [ have_cake, air_cargo_p1, air_cargo_p2, lambda: SwitchProblem("ABCD", "AB") ]:
+            for search in [ breadth_first_search, uniform_cost_search ]:
+                problem  = problem_fn()
+                full     = InstrumentedProblem(problem_fn())
+                reduced  = InstrumentedProblem(problem)
+                expected = search(full)
+                node     = stubborn_sets(search)(reduced)
+                self.assertValidPlan(problem, node)
+                self.assertEqual(node.path_cost, expected.path_cost)
+                self.assertLessEqual(reduced.succs, full.succs)
+                self.assertLessEqual(reduced.pruned_actions, reduced.applicable_actions)
+                self.assertEqual(full.applicable_actions, 0)
+
+        problem = SwitchProblem("ABCD", "AB")
+        full, reduced = InstrumentedProblem(problem), InstrumentedProblem(problem)
+        self.assertEqual(astar_search(full, problem.h_unmet_goals).path_cost, 2)
+        self.assertEqual(stubborn_sets(astar_search)(reduced, problem.h_unmet_goals).path_cost, 2)
+        self.assertLess(reduced.states, full.states)
+        self.assertGreater(reduced.pruned_actions, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
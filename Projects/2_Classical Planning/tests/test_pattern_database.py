@@ -0,0 +1,81 @@
+import mmap
+import os
+import tempfile
+import unittest
+
+from aimacode.search import Node, astar_search, uniform_cost_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from pattern_database import PatternDatabase, PatternDatabaseHeuristic, additive_groups, goal_patterns
+
+
+def goal_distances(problem):
+    """ Exact distance to the goal of every reachable state, by uniform cost search from each """
+    distances = {}
+    seen, stack = {problem.initial}, [problem.initial]
+    while stack:
+        state = stack.pop()
+        for action in problem.actions(state):
+            child = problem.result(state, action)
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    for state in list(seen)[:50]:
+        problem.initial = state
+        distances[state] = uniform_cost_search(problem).path_cost
+    return distances
+
+
+class Test_PatternDatabase(unittest.TestCase):
+    def test_goal_patterns(self):
+        problem  = air_cargo_p1()
+        patterns = goal_patterns(problem)
+        self.assertEqual(len(patterns), 4)  # cargo fluents, then cargo and plane fluents, for C1 and C2
+        names = [ { str(problem.state_map[i]) for i in pattern } for pattern in patterns ]
+        self.assertEqual(names[0], { "At(C1, JFK)", "At(C1, SFO)", "In(C1, P1)", "In(C1, P2)" })
+        self.assertTrue(names[0] < names[1])
+        self.assertIn("At(P1, SFO)", names[1])
+
+    def test_additive_groups(self):
+        problem  = air_cargo_p1()
+        patterns = goal_patterns(problem)
+        # the two cargo-and-planes patterns share the plane fluents, so are never added together
+        self.assertEqual(additive_groups(problem, patterns), [[0, 2], [1, 2], [0, 3]])
+
+    def test_admissible(self):
+        problem   = air_cargo_p1()
+        heuristic = PatternDatabaseHeuristic(problem)
+        for state, distance in goal_distances(air_cargo_p1()).items():
+            self.assertLessEqual(heuristic(Node(state)), distance)
+        # one cargo moved with the planes (3 actions) plus loading and unloading the other (2), out of 6
+        self.assertEqual(heuristic(Node(air_cargo_p1().initial)), 5)
+
+    def test_astar_optimal(self):
+        for problem_fn in [ air_cargo_p1, air_cargo_p2 ]:
+            problem = problem_fn()
+            node = astar_search(problem, problem.h_pdb)
+            self.assertTrue(problem.goal_test(node.state))
+            self.assertEqual(node.path_cost, uniform_cost_search(problem_fn()).path_cost)
+
+    def test_memory_mapped(self):
+        problem = air_cargo_p2()
+        pattern = goal_patterns(problem)[1]
+        memory  = PatternDatabase(problem, pattern)
+        with tempfile.TemporaryDirectory() as directory:
+            path  = os.path.join(directory, "pdb.bin")
+            built = PatternDatabase(problem, pattern, path=path)
+            built.close()
+            mtime = os.path.getmtime(path)
+            loaded = PatternDatabase(problem, pattern, path=path)
+            self.assertIsInstance(loaded.data, mmap.mmap)
+            self.assertEqual(os.path.getmtime(path), mtime)  # loaded, not rebuilt
+            self.assertEqual(loaded.size, memory.size)
+            self.assertEqual(bytes(loaded.data[loaded.offset:]), bytes(memory.data))
+            loaded.close()
+
+            other = PatternDatabase(problem, goal_patterns(problem)[3], path=path)  # stale file is rebuilt
+            self.assertEqual(other.distance(problem.initial), PatternDatabase(problem, goal_patterns(problem)[3]).distance(problem.initial))
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from aimacode.search import breadth_first_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2
+from pddl import compile_pddl, ground, load_pddl, mutex_groups, parse_domain, parse_problem, parse_typed_list
+
+
+HERE   = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOMAIN = os.path.join(HERE, "pddl", "air_cargo_domain.pddl")
+
+ROADS_DOMAIN = """
+(define (domain roads)
+  (:requirements :strips :typing)
+  (:types city truck)
+  (:predicates (road ?a ?b - city) (at ?t - truck ?c - city) (visited ?c - city))
+  (:action drive
+    :parameters (?t - truck ?from ?to - city)
+    :precondition (and (at ?t ?from) (road ?from ?to))
+    :effect (and (at ?t ?to) (visited ?to) (not (at ?t ?from)))))
+"""
+
+ROADS_PROBLEM = """
+(define (problem roads-1) (:domain roads)
+  (:objects a b c d - city t - truck)
+  (:init (at t a) (road a b) (road b c) (road d a))  ; d can't be reached
+  (:goal (and (visited c))))
+"""
+
+
+def pddl_path(name):
+    return os.path.join(HERE, "pddl", name)
+
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+
+class Test_PDDL(unittest.TestCase):
+    def test_parse(self):
+        domain = parse_domain(ROADS_DOMAIN)
+        self.assertEqual(domain.name, "roads")
+        self.assertEqual(domain.actions[0].parameters, [("?t", "truck"), ("?from", "city"), ("?to", "city")])
+        self.assertEqual(parse_typed_list(["a", "b", "-", "t", "c"]), [("a", "t"), ("b", "t"), ("c", "object")])
+        task = parse_problem(ROADS_PROBLEM)
+        self.assertEqual(task.goal, [("visited", "c")])
+        self.assertIn(("road", "d", "a"), task.init)
+        self.assertRaises(ValueError, parse_problem, ROADS_PROBLEM + ")")
+        self.assertRaises(ValueError, parse_domain, ROADS_DOMAIN.replace("(at ?t ?from) (road", "(or (at ?t ?from)) (road"))
+
+    def test_ground(self):
+        fluents, initial, goal, actions = ground(parse_domain(ROADS_DOMAIN), parse_problem(ROADS_PROBLEM))
+        # road is static, so it is compiled away, and only drives along roads from reachable cities remain
+        self.assertEqual([ (name, args) for name, args, *_ in actions ], [("drive", ("t", "a", "b")), ("drive", ("t", "b", "c"))])
+        self.assertEqual(sorted(fluents), [("at", "t", "a"), ("at", "t", "b"), ("at", "t", "c"), ("visited", "b"), ("visited", "c")])
+        self.assertEqual(initial, {("at", "t", "a")})
+
+    def test_air_cargo(self):
+        for name, problem_fn in [("air_cargo_p1.pddl", air_cargo_p1), ("air_cargo_p2.pddl", air_cargo_p2)]:
+            problem  = load_pddl(DOMAIN, pddl_path(name))
+            expected = problem_fn()
+            self.assertEqual([ str(s) for s in problem.state_map ], [ str(s) for s in expected.state_map ])
+            self.assertEqual(problem.initial, expected.initial)
+            self.assertEqual(sorted(map(str, problem.goal)), sorted(map(str, expected.goal)))
+            self.assertEqual(sorted(map(str, problem.actions_list)), sorted(map(str, expected.actions_list)))
+            for state in [ problem.initial, problem.result(problem.initial, problem.actions(problem.initial)[0]) ]:
+                self.assertEqual(sorted(map(str, problem.actions(state))), sorted(map(str, expected.actions(state))))
+            self.assertEqual(len(breadth_first_search(problem).solution()), len(breadth_first_search(expected).solution()))
+
+    def test_mutex_groups(self):
+        domain = parse_domain(read(DOMAIN))
+        fluents, initial, _, _ = ground(domain, parse_problem(read(pddl_path("air_cargo_p1.pddl"))))
+        groups = mutex_groups(domain, fluents, initial)
+        self.assertIn([("At", "C1", "JFK"), ("At", "C1", "SFO"), ("In", "C1", "P1"), ("In", "C1", "P2")], groups)
+        self.assertIn([("At", "P1", "JFK"), ("At", "P1", "SFO")], groups)
+        self.assertEqual(len(groups), 4)
+        # the same mutexes as a leveled planning graph finds between true fluents
+        problem = load_pddl(DOMAIN, pddl_path("air_cargo_p2.pddl"))
+        planning_graph = air_cargo_p2().get_static_mutexes()
+        self.assertEqual(problem.get_static_mutexes(), { pair for pair in planning_graph if all( value for _, value in pair ) })
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            problem_path = os.path.join(directory, "problem.pddl")
+            with open(problem_path, "w") as file:
+                file.write(read(pddl_path("air_cargo_p1.pddl")))
+            cache = os.path.join(directory, "cache")
+            built = load_pddl(DOMAIN, problem_path, cache_dir=cache)
+            self.assertEqual(len(os.listdir(cache)), 1)
+            with mock.patch("pddl.compile_pddl", side_effect=AssertionError("grounded again")):
+                loaded = load_pddl(DOMAIN, problem_path, cache_dir=cache)
+            self.assertEqual(loaded.signature(), built.signature())
+            self.assertEqual(loaded.static_mutexes, built.static_mutexes)
+
+            with open(problem_path, "a") as file:
+                file.write("; changed\n")
+            load_pddl(DOMAIN, problem_path, cache_dir=cache)
+            self.assertEqual(len(os.listdir(cache)), 2)  # a different input gets its own file
+
+            for name in os.listdir(cache):
+                with open(os.path.join(cache, name), "wb") as file:
+                    file.write(b"garbage")
+            self.assertEqual(load_pddl(DOMAIN, problem_path, cache_dir=cache).signature(), built.signature())
+
+    def test_compiled_masks(self):
+        compiled = compile_pddl(ROADS_DOMAIN, ROADS_PROBLEM)
+        fluents  = compiled["fluents"]
+        name, args, pre_pos, pre_neg, add, rem = compiled["actions"][0]
+        self.assertEqual(pre_pos, 1 << fluents.index(("at", "t", "a")))
+        self.assertEqual(add, 1 << fluents.index(("at", "t", "b")) | 1 << fluents.index(("visited", "b")))
+        self.assertEqual((pre_neg, rem), (0, pre_pos))
+
+
+if __name__ == '__main__':
+    unittest.main()
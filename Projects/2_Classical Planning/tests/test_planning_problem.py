@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from aimacode.search import Node, breadth_first_search
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_random
+from aimacode.utils import expr
+from _utils import HeuristicCache, LiteralTable
+
+
+class Test_HeuristicCache(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+        self.node    = Node(self.problem.initial)
+
+    def test_cache_is_keyed_on_state(self):
+        first  = self.problem.h_pg_levelsum(self.node)
+        second = self.problem.h_pg_levelsum(Node(self.problem.initial))
+        cache  = self.problem.heuristic_caches['h_pg_levelsum']
+        self.assertEqual(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_cache_eviction(self):
+        cache = HeuristicCache(maxsize=2)
+        for state in range(3): cache.put(state, state)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertNotIn(0, cache)
+        self.assertEqual(cache.get(0, -1), -1)
+
+    def test_cache_snapshot(self):
+        expected = self.problem.h_pg_setlevel(self.node)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'heuristics.pkl')
+            self.problem.save_heuristic_caches(path)
+
+            problem = air_cargo_p1()
+            self.assertEqual(problem.load_heuristic_caches(path), 1)
+            self.assertEqual(problem.h_pg_setlevel(Node(problem.initial)), expected)
+            self.assertEqual(problem.heuristic_caches['h_pg_setlevel'].misses, 0)
+
+    def test_cache_snapshots_of_several_problems(self):
+        other = air_cargo_p2()
+        self.problem.h_pg_setlevel(self.node)
+        other.h_pg_setlevel(Node(other.initial))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'heuristics.pkl')
+            self.problem.save_heuristic_caches(path)
+            other.save_heuristic_caches(path)
+            self.assertEqual(os.listdir(directory), ['heuristics.pkl'])
+            self.assertEqual(air_cargo_p1().load_heuristic_caches(path), 1)
+            self.assertEqual(air_cargo_p2().load_heuristic_caches(path), 1)
+
+
+class Test_AirCargoRandom(unittest.TestCase):
+    def test_reproducible(self):
+        problem_a = air_cargo_random(3, 2, 3, seed=42)
+        problem_b = air_cargo_random(3, 2, 3, seed=42)
+        self.assertEqual(problem_a.initial, problem_b.initial)
+        self.assertEqual(problem_a.goal, problem_b.goal)
+        self.assertEqual(len(problem_a.actions_list), 2 * 3 * 2 * 3 + 3 * 2 * 2)
+
+    def test_goal_count(self):
+        problem = air_cargo_random(4, 1, 3, seed=0, n_goals=2)
+        self.assertEqual(len(problem.goal), 2)
+        self.assertFalse(problem.goal_test(problem.initial))
+        self.assertRaises(ValueError, air_cargo_random, 2, 0, 2)
+
+    def test_solvable(self):
+        for seed in range(3):
+            problem = air_cargo_random(2, 1, 2, seed=seed)
+            self.assertIsNotNone(breadth_first_search(problem))
+
+
+class Test_LiteralTable(unittest.TestCase):
+    def test_interned_ids(self):
+        table = LiteralTable()
+        literal = table.literal('At', 'C1', 'SFO')
+        self.assertEqual(literal, expr('At(C1, SFO)'))
+        self.assertIs(table.literal('At', 'C1', 'SFO'), literal)
+        self.assertIs(table.add(expr('At(C1, SFO)')), literal)
+        self.assertEqual(table.id(table.literal('At', 'C2', 'JFK')), 1)
+        self.assertEqual(len(table), 2)
+
+    def test_actions_share_state_map_literals(self):
+        problem = air_cargo_p1()
+        for i, fluent in enumerate(problem.state_map):
+            self.assertEqual(problem.literals.id(fluent), i)
+        identities = set(map(id, problem.state_map))
+        for action in problem.actions_list:
+            for literal in action.precond_pos | action.effect_add | action.effect_rem:
+                self.assertIn(id(literal), identities)
+
+    def test_pack_state(self):
+        problem = air_cargo_p1()
+        state   = problem.result(problem.initial, problem.actions(problem.initial)[0])
+        for s in [ problem.initial, state ]:
+            packed = problem.pack_state(s)
+            self.assertIsInstance(packed, int)
+            self.assertEqual(problem.unpack_state(packed), s)
+        self.assertEqual(problem.pack_state((True, False, True)), 0b101)
+
+
+if __name__ == '__main__':
+    unittest.main()
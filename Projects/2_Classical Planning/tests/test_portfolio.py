@@ -0,0 +1,38 @@
+import time
+import unittest
+from functools import partial
+
+from aimacode.search import breadth_first_search
+from air_cargo_problems import air_cargo_p1
+from parallel_search import hda_star_search
+from portfolio import Job, run_portfolio
+
+
+def sleeping_search(problem):
+    time.sleep(10)
+
+
+class Test_Portfolio(unittest.TestCase):
+    def test_run_portfolio(self):
+        jobs = [
+            Job(1, "breadth_first_search", "", air_cargo_p1, breadth_first_search),
+            Job(1, "sleeping_search", "", air_cargo_p1, sleeping_search),
+        ]
+        ballast = b"\x01" * 200 * 2**20  # resident in the runner, and inherited by every worker
+        results = run_portfolio(jobs, processes=2, timeout=1)
+        del ballast
+        self.assertEqual([ r["status"] for r in results ], ["ok", "timeout"])
+        self.assertEqual(results[0]["plan_length"], 6)
+        self.assertEqual(results[0]["expansions"], 43)
+        self.assertLess(results[0]["max_rss_mb"], 100)  # memory used by the job itself
+
+
+    def test_search_with_worker_processes(self):
+        jobs = [ Job(1, "hda_star_search", "h_unmet_goals", air_cargo_p1, partial(hda_star_search, processes=2)) ]
+        results = run_portfolio(jobs, processes=1, timeout=60)
+        self.assertEqual(results[0]["status"], "ok")
+        self.assertEqual(results[0]["plan_length"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,396 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+
+from aimacode.search import (
+    Checkpoint, HeuristicPool, InstrumentedProblem, Node, NodePool, breadth_first_search, alternation_search,
+    anytime_weighted_astar_search, astar_search, bidirectional_breadth_first_search,
+    depth_first_graph_search, graph_search, greedy_best_first_graph_search,
+    iterative_deepening_astar_search, iterative_deepening_depth_first_search, iterative_deepening_search,
+    lazy_greedy_best_first_graph_search,
+    recursive_best_first_search, simplified_memory_bounded_astar_search,
+    uniform_cost_search
+)
+from aimacode.utils import BucketQueue, IndexedPriorityQueue, LIFOQueue, Stack, memoize
+from air_cargo_problems import air_cargo_p1, air_cargo_p2, air_cargo_random
+from example_have_cake import have_cake
+from tests.helpers import PlanAssertions
+
+
+class Test_PriorityQueues(unittest.TestCase):
+    def setUp(self):
+        self.f = { 'a': 3, 'b': 1, 'c': 2 }
+
+    def test_indexed_priority_queue_decrease_key(self):
+        queue = IndexedPriorityQueue(min, lambda x: self.f[x])
+        queue.extend('abc')
+        self.f['a'] = 0
+        queue.append('a')
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.pop() for _ in range(3)], ['a', 'b', 'c'])
+        self.assertEqual(queue.peak, 3)
+
+    def test_indexed_priority_queue_delete(self):
+        queue = IndexedPriorityQueue(min, lambda x: self.f[x])
+        queue.extend('abc')
+        del queue['b']
+        self.assertNotIn('b', queue)
+        self.assertEqual([queue.pop() for _ in range(2)], ['c', 'a'])
+
+    def test_bucket_queue_stale_pops(self):
+        queue = BucketQueue(min, lambda x: self.f[x])
+        queue.extend('abc')
+        queue.append('a')  # not an improvement, ignored
+        self.f['a'] = 0
+        queue.append('a')  # decrease-key: the entry at f = 3 goes stale
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.pop() for _ in range(3)], ['a', 'b', 'c'])
+        self.assertRaises(IndexError, queue.pop)
+        self.assertEqual(queue.stale_pops, 1)
+
+    def test_bucket_queue_delete(self):
+        queue = BucketQueue(min, lambda x: self.f[x])
+        queue.extend('abc')
+        del queue['b']
+        self.assertNotIn('b', queue)
+        self.assertEqual(len(queue), 2)
+        self.assertEqual([queue.pop() for _ in range(2)], ['c', 'a'])
+        self.assertEqual(queue.stale_pops, 1)
+        self.assertRaises(KeyError, queue.__delitem__, 'b')
+
+    def test_lifo_queue_membership(self):
+        queue = LIFOQueue()
+        queue.extend('abca')
+        self.assertEqual((len(queue), queue.peak), (4, 4))
+        self.assertEqual(queue.pop(), 'a')
+        self.assertIn('a', queue)  # pushed twice, one copy left
+        self.assertEqual([queue.pop() for _ in range(3)], ['c', 'b', 'a'])
+        self.assertNotIn('a', queue)
+        self.assertEqual(queue.peak, 4)
+
+    def test_depth_first_graph_search(self):
+        problem  = InstrumentedProblem(air_cargo_p2())
+        node     = depth_first_graph_search(problem)
+        expected = graph_search(air_cargo_p2(), Stack())
+        self.assertEqual([ str(a) for a in node.solution() ], [ str(a) for a in expected.solution() ])
+        self.assertGreater(problem.max_frontier, 0)
+
+
+class Test_BestFirstGraphSearch(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+
+    def test_optimal_plan_length(self):
+        for search in [ uniform_cost_search,
+                        lambda p: astar_search(p, self.problem.h_unmet_goals),
+                        lambda p: astar_search(p, self.problem.h_unmet_goals, bucket=True) ]:
+            node = search(InstrumentedProblem(self.problem))
+            self.assertEqual(len(node.solution()), 6)
+
+    def test_frontier_stats(self):
+        problem = InstrumentedProblem(self.problem)
+        astar_search(problem, self.problem.h_pg_levelsum)
+        self.assertGreater(problem.max_frontier, 0)
+        self.assertEqual(problem.stale_pops, 0)
+
+
+class Test_HeuristicPool(unittest.TestCase):
+    def expansions(self, search, heuristic, **options):
+        problem = air_cargo_p1()
+        order   = []
+        class Recorded(InstrumentedProblem):
+            def actions(self, state):
+                order.append(state)
+                return super().actions(state)
+        node = search(Recorded(problem), getattr(problem, heuristic), **options)
+        return [ (action.name, action.args) for action in node.solution() ], order, problem.heuristic_caches[heuristic]
+
+    def test_same_search_as_serial(self):
+        for search, heuristic in [ (astar_search, 'h_pg_levelsum'), (greedy_best_first_graph_search, 'h_pg_setlevel') ]:
+            serial_plan,   serial_order,   serial_cache   = self.expansions(search, heuristic)
+            parallel_plan, parallel_order, parallel_cache = self.expansions(search, heuristic, processes=2)
+            self.assertEqual(parallel_plan, serial_plan)
+            self.assertEqual(parallel_order, serial_order)
+            self.assertEqual(len(parallel_cache), len(serial_cache))  # values computed by workers are cached here too
+
+    def test_evaluate(self):
+        problem = air_cargo_p1()
+        pool    = HeuristicPool(problem, problem.h_pg_levelsum, processes=2)
+        try:
+            nodes = list(Node(problem.initial).expand(problem))
+            pool.evaluate(nodes + [ Node(nodes[0].state) ])  # a repeated state is evaluated once
+            self.assertEqual([ node.h for node in nodes ], [ air_cargo_p1().h_pg_levelsum(node) for node in nodes ])
+            self.assertEqual(problem.heuristic_caches['h_pg_levelsum'].misses, 0)  # none computed in this process
+            self.assertEqual(len(problem.heuristic_caches['h_pg_levelsum']), len({ node.state for node in nodes }))
+        finally:
+            pool.close()
+
+
+class Test_NodePool(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p2()
+
+    def test_compact_astar(self):
+        expected = astar_search(self.problem, self.problem.h_unmet_goals)
+        problem  = InstrumentedProblem(self.problem)
+        node     = astar_search(problem, self.problem.h_unmet_goals, compact=True)
+        self.assertEqual(node.path_cost, expected.path_cost)
+        self.assertEqual(node.depth, len(node.solution()))
+        self.assertEqual([ n.state for n in node.path() ][-1], node.state)
+        self.assertEqual(node.f, node.path_cost)
+        self.assertGreater(problem.peak_nodes, problem.max_frontier)
+
+    def test_node_view(self):
+        pool   = NodePool(self.problem)
+        root   = pool.view(pool.add(self.problem.initial))
+        action = self.problem.actions(self.problem.initial)[0]
+        child  = root.child_node(self.problem, action)
+        self.assertEqual(child, Node(self.problem.initial).child_node(self.problem, action))
+        self.assertEqual(child.parent, root)
+        self.assertEqual(child.solution(), [action])
+        self.assertRaises(AttributeError, lambda: child.f)
+        self.assertEqual(pool.nbytes / len(pool), 40)
+        # equality is symmetric between views and nodes
+        self.assertEqual(Node(self.problem.initial), root)
+        self.assertNotEqual(Node(self.problem.initial), child)
+
+    def test_memoized_values_outlive_views(self):
+        pool  = NodePool(self.problem)
+        calls = []
+        h     = memoize(lambda node: calls.append(node.index) or 1, 'h')
+        root  = pool.add(self.problem.initial)
+        self.assertEqual((h(pool.view(root)), h(pool.view(root))), (1, 1))
+        self.assertEqual(calls, [root])
+        child = pool.view(root).child_node(self.problem, self.problem.actions(self.problem.initial)[0])
+        child.h, child.landmarks = 5, 3
+        self.assertEqual((pool.view(child.index).h, pool.view(child.index).landmarks), (5, 3))
+        pool.pop()  # a discarded node's values aren't inherited by the next node at its index
+        child = pool.view(pool.add(self.problem.initial, root))
+        self.assertEqual(h(child), 1)
+        self.assertRaises(AttributeError, lambda: child.landmarks)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedProblem(InstrumentedProblem):
+    """ Raises Interrupted after `limit` expansions, as if the process was killed """
+    def __init__(self, problem, limit):
+        super().__init__(problem)
+        self.limit = limit
+
+    def actions(self, state):
+        if self.succs >= self.limit: raise Interrupted()
+        return super().actions(state)
+
+
+class Test_Checkpoint(unittest.TestCase):
+    def setUp(self):
+        self.problem   = air_cargo_p2()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path      = os.path.join(self.directory.name, 'search.ckpt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume(self):
+        for search in [ breadth_first_search, partial(astar_search, h=self.problem.h_unmet_goals) ]:
+            expected = InstrumentedProblem(self.problem)
+            node     = search(expected)
+
+            checkpoint = Checkpoint(self.path, interval=0)
+            with self.assertRaises(Interrupted):
+                search(InterruptedProblem(self.problem, expected.succs // 2), checkpoint=checkpoint)
+            checkpoint.close()
+            self.assertGreater(checkpoint.saves, 0)
+
+            problem = InstrumentedProblem(self.problem)
+            resumed = search(problem, checkpoint=Checkpoint(self.path, resume=True))
+            self.assertEqual(resumed.path_cost, node.path_cost)
+            self.assertEqual(problem.succs, expected.succs)
+            os.remove(self.path)
+
+    def test_mismatched_snapshot(self):
+        checkpoint = Checkpoint(self.path, interval=0, label='breadth_first_search')
+        checkpoint.save(self.problem, [Node(self.problem.initial)], set())
+        checkpoint.close()
+        self.assertRaises(ValueError, Checkpoint(self.path, resume=True, label='astar_search').restore, self.problem)
+        self.assertRaises(ValueError, Checkpoint(self.path, resume=True, label='breadth_first_search').restore, air_cargo_p1())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "snapshots are only written in the background with fork")
+    def test_failed_snapshot(self):
+        checkpoint = Checkpoint(os.path.join(self.path, 'missing', 'search.ckpt'), interval=0)
+        checkpoint.save(self.problem, [Node(self.problem.initial)], set())
+        with self.assertWarns(RuntimeWarning):
+            checkpoint.close()
+        self.assertEqual((checkpoint.saves, checkpoint.failures), (1, 1))
+
+
+class Test_MemoryBoundedSearch(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p1()
+
+    def test_optimal_plan_length(self):
+        for search in [ iterative_deepening_astar_search,
+                        partial(iterative_deepening_astar_search, table_size=10),
+                        partial(simplified_memory_bounded_astar_search, max_nodes=200),
+                        recursive_best_first_search ]:
+            node = search(InstrumentedProblem(self.problem), self.problem.h_unmet_goals)
+            self.assertEqual(len(node.solution()), 6)
+
+    def test_peak_nodes(self):
+        problem = InstrumentedProblem(self.problem)
+        iterative_deepening_astar_search(problem, self.problem.h_unmet_goals, table_size=10)
+        self.assertLessEqual(problem.peak_nodes, 10 + 6)
+
+        problem = InstrumentedProblem(self.problem)
+        simplified_memory_bounded_astar_search(problem, self.problem.h_unmet_goals, max_nodes=200)
+        self.assertGreater(problem.peak_nodes, 0)
+        self.assertLess(problem.peak_nodes, 200 + len(self.problem.actions_list))
+
+    def test_iterative_deepening_depth_first_search(self):
+        plain, tabled = InstrumentedProblem(self.problem), InstrumentedProblem(self.problem)
+        self.assertEqual(len(iterative_deepening_search(plain).solution()), 6)
+        self.assertEqual(len(iterative_deepening_depth_first_search(tabled).solution()), 6)
+        self.assertLess(tabled.succs, plain.succs)
+        self.assertEqual(len(iterative_deepening_depth_first_search(self.problem, table_size=10).solution()), 6)
+
+    def test_out_of_memory(self):
+        node = simplified_memory_bounded_astar_search(self.problem, self.problem.h_unmet_goals, max_nodes=5)
+        self.assertIsNone(node)
+
+
+class Test_AnytimeWeightedAStarSearch(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_random(4, 2, 4, seed=1)
+
+    def test_improving_solutions(self):
+        for restart in [False, True]:
+            solutions = list(anytime_weighted_astar_search(
+                self.problem, self.problem.h_unmet_goals, weights=(10, 3, 1), restart=restart))
+            costs = [ cost for node, cost, elapsed in solutions ]
+            self.assertGreater(len(costs), 1)
+            self.assertEqual(costs, sorted(costs, reverse=True))
+            self.assertEqual(len(set(costs)), len(costs))
+            self.assertEqual(costs[-1], len(astar_search(self.problem, self.problem.h_unmet_goals).solution()))
+
+    def test_time_budget(self):
+        solutions = anytime_weighted_astar_search(self.problem, self.problem.h_unmet_goals, time_budget=0)
+        self.assertEqual(list(solutions), [])
+
+
+class Test_LazyGreedyBestFirstGraphSearch(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p2()
+        self.calls   = []
+
+    def h(self, node):
+        self.calls.append(node.state)
+        return self.problem.h_unmet_goals(node)
+
+    def test_deferred_evaluation(self):
+        # eager search evaluates every generated child, lazy search only expanded nodes
+        problem = InstrumentedProblem(self.problem)
+        greedy_best_first_graph_search(problem, self.h)
+        self.assertGreater(len(self.calls), problem.succs)
+        self.calls.clear()
+
+        problem = InstrumentedProblem(self.problem)
+        node    = lazy_greedy_best_first_graph_search(problem, self.h)
+        self.assertTrue(self.problem.goal_test(node.state))
+        self.assertEqual(len(self.calls), problem.succs)
+
+    def test_preferred_actions(self):
+        problem = InstrumentedProblem(self.problem)
+        node    = lazy_greedy_best_first_graph_search(problem, self.h, preferred=True)
+        self.assertTrue(self.problem.goal_test(node.state))
+        helpful = self.problem.preferred_actions(Node(self.problem.initial))
+        self.assertTrue(helpful)
+        self.assertTrue(set(helpful) <= set(self.problem.actions(self.problem.initial)))
+
+
+
+class Test_AlternationSearch(unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_p2()
+        self.calls   = { "unmet": [], "blind": [] }
+
+    def unmet(self, node):
+        self.calls["unmet"].append(node.state)
+        return self.problem.h_unmet_goals(node)
+
+    def blind(self, node):
+        self.calls["blind"].append(node.state)
+        return 0
+
+    def test_lazy_evaluation(self):
+        problem = InstrumentedProblem(self.problem)
+        node    = alternation_search(problem, [self.unmet, self.blind])
+        self.assertTrue(self.problem.goal_test(node.state))
+        # each expanded node is evaluated once by each heuristic, and nothing else is
+        self.assertEqual(len(self.calls["unmet"]), problem.succs)
+        self.assertEqual(self.calls["unmet"], self.calls["blind"])
+
+    def test_eager_evaluation(self):
+        problem = InstrumentedProblem(self.problem)
+        node    = alternation_search(problem, [self.unmet, self.blind], lazy=False)
+        self.assertTrue(self.problem.goal_test(node.state))
+        self.assertGreater(len(self.calls["unmet"]), problem.succs)
+
+    def test_boost(self):
+        # boosting the queue of the heuristic making progress saves expansions in the blind queue
+        plain, boosted = InstrumentedProblem(self.problem), InstrumentedProblem(air_cargo_p2())
+        alternation_search(plain, [self.unmet, self.blind])
+        alternation_search(boosted, [self.unmet, self.blind], boost=1000)
+        self.assertLess(boosted.succs, plain.succs)
+
+    def test_planning_heuristics(self):
+        problem = self.problem
+        node = alternation_search(problem, [problem.h_unmet_goals, problem.h_pg_levelsum, problem.h_relaxed_plan], boost=1000)
+        self.assertTrue(problem.goal_test(node.state))
+        self.assertEqual(len(node.solution()), 9)
+
+
+
+class Test_BidirectionalBreadthFirstSearch(PlanAssertions, unittest.TestCase):
+    def test_optimal(self):
+        for problem_fn in [ have_cake, air_cargo_p1, air_cargo_p2, partial(air_cargo_random, 5, 2, 3, seed=1, n_goals=2) ]:
+            problem  = problem_fn()
+            node     = bidirectional_breadth_first_search(problem)
+            expected = breadth_first_search(problem_fn())
+            self.assertValidPlan(problem, node)
+            self.assertEqual(len(node.solution()), len(expected.solution()))
+
+    def test_expansions(self):
+        forward, bidirectional = InstrumentedProblem(air_cargo_p2()), InstrumentedProblem(air_cargo_p2())
+        breadth_first_search(forward)
+        bidirectional_breadth_first_search(bidirectional)
+        self.assertGreater(bidirectional.backward_succs, 0)
+        self.assertLess(bidirectional.succs, forward.succs / 3)
+        self.assertLess(bidirectional.states, forward.states / 3)
+
+    def test_counts_exclude_plan_replay(self):
+        problem = InstrumentedProblem(air_cargo_p2())
+        node    = bidirectional_breadth_first_search(problem)
+        self.assertEqual(problem.goal_tests, 0)  # meetings are tested on packed states
+        self.assertValidPlan(problem.problem, node)
+
+    def test_regression(self):
+        problem = air_cargo_p1()
+        masks   = { str(action): (pre_pos, pre_neg, add, rem) for action, pre_pos, pre_neg, add, rem in problem.get_action_masks() }
+        index   = problem.fluent_index
+        pre_pos, _, add, rem = masks["Unload(C1, P1, JFK)"]
+        self.assertEqual(add, 1 << index[problem.literals.literal('At', 'C1', 'JFK')])
+        self.assertEqual(pre_pos, sum( 1 << index[problem.literals.literal(*s)] for s in [('In', 'C1', 'P1'), ('At', 'P1', 'JFK')] ))
+        self.assertEqual(rem, 1 << index[problem.literals.literal('In', 'C1', 'P1')])
+
+    def test_unsolvable(self):
+        problem = air_cargo_p1()
+        problem.actions_list = [ action for action in problem.actions_list if action.name != 'Unload' ]
+        self.assertIsNone(bidirectional_breadth_first_search(problem))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from aimacode.search import InstrumentedProblem, breadth_first_search, uniform_cost_search
+from aimacode.utils import expr
+from air_cargo_problems import air_cargo_p1, air_cargo_random
+from symmetry import SymmetryReducedProblem, find_symmetries, symmetry_reduced
+from tests.helpers import PlanAssertions
+
+
+class Test_Symmetry(PlanAssertions, unittest.TestCase):
+    def setUp(self):
+        self.problem = air_cargo_random(5, 2, 3, seed=1, n_goals=2)
+
+    def test_find_symmetries(self):
+        self.assertEqual(find_symmetries(air_cargo_p1()), [])
+        classes = find_symmetries(self.problem)
+        self.assertEqual(classes, [[expr('C1'), expr('C3')], [expr('P1'), expr('P2')]])
+        self.assertEqual(SymmetryReducedProblem(self.problem).group_size, 4)
+
+    def test_canonical_states(self):
+        reduced = SymmetryReducedProblem(self.problem)
+        swapped = reduced.permute(self.problem.initial, { expr('P1'): expr('P2'), expr('P2'): expr('P1') })
+        state   = self.problem.result(self.problem.initial, self.problem.actions(self.problem.initial)[0])
+        self.assertEqual(reduced.canonicalize(state)[0], reduced.canonicalize(reduced.permute(state, { expr('C1'): expr('C3'), expr('C3'): expr('C1') }))[0])
+        self.assertEqual(reduced.canonicalize(swapped)[0], reduced.initial)
+
+    def test_reduced_search(self):
+        for search in [ breadth_first_search, uniform_cost_search ]:
+            full    = InstrumentedProblem(self.problem)
+            reduced = InstrumentedProblem(self.problem)
+            expected = search(full)
+            node     = symmetry_reduced(search)(reduced)
+            self.assertValidPlan(self.problem, node)
+            self.assertEqual(node.path_cost, expected.path_cost)
+            self.assertLess(reduced.succs, full.succs)
+
+    def test_unreduce_is_not_counted(self):
+        problem = InstrumentedProblem(self.problem)
+        reduced = SymmetryReducedProblem(problem)
+        node    = breadth_first_search(reduced)
+        counts  = (problem.succs, problem.goal_tests, problem.states)
+        self.assertValidPlan(self.problem, reduced.unreduce(node))
+        self.assertEqual((problem.succs, problem.goal_tests, problem.states), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from aimacode.search import astar_search, breadth_first_search
+from air_cargo_problems import air_cargo_p1
+from telemetry import HistogramSink, JSONLinesSink, ProgressSink, Telemetry, make_telemetry
+from _utils import solve
+
+
+class Test_Telemetry(unittest.TestCase):
+    def test_counts_and_timers(self):
+        problem  = air_cargo_p1()
+        sink     = HistogramSink()
+        ip, node, _ = solve(problem, astar_search, problem.h_unmet_goals, telemetry=Telemetry([sink], interval=0))
+        expected = astar_search(problem, problem.h_unmet_goals)
+        self.assertEqual(node.solution(), expected.solution())
+
+        final = sink.snapshots[-1]
+        self.assertTrue(final["final"])
+        self.assertGreater(len(sink.snapshots), 1)  # interval=0 reports on every timed call
+        self.assertEqual(final["expansions"], ip.succs)
+        self.assertEqual(final["timers"]["actions"]["calls"],   ip.succs)
+        self.assertEqual(final["timers"]["result"]["calls"],    ip.states)
+        self.assertEqual(final["timers"]["goal_test"]["calls"], ip.goal_tests)
+        self.assertGreater(final["timers"]["h_unmet_goals"]["calls"], 0)
+        self.assertEqual(sum(sink.histograms["actions"].values()), ip.succs)
+        self.assertGreater(final["peak_frontier"], 0)
+        self.assertGreater(final["peak_explored"], 0)
+        self.assertGreater(final["rss_mb"], 0)
+
+    def test_sampling(self):
+        problem = air_cargo_p1()
+        sink    = HistogramSink()
+        ip, _, _ = solve(problem, breadth_first_search, telemetry=Telemetry([sink], interval=60, sample=7))
+        timer   = sink.snapshots[-1]["timers"]["result"]
+        self.assertEqual(len(sink.snapshots), 1)  # only the final report
+        self.assertEqual(timer["calls"], ip.states)
+        self.assertEqual(sum(timer["histogram"].values()), ip.states // 7)
+
+    def test_sinks(self):
+        problem = air_cargo_p1()
+        stream  = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "telemetry.jsonl")
+            solve(problem, breadth_first_search, telemetry=Telemetry([ProgressSink(stream), JSONLinesSink(path)], interval=0))
+            with open(path) as file:
+                lines = [ json.loads(line) for line in file ]
+        self.assertEqual(len(lines), len(stream.getvalue().splitlines()))
+        self.assertTrue(lines[-1]["final"])
+        self.assertIn("expansions", stream.getvalue())
+
+    def test_make_telemetry(self):
+        telemetry = make_telemetry("progress,histogram", interval=2, sample=3)
+        self.assertEqual([ type(sink) for sink in telemetry.sinks ], [ProgressSink, HistogramSink])
+        self.assertEqual((telemetry.interval, telemetry.sample), (2, 3))
+        self.assertRaises(ValueError, make_telemetry, "nonsense")
+
+
+if __name__ == '__main__':
+    unittest.main()